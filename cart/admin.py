@@ -1,5 +1,9 @@
+from decimal import Decimal
 from django.contrib import admin
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html
+from shopping_store.admin_mixins import ComputedColumnsMixin, EstimatedCountMixin
 from .models import Cart, CartItem, Wishlist, WishlistItem
 
 
@@ -11,30 +15,43 @@ class CartItemInline(admin.TabularInline):
 
 
 @admin.register(Cart)
-class CartAdmin(admin.ModelAdmin):
+class CartAdmin(ComputedColumnsMixin, admin.ModelAdmin):
     list_display = ['customer', 'total_items_count', 'subtotal_display', 'updated_at']
+    list_select_related = ['customer']
+    computed_columns = {
+        'items_quantity': Sum('items__quantity'),
+        'subtotal_amount': Sum(ExpressionWrapper(
+            F('items__quantity') * (
+                F('items__product__price') + Coalesce('items__variant__price_adjustment', Value(Decimal('0')))
+            ),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )),
+    }
     search_fields = ['customer__username', 'customer__email']
     readonly_fields = ['created_at', 'updated_at', 'total_items_count', 'subtotal_display']
     inlines = [CartItemInline]
 
     def total_items_count(self, obj):
-        return obj.total_items
+        return obj.items_quantity or 0
     total_items_count.short_description = 'Total Items'
+    total_items_count.admin_order_field = 'items_quantity'
 
     def subtotal_display(self, obj):
-        return format_html('<strong>₹{:,.2f}</strong>', obj.subtotal)
+        return format_html('<strong>₹{}</strong>', f'{obj.subtotal_amount or 0:,.2f}')
     subtotal_display.short_description = 'Subtotal'
+    subtotal_display.admin_order_field = 'subtotal_amount'
 
 
 @admin.register(CartItem)
-class CartItemAdmin(admin.ModelAdmin):
+class CartItemAdmin(EstimatedCountMixin, admin.ModelAdmin):
     list_display = ['cart', 'product', 'variant', 'quantity', 'unit_price', 'line_total_display']
+    list_select_related = ['cart__customer', 'product', 'variant__product', 'variant__size', 'variant__color']
     list_filter = ['added_at']
     search_fields = ['cart__customer__username', 'product__name']
     readonly_fields = ['unit_price', 'line_total', 'added_at', 'updated_at']
 
     def line_total_display(self, obj):
-        return format_html('<strong>₹{:,.2f}</strong>', obj.line_total)
+        return format_html('<strong>₹{}</strong>', f'{obj.line_total:,.2f}')
     line_total_display.short_description = 'Line Total'
 
 
@@ -46,20 +63,24 @@ class WishlistItemInline(admin.TabularInline):
 
 
 @admin.register(Wishlist)
-class WishlistAdmin(admin.ModelAdmin):
+class WishlistAdmin(ComputedColumnsMixin, admin.ModelAdmin):
     list_display = ['customer', 'items_count', 'created_at']
+    list_select_related = ['customer']
+    computed_columns = {'items_total': Count('items')}
     search_fields = ['customer__username', 'customer__email']
     readonly_fields = ['created_at', 'items_count']
     inlines = [WishlistItemInline]
 
     def items_count(self, obj):
-        return obj.items.count()
+        return obj.items_total
     items_count.short_description = 'Items'
+    items_count.admin_order_field = 'items_total'
 
 
 @admin.register(WishlistItem)
 class WishlistItemAdmin(admin.ModelAdmin):
     list_display = ['wishlist', 'product', 'added_at']
+    list_select_related = ['wishlist__customer', 'product']
     list_filter = ['added_at']
     search_fields = ['wishlist__customer__username', 'product__name']
     readonly_fields = ['added_at']
@@ -0,0 +1,176 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
+from catalog.models import Product, ProductVariant
+from .models import Cart, CartItem
+
+COOKIE_NAME = 'cart'
+COOKIE_AGE = 60 * 60 * 24 * 30
+MAX_LINES = 50
+MAX_QUANTITY = 99
+MERGE_ATTEMPTS = 3
+
+_signer = signing.Signer(salt='cart.anonymous')
+
+
+class AnonymousCart:
+    """
+    A visitor's cart kept in a signed cookie as product.variant.quantity
+    triples, so browsing and adding items never writes to the database.
+    Changes are written back to the response by AnonymousCartMiddleware.
+    """
+
+    def __init__(self, lines=None):
+        # (product_id, variant_id or 0) -> quantity, in the order added
+        self.lines = lines or {}
+        self.modified = False
+
+    @classmethod
+    def loads(cls, value):
+        lines = {}
+        try:
+            for triple in _signer.unsign(value).split('_')[:MAX_LINES]:
+                product_id, variant_id, quantity = map(int, triple.split('.'))
+                lines[product_id, variant_id] = min(max(quantity, 1), MAX_QUANTITY)
+        except (signing.BadSignature, ValueError):
+            return cls()
+        return cls(lines)
+
+    def dumps(self):
+        return _signer.sign('_'.join(f'{p}.{v}.{q}' for (p, v), q in self.lines.items()))
+
+    @property
+    def total_items(self):
+        return sum(self.lines.values())
+
+    def add(self, product_id, variant_id, quantity):
+        key = (product_id, variant_id or 0)
+        if key not in self.lines and len(self.lines) >= MAX_LINES:
+            return False
+        self.lines[key] = min(self.lines.get(key, 0) + quantity, MAX_QUANTITY)
+        self.modified = True
+        return True
+
+    def update(self, key, quantity):
+        if key in self.lines:
+            if quantity > 0:
+                self.lines[key] = min(quantity, MAX_QUANTITY)
+            else:
+                del self.lines[key]
+            self.modified = True
+
+    def remove(self, key):
+        self.update(key, 0)
+
+    def clear(self):
+        self.lines = {}
+        self.modified = True
+
+    def items(self):
+        """Unsaved CartItems for the lines whose product and variant still exist"""
+        variants = ProductVariant.objects.select_related('product', 'size', 'color').in_bulk(
+            [v for _, v in self.lines if v]
+        )
+        products = Product.objects.filter(is_active=True).in_bulk([p for p, v in self.lines if not v])
+        items = []
+        for (product_id, variant_id), quantity in self.lines.items():
+            if variant_id:
+                variant = variants.get(variant_id)
+                if variant is None or variant.product_id != product_id or not variant.product.is_active:
+                    continue
+                items.append(CartItem(product=variant.product, variant=variant, quantity=quantity))
+            elif product_id in products:
+                items.append(CartItem(product=products[product_id], quantity=quantity))
+        return items
+
+
+def line_key(value):
+    """(product_id, variant_id) for a cookie line id such as '12-0', or None"""
+    try:
+        product_id, variant_id = map(int, value.split('-'))
+    except ValueError:
+        return None
+    return product_id, variant_id
+
+
+def get_anonymous_cart(request):
+    """The request's cookie cart, read once per request"""
+    cart = getattr(request, '_anonymous_cart', None)
+    if cart is None:
+        value = request.COOKIES.get(COOKIE_NAME)
+        cart = AnonymousCart.loads(value) if value else AnonymousCart()
+        request._anonymous_cart = cart
+    return cart
+
+
+def _existing_lines(cart, items):
+    return {
+        (item.product_id, item.variant_id or 0): item
+        for item in cart.items.filter(product_id__in={item.product_id for item in items})
+    }
+
+
+def merge_into(user, anonymous_cart):
+    """
+    Add the cookie cart's lines to the user's Cart: one read of the lines
+    already there and one bulk upsert keyed on the item id. A line another
+    request added in between (a second login, another tab) breaks the
+    cart/product/variant unique constraints; the merge is then retried
+    against the lines as they are now.
+    """
+    for attempt in range(1, MERGE_ATTEMPTS + 1):
+        items = anonymous_cart.items()
+        if not items:
+            return 0
+        try:
+            with transaction.atomic():
+                cart, _ = Cart.objects.get_or_create(customer=user)
+                existing = _existing_lines(cart, items)
+                merged = []
+                for item in items:
+                    current = existing.get((item.product_id, item.variant_id or 0))
+                    if current is not None:
+                        current.quantity = min(current.quantity + item.quantity, MAX_QUANTITY)
+                        merged.append(current)
+                    else:
+                        item.cart = cart
+                        merged.append(item)
+                CartItem.objects.bulk_create(
+                    merged, update_conflicts=True, unique_fields=['id'], update_fields=['quantity', 'updated_at']
+                )
+            return len(merged)
+        except IntegrityError:
+            if attempt == MERGE_ATTEMPTS:
+                raise
+
+
+class AnonymousCartMiddleware:
+    """Writes a changed cookie cart back to the response"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.write_cookie(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.write_cookie(request, await self.get_response(request))
+
+    def write_cookie(self, request, response):
+        cart = getattr(request, '_anonymous_cart', None)
+        if cart is not None and cart.modified:
+            if cart.lines:
+                response.set_cookie(
+                    COOKIE_NAME, cart.dumps(), max_age=COOKIE_AGE, httponly=True, samesite='Lax',
+                    secure=settings.SESSION_COOKIE_SECURE,
+                )
+            else:
+                response.delete_cookie(COOKIE_NAME, samesite='Lax')
+        return response
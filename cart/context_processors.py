@@ -1,19 +1,34 @@
-from .models import Cart
+from .anonymous import get_anonymous_cart
+from .pricing import price_summary
+
+
+def cart_summary(request):
+    """
+    (subtotal, total_items) for the header. Reuses the priced cart when the
+    view built one (cart, checkout); elsewhere it is price_summary's single
+    query, remembered for the rest of the request.
+    """
+    priced = getattr(request, '_priced_cart', None)
+    if priced is not None:
+        return priced.subtotal, priced.total_items
+    summary = getattr(request, '_cart_summary', None)
+    if summary is None:
+        pricing, total_items = price_summary(request)
+        summary = request._cart_summary = (pricing.subtotal, total_items)
+    return summary
+
 
 def cart_context(request):
-    """Add cart information to all templates"""
-    cart_count = 0
-    cart_total = 0
-    
+    """
+    Add cart information to all templates. Values are callables, so nothing
+    is loaded unless a template uses them; a visitor's count comes straight
+    from the cart cookie.
+    """
     if request.user.is_authenticated:
-        try:
-            cart = Cart.objects.get(customer=request.user)
-            cart_count = cart.total_items
-            cart_total = cart.subtotal
-        except Cart.DoesNotExist:
-            pass
-    
+        cart_count = lambda: cart_summary(request)[1]  # noqa: E731
+    else:
+        cart_count = lambda: get_anonymous_cart(request).total_items  # noqa: E731
     return {
         'cart_count': cart_count,
-        'cart_total': cart_total,
+        'cart_total': lambda: cart_summary(request)[0],
     }
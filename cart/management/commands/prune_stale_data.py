@@ -0,0 +1,44 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from cart.models import CartItem
+from shopping_store.pruning import PRUNE_BATCH_SIZE, PRUNE_PAUSE, Archive, expired_sessions, prune, stale_carts
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired sessions and abandoned carts in small batches; meant to run on a schedule'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cart-age', type=int, default=settings.CART_RETENTION_DAYS,
+                            help='Days since a cart last changed before it is pruned')
+        parser.add_argument('--batch-size', type=int, default=PRUNE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=PRUNE_PAUSE, help='Seconds to sleep between batches')
+        parser.add_argument('--archive-dir', help='Write the pruned rows to gzipped JSON Lines here first')
+        parser.add_argument('--dry-run', action='store_true', help='Count what would be pruned')
+
+    def handle(self, *args, **options):
+        archive_dir = options['archive_dir']
+        if archive_dir and not os.access(archive_dir, os.W_OK):
+            raise CommandError(f'Cannot write archives to {archive_dir}.')
+
+        targets = [
+            ('sessions', expired_sessions(), ()),
+            ('carts', stale_carts(options['cart_age']), [(CartItem, 'cart')]),
+        ]
+        for name, queryset, related in targets:
+            if queryset is None:
+                self.stdout.write(f'Skipping {name}: sessions are not stored in the database.')
+                continue
+            if options['dry_run']:
+                self.stdout.write(f'Would prune {queryset.count()} {name}.')
+                continue
+            archive = Archive(archive_dir, name) if archive_dir else None
+            try:
+                deleted = prune(queryset, related, options['batch_size'], options['pause'], archive)
+            finally:
+                if archive is not None:
+                    archive.close()
+            message = f'Pruned {deleted} {name}.'
+            if archive is not None and archive.file is not None:
+                message += f' Archived to {archive.path}.'
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-19 09:37
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    """Fold repeated no-variant lines of a product into the oldest, summing quantities"""
+    CartItem = apps.get_model('cart', 'CartItem')
+    duplicates = (
+        CartItem.objects.filter(variant__isnull=True)
+        .values('cart_id', 'product_id')
+        .annotate(lines=Count('id'), keep_id=Min('id'), total=Sum('quantity'))
+        .filter(lines__gt=1)
+    )
+    for line in duplicates:
+        CartItem.objects.filter(pk=line['keep_id']).update(quantity=line['total'])
+        CartItem.objects.filter(
+            cart_id=line['cart_id'], product_id=line['product_id'], variant__isnull=True
+        ).exclude(pk=line['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('variant__isnull', True)), fields=('cart', 'product'), name='cart_item_unique_product_without_variant'),
+        ),
+    ]
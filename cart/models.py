@@ -1,6 +1,20 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils.functional import cached_property
 from catalog.models import Product, ProductVariant
+from shopping_store.money import NO_DISCOUNT, SHIPPING_COST, price_lines, to_minor
+
+
+def price_items(items, discount=NO_DISCOUNT):
+    """PricedLines for cart items whose product and variant are already loaded"""
+    items = list(items)
+    return price_lines(
+        [to_minor(item.product.price) for item in items],
+        [to_minor(item.variant.price_adjustment) if item.variant_id else 0 for item in items],
+        [item.quantity for item in items],
+        discount,
+        shipping=SHIPPING_COST if items else 0,
+    )
 
 
 class Cart(models.Model):
@@ -16,9 +30,21 @@ class Cart(models.Model):
     def total_items(self):
         return sum(item.quantity for item in self.items.all())
 
+    @cached_property
+    def pricing(self):
+        return price_items(self.items.select_related('product', 'variant'))
+
     @property
     def subtotal(self):
-        return sum(item.line_total for item in self.items.all())
+        return self.pricing.subtotal
+
+    @property
+    def tax(self):
+        return self.pricing.tax
+
+    @property
+    def total(self):
+        return self.pricing.total
 
 
 class CartItem(models.Model):
@@ -32,6 +58,13 @@ class CartItem(models.Model):
 
     class Meta:
         unique_together = ['cart', 'product', 'variant']
+        constraints = [
+            # unique_together never matches NULL variants, so plain products need their own
+            models.UniqueConstraint(
+                fields=['cart', 'product'], condition=models.Q(variant__isnull=True),
+                name='cart_item_unique_product_without_variant',
+            ),
+        ]
 
     @property
     def unit_price(self):
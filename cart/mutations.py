@@ -0,0 +1,36 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import CartItem
+
+
+def _increment(lines, quantity):
+    return lines.update(quantity=F('quantity') + quantity, updated_at=timezone.now())
+
+
+def add_item(cart, product, variant, quantity):
+    """
+    Add `quantity` of a product (and variant) to a saved cart as a single
+    UPDATE ... SET quantity = quantity + n, creating the line if there is
+    none. Concurrent adds of the same line are never lost: the one that
+    loses the race to create it increments the winner's row instead.
+    Returns the line with its product and variant loaded.
+    """
+    lines = CartItem.objects.filter(cart=cart, product=product, variant=variant)
+    if not _increment(lines, quantity):
+        try:
+            with transaction.atomic():
+                return CartItem.objects.create(cart=cart, product=product, variant=variant, quantity=quantity)
+        except IntegrityError:
+            _increment(lines, quantity)
+    return lines.select_related('product', 'variant').get()
+
+
+def set_quantity(item, quantity):
+    """Set a saved line's quantity in one UPDATE, or delete it when quantity is 0 or less"""
+    lines = CartItem.objects.filter(pk=item.pk)
+    if quantity > 0:
+        lines.update(quantity=quantity, updated_at=timezone.now())
+        item.quantity = quantity
+    else:
+        lines.delete()
@@ -0,0 +1,123 @@
+from typing import NamedTuple
+from catalog.cards import ProductCard, get_product_cards_by_id
+from shopping_store.money import NO_DISCOUNT, SHIPPING_COST, Money, price_lines, to_minor
+from .anonymous import get_anonymous_cart
+from .models import Cart, CartItem, price_items
+
+
+class CartLine(NamedTuple):
+    """A cart item with its product card and prices"""
+    item: object
+    card: ProductCard | None
+    unit_price: Money
+    line_total: Money
+
+    @property
+    def id(self):
+        # Cookie cart lines have no row and are addressed by product and variant
+        return self.item.id or f'{self.item.product_id}-{self.item.variant_id or 0}'
+
+    @property
+    def quantity(self):
+        return self.item.quantity
+
+    @property
+    def product(self):
+        return self.item.product
+
+    @property
+    def variant(self):
+        return self.item.variant
+
+
+class PricedCart(NamedTuple):
+    """Everything the cart, checkout and order creation read about a cart"""
+    cart: Cart | None
+    lines: list
+    total_items: int
+    subtotal: Money
+    discount: Money
+    tax: Money
+    shipping: Money
+    total: Money
+
+
+EMPTY_CART = PricedCart(None, [], 0, Money(), Money(), Money(), Money(), Money())
+
+
+class CartPricer:
+    """
+    Loads a cart's items with their products, variants, sizes and colours in
+    one query, the product cards (name, slug, primary image) in another, and
+    prices every line in a single pass.
+    """
+
+    def __init__(self, cart=None, items=None):
+        self.cart = cart
+        self._items = items
+
+    def items(self):
+        if self._items is not None:
+            return self._items
+        return list(
+            self.cart.items.select_related('product', 'variant__size', 'variant__color').order_by('added_at')
+        )
+
+    def price(self, discount=NO_DISCOUNT):
+        items = self.items()
+        if not items:
+            return EMPTY_CART._replace(cart=self.cart)
+        cards = get_product_cards_by_id(item.product_id for item in items)
+        pricing = price_items(items, discount)
+        lines = [
+            CartLine(item, cards.get(item.product_id), unit_price, line_total)
+            for item, unit_price, line_total in zip(items, pricing.unit_prices, pricing.line_totals)
+        ]
+        return PricedCart(
+            self.cart, lines, sum(item.quantity for item in items),
+            pricing.subtotal, pricing.discount, pricing.tax, pricing.shipping, pricing.total,
+        )
+
+
+def get_priced_cart(request, cart=None):
+    """
+    The priced cart for this request, computed on first use and shared by
+    the view, the templates and the cart context processor. Visitors who
+    aren't logged in get their cookie cart.
+    """
+    priced = getattr(request, '_priced_cart', None)
+    if priced is None:
+        if not request.user.is_authenticated:
+            anonymous_cart = get_anonymous_cart(request)
+            priced = CartPricer(items=anonymous_cart.items()).price() if anonymous_cart.lines else EMPTY_CART
+        else:
+            if cart is None:
+                cart = Cart.objects.filter(customer=request.user).first()
+            priced = CartPricer(cart).price() if cart is not None else EMPTY_CART
+        request._priced_cart = priced
+    return priced
+
+
+def price_summary(request):
+    """
+    (PricedLines, total_items) for the request's cart without its product
+    cards or images: one query over the saved lines' prices and quantities,
+    or the cookie cart's lines for visitors.
+    """
+    if request.user.is_authenticated:
+        rows = list(
+            CartItem.objects.filter(cart__customer=request.user)
+            .values_list('product__price', 'variant__price_adjustment', 'quantity')
+        )
+    else:
+        rows = [
+            (item.product.price, item.variant.price_adjustment if item.variant_id else None, item.quantity)
+            for item in get_anonymous_cart(request).items()
+        ]
+    pricing = price_lines(
+        [to_minor(price) for price, _, _ in rows],
+        [to_minor(adjustment) if adjustment is not None else 0 for _, adjustment, _ in rows],
+        [quantity for _, _, quantity in rows],
+        shipping=SHIPPING_COST if rows else 0,
+    )
+    return pricing, sum(quantity for _, _, quantity in rows)
@@ -0,0 +1,14 @@
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+from .anonymous import get_anonymous_cart, merge_into
+
+
+@receiver(user_logged_in)
+def merge_anonymous_cart(sender, request, user, **kwargs):
+    """Move the visitor's cookie cart into their saved cart when they log in"""
+    if request is None:
+        return
+    anonymous_cart = get_anonymous_cart(request)
+    if anonymous_cart.lines:
+        merge_into(user, anonymous_cart)
+        anonymous_cart.clear()
@@ -1,3 +1,455 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from catalog.models import Category, Color, Product, ProductVariant, Size
+from shopping_store.money import Discount, Money, price_lines, round_div, to_minor
+from shopping_store.testing import StoreTestCase
+from customers.models import Address
+from .anonymous import COOKIE_NAME, AnonymousCart
+from . import anonymous, mutations
+from .context_processors import cart_context
+from .models import Cart, CartItem, Wishlist, WishlistItem
+from .pricing import CartPricer, get_priced_cart
 
-# Create your tests here.
+
+class CartAdminQueryCountTests(StoreTestCase):
+    """Cart and wishlist changelists must render in a constant number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        category = Category.objects.create(name='Tops')
+        cls.product = Product.objects.create(
+            name='Tee', sku='TEE-1', description='Tee', category=category, price=Decimal('10.00')
+        )
+        cls.variant = ProductVariant.objects.create(
+            product=cls.product, size=Size.objects.create(name='Medium', code='M'),
+            color=Color.objects.create(name='Red', code='#ff0000'),
+            sku='TEE-1-M-RED', price_adjustment=Decimal('2.50')
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_carts(self, count):
+        for _ in range(count):
+            user = User.objects.create_user(f'shopper{Cart.objects.count()}')
+            cart = Cart.objects.create(customer=user)
+            CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+            CartItem.objects.create(cart=cart, product=self.product, variant=self.variant, quantity=1)
+            wishlist = Wishlist.objects.create(customer=user)
+            WishlistItem.objects.create(wishlist=wishlist, product=self.product)
+
+    def test_cart_changelist(self):
+        self.assertConstantQueries('/admin/cart/cart/', self.add_carts)
+
+    def test_cart_item_changelist(self):
+        self.assertConstantQueries('/admin/cart/cartitem/', self.add_carts)
+
+    def test_wishlist_changelist(self):
+        self.assertConstantQueries('/admin/cart/wishlist/', self.add_carts)
+
+    def test_cart_subtotal_column(self):
+        self.add_carts(1)
+        response = self.client.get('/admin/cart/cart/')
+        cart = response.context['cl'].result_list[0]
+        self.assertEqual(cart.items_quantity, 3)
+        self.assertEqual(cart.subtotal_amount, cart.subtotal)
+
+
+class MoneyTests(SimpleTestCase):
+    """Pricing runs on integer paise and rounds half up in one place"""
+
+    def test_conversion_and_rounding(self):
+        self.assertEqual(to_minor(Decimal('19.99')), 1999)
+        self.assertEqual(to_minor(Decimal('0.005')), 1)
+        self.assertEqual(round_div(5, 10), 1)
+        self.assertEqual(round_div(-5, 10), -1)
+        self.assertEqual(round_div(4, 10), 0)
+        self.assertEqual(str(Money(1050)), '10.50')
+        self.assertEqual(f'{Money(123456):,.2f}', '1,234.56')
+        self.assertEqual(sum([Money(100), Money(250)]), Money(350))
+        self.assertEqual(Money(1000), Decimal('10.00'))
+
+    def test_price_lines(self):
+        pricing = price_lines([1000, 1999], [250, 0], [2, 3], discount=Discount(rate=1000, cap=500))
+        self.assertEqual(pricing.line_totals, [Money(2500), Money(5997)])
+        self.assertEqual(pricing.subtotal, Money(8497))
+        # 10% of 84.97 is 8.497, rounded half up
+        self.assertEqual(pricing.tax, Money(850))
+        self.assertEqual(pricing.discount, Money(500))
+        self.assertEqual(pricing.total, Money(8497 + 850 + 1000 - 500))
+
+    def test_discount_never_exceeds_subtotal(self):
+        pricing = price_lines([500], [0], [1], discount=Discount(fixed=2000), shipping=0)
+        self.assertEqual(pricing.discount, Money(500))
+        self.assertEqual(pricing.total, Money(50))
+
+
+class CartPricingTests(TestCase):
+
+    def test_cart_totals_in_one_query(self):
+        category = Category.objects.create(name='Tops')
+        product = Product.objects.create(
+            name='Tee', sku='TEE-1', description='Tee', category=category, price=Decimal('10.00')
+        )
+        variant = ProductVariant.objects.create(
+            product=product, size=Size.objects.create(name='Medium', code='M'),
+            color=Color.objects.create(name='Red', code='#ff0000'), sku='TEE-1-M', price_adjustment=Decimal('2.55')
+        )
+        cart = Cart.objects.create(customer=User.objects.create_user('shopper'))
+        CartItem.objects.create(cart=cart, product=product, quantity=2)
+        CartItem.objects.create(cart=cart, product=product, variant=variant, quantity=1)
+
+        cart = Cart.objects.get(pk=cart.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(cart.subtotal, Decimal('32.55'))
+            self.assertEqual(cart.tax, Decimal('3.26'))
+            self.assertEqual(cart.total, Decimal('45.81'))
+
+
+class CartPricerTests(StoreTestCase):
+    """The cart is loaded and priced once per request, in a fixed number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('shopper')
+        cls.category = Category.objects.create(name='Tops')
+        cls.size = Size.objects.create(name='Medium', code='M')
+        cls.color = Color.objects.create(name='Red', code='#ff0000')
+        cls.cart = Cart.objects.create(customer=cls.user)
+        Address.objects.create(
+            customer=cls.user, address_type='SHIPPING', full_name='C', phone='1',
+            address_line1='Street', city='City', state='State', postal_code='1'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_lines(self, count):
+        for _ in range(count):
+            n = Product.objects.count()
+            product = Product.objects.create(
+                name=f'Tee {n}', sku=f'TEE-{n}', description='Tee', category=self.category, price=Decimal('10.00')
+            )
+            variant = ProductVariant.objects.create(
+                product=product, size=self.size, color=self.color, sku=f'TEE-{n}-M',
+                price_adjustment=Decimal('1.25')
+            )
+            CartItem.objects.create(cart=self.cart, product=product, variant=variant, quantity=2)
+
+    def test_price(self):
+        self.add_lines(2)
+        priced = CartPricer(self.cart).price()
+        self.assertEqual(priced.total_items, 4)
+        self.assertEqual(priced.lines[0].unit_price, Decimal('11.25'))
+        self.assertEqual(priced.lines[0].line_total, Decimal('22.50'))
+        self.assertEqual(priced.lines[0].card.name, 'Tee 0')
+        self.assertEqual(priced.subtotal, Decimal('45.00'))
+        self.assertEqual(priced.total, Decimal('59.50'))
+
+    def test_priced_once_per_request(self):
+        self.add_lines(1)
+        request = type('Request', (), {'user': self.user})()
+        first = get_priced_cart(request)
+        with self.assertNumQueries(0):
+            self.assertIs(get_priced_cart(request), first)
+
+    def test_header_totals_in_one_query(self):
+        self.add_lines(3)
+        request = type('Request', (), {'user': self.user})()
+        context = cart_context(request)
+        with self.assertNumQueries(1):
+            self.assertEqual(context['cart_count'](), 6)
+            self.assertEqual(context['cart_total'](), Decimal('67.50'))
+
+        # Pages that priced the whole cart don't query again
+        request = type('Request', (), {'user': self.user})()
+        get_priced_cart(request)
+        context = cart_context(request)
+        with self.assertNumQueries(0):
+            self.assertEqual(context['cart_count'](), 6)
+            self.assertEqual(context['cart_total'](), Decimal('67.50'))
+
+    def test_cart_page(self):
+        self.assertConstantQueries('/cart/', self.add_lines)
+
+    def test_checkout_page(self):
+        self.assertConstantQueries('/orders/checkout/', self.add_lines)
+
+
+class AnonymousCartTests(StoreTestCase):
+    """Visitors keep their cart in a signed cookie until they log in"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('shopper', password='secret-pass-1')
+        category = Category.objects.create(name='Tops')
+        size = Size.objects.create(name='Medium', code='M')
+        color = Color.objects.create(name='Red', code='#ff0000')
+        cls.product = Product.objects.create(
+            name='Tee', sku='TEE', description='Tee', category=category, price=Decimal('10.00')
+        )
+        cls.variant = ProductVariant.objects.create(
+            product=cls.product, size=size, color=color, sku='TEE-M', price_adjustment=Decimal('1.25')
+        )
+        cls.plain = Product.objects.create(
+            name='Cap', sku='CAP', description='Cap', category=category, price=Decimal('5.00')
+        )
+
+    def add(self, product, variant=None, quantity=1):
+        data = {'quantity': quantity}
+        if variant:
+            data['variant_id'] = variant.id
+        return self.client.post(f'/cart/add/{product.id}/', data)
+
+    def test_add_writes_cookie_not_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.add(self.product, self.variant, 2)
+            self.add(self.plain)
+        self.assertFalse([q for q in queries if not q['sql'].startswith('SELECT')])
+        self.assertFalse(Cart.objects.exists())
+        cart = AnonymousCart.loads(self.client.cookies[COOKIE_NAME].value)
+        self.assertEqual(cart.lines, {(self.product.id, self.variant.id): 2, (self.plain.id, 0): 1})
+
+        response = self.client.get('/cart/')
+        self.assertEqual(response.context['priced_cart'].total_items, 3)
+        self.assertEqual(response.context['priced_cart'].subtotal, Decimal('27.50'))
+
+    def test_update_and_remove(self):
+        self.add(self.product, self.variant)
+        self.add(self.plain)
+        self.client.post(f'/cart/update/{self.product.id}-{self.variant.id}/', {'quantity': 4})
+        self.client.post(f'/cart/remove/{self.plain.id}-0/')
+        cart = AnonymousCart.loads(self.client.cookies[COOKIE_NAME].value)
+        self.assertEqual(cart.lines, {(self.product.id, self.variant.id): 4})
+        self.assertEqual(self.client.post('/cart/remove/999-0/').status_code, 404)
+
+    def test_tampered_cookie_is_ignored(self):
+        self.add(self.plain)
+        value = self.client.cookies[COOKIE_NAME].value
+        self.client.cookies[COOKIE_NAME] = value.replace(f'{self.plain.id}.0.1', f'{self.plain.id}.0.9')
+        response = self.client.get('/cart/')
+        self.assertEqual(response.context['priced_cart'].total_items, 0)
+
+    def test_badge_reads_cookie(self):
+        self.add(self.plain, quantity=3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/account/login/')
+        self.assertFalse([q for q in queries if 'cart_' in q['sql']])
+        self.assertContains(response, '<span class="cart-badge">3</span>', html=True)
+
+    def test_login_merges_cart(self):
+        cart = Cart.objects.create(customer=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, variant=self.variant, quantity=1)
+        self.add(self.product, self.variant, 2)
+        self.add(self.plain)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post('/account/login/', {'username': 'shopper', 'password': 'secret-pass-1'})
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "cart_cartitem"')]
+        self.assertLessEqual(len(inserts), 2)
+        self.assertEqual(
+            dict(cart.items.values_list('product_id', 'quantity')), {self.product.id: 3, self.plain.id: 1}
+        )
+        self.assertEqual(self.client.cookies[COOKIE_NAME].value, '')
+
+    def test_merge_retries_line_added_meanwhile(self):
+        # Another login or tab inserts the line between the merge's read and its upsert
+        cart = Cart.objects.create(customer=self.user)
+        CartItem.objects.create(cart=cart, product=self.plain, quantity=1)
+        self.add(self.plain, quantity=2)
+        reads = [{}]
+        real = anonymous._existing_lines
+        with mock.patch.object(anonymous, '_existing_lines', lambda *args: reads.pop() if reads else real(*args)):
+            self.client.post('/account/login/', {'username': 'shopper', 'password': 'secret-pass-1'})
+        self.assertEqual(list(cart.items.values_list('product_id', 'quantity')), [(self.plain.id, 3)])
+
+
+class CartMutationTests(StoreTestCase):
+    """Cart changes are atomic increments and the JSON endpoints return only what changed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('shopper')
+        cls.other = User.objects.create_user('other')
+        category = Category.objects.create(name='Tops')
+        size = Size.objects.create(name='Medium', code='M')
+        color = Color.objects.create(name='Red', code='#ff0000')
+        cls.product = Product.objects.create(
+            name='Tee', sku='TEE', description='Tee', category=category, price=Decimal('10.00')
+        )
+        cls.variant = ProductVariant.objects.create(
+            product=cls.product, size=size, color=color, sku='TEE-M', price_adjustment=Decimal('1.25')
+        )
+        cls.plain = Product.objects.create(
+            name='Cap', sku='CAP', description='Cap', category=category, price=Decimal('5.00')
+        )
+        cls.cart = Cart.objects.create(customer=cls.user)
+
+    def test_add_increments_in_database(self):
+        stale = CartItem.objects.create(cart=self.cart, product=self.product, variant=self.variant, quantity=1)
+        CartItem.objects.filter(pk=stale.pk).update(quantity=4)
+        item = mutations.add_item(self.cart, self.product, self.variant, 2)
+        self.assertEqual(item.pk, stale.pk)
+        self.assertEqual(item.quantity, 6)
+
+    def test_add_that_loses_create_race_increments(self):
+        # Another request creates the line between this one's UPDATE and INSERT
+        CartItem.objects.create(cart=self.cart, product=self.plain, quantity=1)
+        increment = mutations._increment
+        calls = []
+
+        def racing_increment(lines, quantity):
+            calls.append(quantity)
+            return 0 if len(calls) == 1 else increment(lines, quantity)
+
+        with mock.patch.object(mutations, '_increment', racing_increment):
+            item = mutations.add_item(self.cart, self.plain, None, 2)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(item.quantity, 3)
+        self.assertEqual(CartItem.objects.filter(product=self.plain).count(), 1)
+
+    def test_api_add(self):
+        self.client.force_login(self.user)
+        self.client.post(f'/cart/api/add/{self.product.id}/', {'variant_id': self.variant.id})
+        response = self.client.post(f'/cart/api/add/{self.product.id}/', {'variant_id': self.variant.id, 'quantity': 2})
+        data = response.json()
+        self.assertEqual(data['line']['quantity'], 3)
+        self.assertEqual(data['line']['unit_price'], '11.25')
+        self.assertEqual(data['line']['line_total'], '33.75')
+        self.assertEqual(data['summary'], {
+            'total_items': 3, 'subtotal': '33.75', 'tax': '3.38', 'shipping': '10.00', 'total': '47.13',
+        })
+        self.assertEqual(self.client.post(f'/cart/api/add/{self.product.id}/', {'quantity': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(f'/cart/api/add/{self.product.id}/').status_code, 405)
+
+    def test_api_update_and_remove(self):
+        self.client.force_login(self.user)
+        line = CartItem.objects.create(cart=self.cart, product=self.product, variant=self.variant, quantity=1)
+        plain = CartItem.objects.create(cart=self.cart, product=self.plain, quantity=1)
+
+        data = self.client.post(f'/cart/api/update/{line.id}/', {'quantity': 3}).json()
+        self.assertEqual(data['line'], {'id': line.id, 'quantity': 3, 'unit_price': '11.25', 'line_total': '33.75'})
+        self.assertEqual(data['summary']['total_items'], 4)
+
+        data = self.client.post(f'/cart/api/remove/{plain.id}/').json()
+        self.assertEqual(data['removed'], plain.id)
+        self.assertIsNone(data['line'])
+        self.assertEqual(data['summary']['subtotal'], '33.75')
+
+        data = self.client.post(f'/cart/api/update/{line.id}/', {'quantity': 0}).json()
+        self.assertEqual(data['removed'], line.id)
+        self.assertEqual(data['summary']['total'], '0.00')
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_api_only_touches_own_lines(self):
+        line = CartItem.objects.create(cart=self.cart, product=self.plain, quantity=1)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.post(f'/cart/api/update/{line.id}/', {'quantity': 5}).status_code, 404)
+        self.assertEqual(self.client.post(f'/cart/api/remove/{line.id}/').status_code, 404)
+        self.assertEqual(self.client.post(f'/cart/api/remove/{self.plain.id}-0/').status_code, 404)
+        self.assertEqual(self.client.post(f'/cart/remove/{self.plain.id}-0/').status_code, 404)
+        line.refresh_from_db()
+        self.assertEqual(line.quantity, 1)
+
+    def test_api_anonymous(self):
+        self.client.post(f'/cart/api/add/{self.plain.id}/', {'quantity': 2})
+        data = self.client.post(f'/cart/api/update/{self.plain.id}-0/', {'quantity': 5}).json()
+        self.assertEqual(data['line'], {'id': f'{self.plain.id}-0', 'quantity': 5, 'unit_price': '5.00', 'line_total': '25.00'})
+        self.assertEqual(data['summary']['total_items'], 5)
+        self.assertEqual(AnonymousCart.loads(self.client.cookies[COOKIE_NAME].value).lines, {(self.plain.id, 0): 5})
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_api_anonymous_drops_unavailable_line(self):
+        self.client.post(f'/cart/api/add/{self.plain.id}/', {'quantity': 2})
+        self.plain.is_active = False
+        self.plain.save(update_fields=['is_active'])
+        response = self.client.post(f'/cart/api/update/{self.plain.id}-0/', {'quantity': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['removed'], f'{self.plain.id}-0')
+        self.assertEqual(AnonymousCart.loads(self.client.cookies[COOKIE_NAME].value).lines, {})
+
+    def test_api_skips_product_cards(self):
+        self.client.force_login(self.user)
+        line = CartItem.objects.create(cart=self.cart, product=self.product, variant=self.variant, quantity=1)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(f'/cart/api/update/{line.id}/', {'quantity': 2})
+        self.assertFalse([q for q in queries if 'catalog_productimage' in q['sql']])
+
+
+class PruneStaleDataTests(TestCase):
+    """prune_stale_data removes expired sessions and abandoned carts in batches"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Tops')
+        cls.product = Product.objects.create(
+            name='Tee', sku='TEE', description='Tee', category=category, price=Decimal('10.00')
+        )
+        now = timezone.now()
+        old = now - timedelta(days=120)
+        cls.abandoned = []
+        for n in range(5):
+            cart = Cart.objects.create(customer=User.objects.create_user(f'gone{n}'))
+            CartItem.objects.create(cart=cart, product=cls.product, quantity=n + 1)
+            cls.abandoned.append(cart.pk)
+        cls.recent = Cart.objects.create(customer=User.objects.create_user('recent'))
+        cls.touched = Cart.objects.create(customer=User.objects.create_user('touched'))
+        CartItem.objects.create(cart=cls.touched, product=cls.product)
+        Cart.objects.filter(pk__in=cls.abandoned + [cls.touched.pk]).update(updated_at=old)
+        CartItem.objects.filter(cart__in=cls.abandoned).update(updated_at=old)
+
+        Session.objects.create(session_key='expired1', session_data='x', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='expired2', session_data='x', expire_date=now - timedelta(seconds=1))
+        Session.objects.create(session_key='current', session_data='x', expire_date=now + timedelta(days=1))
+
+    def prune(self, *args):
+        out = io.StringIO()
+        call_command('prune_stale_data', '--batch-size=2', '--pause=0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_prunes_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            output = self.prune()
+        self.assertIn('Pruned 2 sessions.', output)
+        self.assertIn('Pruned 5 carts.', output)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['current'])
+        self.assertEqual(set(Cart.objects.values_list('pk', flat=True)), {self.recent.pk, self.touched.pk})
+        self.assertEqual(CartItem.objects.count(), 1)
+        cart_deletes = [q for q in queries if q['sql'].startswith('DELETE FROM "cart_cart"')]
+        self.assertEqual(len(cart_deletes), 3)
+
+    def test_dry_run(self):
+        output = self.prune('--dry-run')
+        self.assertIn('Would prune 5 carts.', output)
+        self.assertEqual(Cart.objects.count(), 7)
+        self.assertEqual(Session.objects.count(), 3)
+
+    def test_archive(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.prune(f'--archive-dir={directory}')
+            archives = {name.split('-')[0]: name for name in os.listdir(directory)}
+            with gzip.open(os.path.join(directory, archives['carts']), 'rt') as archive:
+                rows = [json.loads(line) for line in archive]
+        carts = [row for row in rows if row['model'] == 'cart.cart']
+        items = [row for row in rows if row['model'] == 'cart.cartitem']
+        self.assertEqual(sorted(row['fields']['id'] for row in carts), self.abandoned)
+        self.assertEqual(sorted(row['fields']['quantity'] for row in items), [1, 2, 3, 4, 5])
+        self.assertIn('sessions', archives)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_skips_sessions_outside_database(self):
+        self.assertIn('Skipping sessions', self.prune())
+        self.assertEqual(Session.objects.count(), 3)
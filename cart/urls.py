@@ -6,8 +6,11 @@ app_name = 'cart'
 urlpatterns = [
     path('', views.cart_detail, name='cart_detail'),
     path('add/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
-    path('update/<int:item_id>/', views.update_cart_item, name='update_cart_item'),
-    path('remove/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
+    path('update/<str:item_id>/', views.update_cart_item, name='update_cart_item'),
+    path('remove/<str:item_id>/', views.remove_from_cart, name='remove_from_cart'),
+    path('api/add/<int:product_id>/', views.api_add_to_cart, name='api_add_to_cart'),
+    path('api/update/<str:item_id>/', views.api_update_cart_item, name='api_update_cart_item'),
+    path('api/remove/<str:item_id>/', views.api_remove_from_cart, name='api_remove_from_cart'),
     path('wishlist/', views.wishlist_detail, name='wishlist_detail'),
     path('wishlist/add/<int:product_id>/', views.add_to_wishlist, name='add_to_wishlist'),
     path('wishlist/remove/<int:item_id>/', views.remove_from_wishlist, name='remove_from_wishlist'),
@@ -1,23 +1,32 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from .models import Cart, CartItem, Wishlist, WishlistItem
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_POST
+from .anonymous import get_anonymous_cart, line_key
+from .models import Cart, CartItem, Wishlist, WishlistItem, price_items
+from .mutations import add_item, set_quantity
+from .pricing import get_priced_cart, price_summary
 from catalog.models import Product, ProductVariant
+from catalog.cards import get_product_cards_by_id
 
 
-@login_required
 def cart_detail(request):
     """Display shopping cart"""
-    cart, created = Cart.objects.get_or_create(customer=request.user)
-    return render(request, 'cart/cart_detail.html', {'cart': cart})
+    priced_cart = get_priced_cart(request)
+
+    return render(request, 'cart/cart_detail.html', {
+        'cart': priced_cart.cart,
+        'priced_cart': priced_cart,
+        'items': priced_cart.lines,
+        'total_items': priced_cart.total_items,
+        'subtotal': priced_cart.subtotal,
+    })
 
 
-@login_required
 def add_to_cart(request, product_id):
     """Add product to cart"""
     product = get_object_or_404(Product, id=product_id, is_active=True)
-    cart, created = Cart.objects.get_or_create(customer=request.user)
     
     variant_id = request.POST.get('variant_id')
     quantity = int(request.POST.get('quantity', 1))
@@ -25,27 +34,45 @@ def add_to_cart(request, product_id):
     variant = None
     if variant_id:
         variant = get_object_or_404(ProductVariant, id=variant_id, product=product)
-    
-    cart_item, created = CartItem.objects.get_or_create(
-        cart=cart,
-        product=product,
-        variant=variant,
-        defaults={'quantity': quantity}
-    )
-    
-    if not created:
-        cart_item.quantity += quantity
-        cart_item.save()
+
+    if not request.user.is_authenticated:
+        if get_anonymous_cart(request).add(product.id, variant.id if variant else None, quantity):
+            messages.success(request, f'{product.name} added to cart!')
+        else:
+            messages.error(request, 'Your cart is full. Log in to add more items.')
+        return redirect('cart:cart_detail')
+
+    cart, created = Cart.objects.get_or_create(customer=request.user)
+    add_item(cart, product, variant, quantity)
     
     messages.success(request, f'{product.name} added to cart!')
     return redirect('cart:cart_detail')
 
 
-@login_required
+def _anonymous_line(request, item_id):
+    key = line_key(item_id)
+    if key not in get_anonymous_cart(request).lines:
+        raise Http404('No such item in your cart')
+    return key
+
+
+def _saved_lines(request, item_id):
+    """The user's saved line `item_id`, which must be a row id rather than a cookie line id"""
+    if not item_id.isdigit():
+        return CartItem.objects.none()
+    return CartItem.objects.filter(id=item_id, cart__customer=request.user)
+
+
 def update_cart_item(request, item_id):
     """Update cart item quantity"""
-    cart_item = get_object_or_404(CartItem, id=item_id, cart__customer=request.user)
     quantity = int(request.POST.get('quantity', 1))
+
+    if not request.user.is_authenticated:
+        get_anonymous_cart(request).update(_anonymous_line(request, item_id), quantity)
+        messages.success(request, 'Cart updated!' if quantity > 0 else 'Item removed from cart!')
+        return redirect('cart:cart_detail')
+
+    cart_item = get_object_or_404(_saved_lines(request, item_id))
     
     if quantity > 0:
         cart_item.quantity = quantity
@@ -58,21 +85,145 @@ def update_cart_item(request, item_id):
     return redirect('cart:cart_detail')
 
 
-@login_required
 def remove_from_cart(request, item_id):
     """Remove item from cart"""
-    cart_item = get_object_or_404(CartItem, id=item_id, cart__customer=request.user)
+    if not request.user.is_authenticated:
+        get_anonymous_cart(request).remove(_anonymous_line(request, item_id))
+        messages.success(request, 'Item removed from cart!')
+        return redirect('cart:cart_detail')
+
+    cart_item = get_object_or_404(_saved_lines(request, item_id))
     product_name = cart_item.product.name
     cart_item.delete()
     messages.success(request, f'{product_name} removed from cart!')
     return redirect('cart:cart_detail')
 
 
+def _cart_json(request, line=None, removed=None):
+    """The changed line (None if it was removed) and the cart's new totals"""
+    pricing, total_items = price_summary(request)
+    data = {
+        'line': line,
+        'summary': {
+            'total_items': total_items,
+            'subtotal': str(pricing.subtotal),
+            'tax': str(pricing.tax),
+            'shipping': str(pricing.shipping),
+            'total': str(pricing.total),
+        },
+    }
+    if removed is not None:
+        data['removed'] = removed
+    return JsonResponse(data)
+
+
+def _line_json(line_id, item):
+    pricing = price_items([item])
+    return {
+        'id': line_id,
+        'quantity': item.quantity,
+        'unit_price': str(pricing.unit_prices[0]),
+        'line_total': str(pricing.line_totals[0]),
+    }
+
+
+def _json_quantity(request, default=None):
+    try:
+        return int(request.POST.get('quantity', default))
+    except (TypeError, ValueError):
+        return None
+
+
+def _json_error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+@require_POST
+def api_add_to_cart(request, product_id):
+    """Add a product to the cart and return the changed line and new totals as JSON"""
+    product = Product.objects.filter(id=product_id, is_active=True).first()
+    if product is None:
+        return _json_error('Product not found.', status=404)
+    quantity = _json_quantity(request, default=1)
+    if quantity is None or quantity < 1:
+        return _json_error('Quantity must be a positive number.')
+    variant = None
+    if request.POST.get('variant_id'):
+        variant = ProductVariant.objects.filter(id=request.POST['variant_id'], product=product).first()
+        if variant is None:
+            return _json_error('Variant not found.', status=404)
+
+    if not request.user.is_authenticated:
+        anonymous_cart = get_anonymous_cart(request)
+        if not anonymous_cart.add(product.id, variant.id if variant else None, quantity):
+            return _json_error('Your cart is full. Log in to add more items.')
+        key = (product.id, variant.id if variant else 0)
+        item = CartItem(product=product, variant=variant, quantity=anonymous_cart.lines[key])
+        return _cart_json(request, _line_json(f'{key[0]}-{key[1]}', item))
+
+    cart, created = Cart.objects.get_or_create(customer=request.user)
+    item = add_item(cart, product, variant, quantity)
+    return _cart_json(request, _line_json(item.id, item))
+
+
+@require_POST
+def api_update_cart_item(request, item_id):
+    """Set a line's quantity (0 removes it) and return the changed line and new totals as JSON"""
+    quantity = _json_quantity(request)
+    if quantity is None:
+        return _json_error('Quantity must be a number.')
+
+    if not request.user.is_authenticated:
+        anonymous_cart = get_anonymous_cart(request)
+        key = line_key(item_id)
+        if key not in anonymous_cart.lines:
+            return _json_error('No such item in your cart.', status=404)
+        anonymous_cart.update(key, quantity)
+        if quantity <= 0:
+            return _cart_json(request, removed=item_id)
+        item = next((item for item in anonymous_cart.items() if (item.product_id, item.variant_id or 0) == key), None)
+        if item is None:
+            # The product or variant was deactivated or deleted since it was added
+            anonymous_cart.remove(key)
+            return _cart_json(request, removed=item_id)
+        return _cart_json(request, _line_json(item_id, item))
+
+    item = _saved_lines(request, item_id).select_related('product', 'variant').first()
+    if item is None:
+        return _json_error('No such item in your cart.', status=404)
+    set_quantity(item, quantity)
+    if quantity <= 0:
+        return _cart_json(request, removed=item.id)
+    return _cart_json(request, _line_json(item.id, item))
+
+
+@require_POST
+def api_remove_from_cart(request, item_id):
+    """Remove a line and return the new totals as JSON"""
+    if not request.user.is_authenticated:
+        anonymous_cart = get_anonymous_cart(request)
+        key = line_key(item_id)
+        if key not in anonymous_cart.lines:
+            return _json_error('No such item in your cart.', status=404)
+        anonymous_cart.remove(key)
+        return _cart_json(request, removed=item_id)
+
+    deleted, _ = _saved_lines(request, item_id).delete()
+    if not deleted:
+        return _json_error('No such item in your cart.', status=404)
+    return _cart_json(request, removed=int(item_id))
+
+
 @login_required
 def wishlist_detail(request):
     """Display wishlist"""
     wishlist, created = Wishlist.objects.get_or_create(customer=request.user)
-    return render(request, 'cart/wishlist_detail.html', {'wishlist': wishlist})
+    items = list(wishlist.items.only('id', 'product_id'))
+    cards = get_product_cards_by_id(item.product_id for item in items)
+    for item in items:
+        item.card = cards[item.product_id]
+
+    return render(request, 'cart/wishlist_detail.html', {'wishlist': wishlist, 'items': items})
 
 
 @login_required
@@ -1,11 +1,16 @@
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
+from shopping_store.admin_mixins import ComputedColumnsMixin, ExportMixin, IndexedSearchMixin
+from .exports import PRODUCT_EXPORT
 from .models import Category, Brand, Product, ProductImage, Size, Color, ProductVariant, Review, Banner
 
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(ComputedColumnsMixin, admin.ModelAdmin):
     list_display = ['name', 'parent', 'is_active', 'product_count', 'created_at']
+    list_select_related = ['parent']
+    computed_columns = {'products_total': Count('products')}
     list_filter = ['is_active', 'created_at', 'parent']
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
@@ -28,21 +33,24 @@ class CategoryAdmin(admin.ModelAdmin):
     )
 
     def product_count(self, obj):
-        return obj.products.count()
+        return obj.products_total
     product_count.short_description = 'Products'
+    product_count.admin_order_field = 'products_total'
 
 
 @admin.register(Brand)
-class BrandAdmin(admin.ModelAdmin):
+class BrandAdmin(ComputedColumnsMixin, admin.ModelAdmin):
     list_display = ['name', 'website', 'is_active', 'product_count', 'created_at']
+    computed_columns = {'products_total': Count('products')}
     list_filter = ['is_active', 'created_at']
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
     readonly_fields = ['created_at']
 
     def product_count(self, obj):
-        return obj.products.count()
+        return obj.products_total
     product_count.short_description = 'Products'
+    product_count.admin_order_field = 'products_total'
 
 
 class ProductImageInline(admin.TabularInline):
@@ -58,14 +66,19 @@ class ProductVariantInline(admin.TabularInline):
 
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(ExportMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['name', 'sku', 'category', 'brand', 'price_display', 'stock_status', 
                    'is_active', 'is_featured', 'created_at']
     list_filter = ['is_active', 'is_featured', 'gender', 'category', 'brand', 'created_at']
+    list_select_related = ['category', 'brand']
     search_fields = ['name', 'sku', 'description']
+    exact_search_fields = ['sku']
+    fulltext_search_fields = ['description']
     prepopulated_fields = {'slug': ('name',)}
-    readonly_fields = ['created_at', 'updated_at', 'discount_percentage']
+    readonly_fields = ['created_at', 'updated_at', 'discount_percentage', 'rating_avg', 'rating_count']
     inlines = [ProductImageInline, ProductVariantInline]
+    actions = ['export_csv', 'export_csv_gzip', 'export_jsonl']
+    export = PRODUCT_EXPORT
     
     list_editable = ['is_active', 'is_featured']
     list_per_page = 50
@@ -89,6 +102,10 @@ class ProductAdmin(admin.ModelAdmin):
         ('Status & Features', {
             'fields': ('is_active', 'is_featured')
         }),
+        ('Ratings', {
+            'fields': ('rating_avg', 'rating_count'),
+            'classes': ('collapse',)
+        }),
         ('SEO', {
             'fields': ('meta_title', 'meta_description', 'meta_keywords'),
             'classes': ('collapse',)
@@ -130,6 +147,7 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(ProductImage)
 class ProductImageAdmin(admin.ModelAdmin):
     list_display = ['id', 'product', 'image_preview', 'is_primary', 'display_order']
+    list_select_related = ['product']
     list_filter = ['is_primary', 'created_at']
     search_fields = ['product__name', 'alt_text']
     list_editable = ['display_order', 'is_primary']
@@ -165,17 +183,21 @@ class ColorAdmin(admin.ModelAdmin):
 @admin.register(ProductVariant)
 class ProductVariantAdmin(admin.ModelAdmin):
     list_display = ['product', 'size', 'color', 'sku', 'final_price', 'stock_quantity', 'is_active']
+    list_select_related = ['product', 'size', 'color']
     list_filter = ['is_active', 'size', 'color', 'product__category']
     search_fields = ['product__name', 'sku']
     list_editable = ['is_active']
 
 
 @admin.register(Review)
-class ReviewAdmin(admin.ModelAdmin):
+class ReviewAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ['product', 'customer_name', 'rating_display', 'is_verified_purchase', 
                    'is_approved', 'created_at']
+    list_select_related = ['product']
     list_filter = ['rating', 'is_verified_purchase', 'is_approved', 'created_at']
     search_fields = ['product__name', 'customer_name', 'customer_email', 'title', 'comment']
+    exact_search_fields = ['customer_email']
+    fulltext_search_fields = ['title', 'comment']
     list_editable = ['is_approved']
     readonly_fields = ['created_at']
     
@@ -187,12 +209,12 @@ class ReviewAdmin(admin.ModelAdmin):
     rating_display.short_description = 'Rating'
 
     def approve_reviews(self, request, queryset):
-        updated = queryset.update(is_approved=True)
+        updated = queryset.set_approved(True)
         self.message_user(request, f'{updated} reviews approved.')
     approve_reviews.short_description = 'Approve selected reviews'
 
     def disapprove_reviews(self, request, queryset):
-        updated = queryset.update(is_approved=False)
+        updated = queryset.set_approved(False)
         self.message_user(request, f'{updated} reviews disapproved.')
     disapprove_reviews.short_description = 'Disapprove selected reviews'
 
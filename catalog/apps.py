@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class CatalogConfig(AppConfig):
     name = 'catalog'
+
+    def ready(self):
+        from shopping_store import search
+        from . import signals  # noqa: F401
+
+        search.register(self.get_model('Product'), ['name', 'sku', 'description'])
+        search.register(
+            self.get_model('Review'), ['product__name', 'customer_name', 'customer_email', 'title', 'comment']
+        )
@@ -0,0 +1,134 @@
+"""
+Async versions of the catalog's read views for ASGI deployments, selected
+with CATALOG_ASYNC_VIEWS. Queries that don't depend on each other are
+awaited together; templates are rendered off the event loop because the
+auth, cart and banner context processors still query synchronously.
+"""
+import asyncio
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.shortcuts import render
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from .cards import aget_product_cards
+from .eligibility import can_review
+from .models import Brand, Category, Product, Review
+from .recommendations import arelated_product_cards
+from .views import (
+    ProductListView as SyncProductListView, aget_review_page, filter_products, parse_review_cursor,
+    product_detail_queryset, stock_sync_authorized, stock_update_result,
+)
+from shopping_store.db_router import replica_reads
+
+arender = sync_to_async(render)
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+@replica_reads
+async def home(request):
+    """Homepage view"""
+    featured_products, categories, new_arrivals = await asyncio.gather(
+        aget_product_cards(Product.objects.filter(is_active=True, is_featured=True)[:8]),
+        _alist(Category.objects.filter(is_active=True, parent=None)[:6]),
+        aget_product_cards(Product.objects.filter(is_active=True).order_by('-created_at')[:8]),
+    )
+    return await arender(request, 'catalog/home.html', {
+        'featured_products': featured_products,
+        'categories': categories,
+        'new_arrivals': new_arrivals,
+    })
+
+
+@replica_reads
+class ProductListView(View):
+    """Display list of products"""
+    template_name = SyncProductListView.template_name
+    paginate_by = SyncProductListView.paginate_by
+
+    async def get(self, request, category_slug=None):
+        queryset = filter_products(request, category_slug)
+        paginator = Paginator(queryset, self.paginate_by)
+        # count is a cached property; filling it in keeps the paginator off the ORM
+        paginator.count, categories = await asyncio.gather(
+            queryset.acount(),
+            _alist(Category.objects.filter(is_active=True, parent=None)),
+        )
+        page_number = request.GET.get('page') or 1
+        try:
+            page_number = paginator.num_pages if page_number == 'last' else int(page_number)
+            page = paginator.page(page_number)
+        except (ValueError, InvalidPage):
+            raise Http404('Invalid page.')
+        page.object_list = await aget_product_cards(page.object_list)
+        return await arender(request, self.template_name, {
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+            'object_list': page.object_list,
+            'products': page.object_list,
+            'categories': categories,
+            # Left lazy as in the sync view: only evaluated if a template reads it
+            'brands': Brand.objects.filter(is_active=True),
+            'view': self,
+        })
+
+
+@replica_reads
+class ProductDetailView(View):
+    """Display product details"""
+    template_name = 'catalog/product_detail.html'
+
+    async def get(self, request, slug):
+        try:
+            product = await product_detail_queryset().aget(slug=slug)
+        except Product.DoesNotExist:
+            raise Http404('No product found matching the query')
+        related_products, (approved_reviews, next_cursor), review_allowed = await asyncio.gather(
+            arelated_product_cards(product),
+            aget_review_page(product.reviews),
+            sync_to_async(can_review)(request.user, product.id),
+        )
+        return await arender(request, self.template_name, {
+            'object': product,
+            'product': product,
+            'related_products': related_products,
+            'approved_reviews': approved_reviews,
+            'reviews_next_cursor': next_cursor,
+            'can_review': review_allowed,
+            'view': self,
+        })
+
+
+@replica_reads
+async def product_reviews(request, slug):
+    """HTML fragment with the next page of approved reviews for a product"""
+    cursor = None
+    if request.GET.get('after'):
+        cursor = parse_review_cursor(request.GET['after'])
+        if cursor is None:
+            return HttpResponseBadRequest('Invalid cursor')
+
+    reviews = Review.objects.filter(product__slug=slug, product__is_active=True)
+    approved_reviews, next_cursor = await aget_review_page(reviews, cursor)
+    return await arender(request, 'catalog/review_list.html', {
+        'approved_reviews': approved_reviews,
+        'reviews_next_cursor': next_cursor,
+        'product_slug': slug,
+    })
+
+
+@csrf_exempt
+@require_POST
+async def bulk_stock_update(request):
+    """
+    Async entry point for the warehouse stock feed. The body is streamed and
+    applied in a worker thread exactly as the sync view does it.
+    """
+    if not stock_sync_authorized(request):
+        return JsonResponse({'error': 'A valid bearer token is required.'}, status=401)
+    return JsonResponse(await sync_to_async(stock_update_result)(request))
@@ -0,0 +1,97 @@
+from typing import NamedTuple
+from decimal import Decimal
+from django.db.models import F, OuterRef, Subquery
+from .models import Product, ProductImage
+
+
+class ProductCard(NamedTuple):
+    """Read-only projection of a product for listing and card templates"""
+    id: int
+    slug: str
+    name: str
+    price: Decimal
+    compare_price: Decimal | None
+    discount_percentage: int
+    image_url: str | None
+    brand_name: str | None
+    category_name: str
+    is_featured: bool
+    in_stock: bool
+    rating_avg: Decimal
+    rating_count: int
+
+
+# Columns pulled from the product row itself; everything else on a card is
+# joined or derived so the wide text columns never leave the database.
+CARD_COLUMNS = ('id', 'slug', 'name', 'price', 'compare_price', 'is_featured', 'stock_quantity',
+                'rating_avg', 'rating_count')
+
+
+def _primary_image():
+    """First image per product, preferring the one flagged as primary"""
+    return Subquery(
+        ProductImage.objects.filter(product=OuterRef('pk'))
+        .order_by('-is_primary', 'display_order', 'created_at')
+        .values('image')[:1]
+    )
+
+
+def _discount_percentage(price, compare_price):
+    if compare_price and compare_price > price:
+        return int(((compare_price - price) / compare_price) * 100)
+    return 0
+
+
+def _image_url(value):
+    if not value:
+        return None
+    return ProductImage._meta.get_field('image').to_python(value).url
+
+
+def _card_rows(queryset):
+    if queryset is None:
+        queryset = Product.objects.filter(is_active=True)
+    return queryset.annotate(
+        card_image=_primary_image(),
+        card_brand=F('brand__name'),
+        card_category=F('category__name'),
+    ).values_list(*CARD_COLUMNS, 'card_image', 'card_brand', 'card_category')
+
+
+def _card(row):
+    (pk, slug, name, price, compare_price, is_featured, stock_quantity,
+     rating_avg, rating_count, image, brand, category) = row
+    return ProductCard(
+        id=pk,
+        slug=slug,
+        name=name,
+        price=price,
+        compare_price=compare_price,
+        discount_percentage=_discount_percentage(price, compare_price),
+        image_url=_image_url(image),
+        brand_name=brand,
+        category_name=category,
+        is_featured=is_featured,
+        in_stock=stock_quantity > 0,
+        rating_avg=rating_avg,
+        rating_count=rating_count,
+    )
+
+
+def get_product_cards(queryset=None):
+    """
+    Build ProductCard objects for a Product queryset in a single query.
+    The queryset may already be filtered, ordered and sliced.
+    """
+    return [_card(row) for row in _card_rows(queryset)]
+
+
+async def aget_product_cards(queryset=None):
+    """get_product_cards for async views"""
+    return [_card(row) async for row in _card_rows(queryset)]
+
+
+def get_product_cards_by_id(product_ids):
+    """Map product id -> ProductCard for the given ids, in one query"""
+    cards = get_product_cards(Product.objects.filter(id__in=set(product_ids)))
+    return {card.id: card for card in cards}
@@ -1,7 +1,6 @@
 import json
 import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 import os
 from django.conf import settings
@@ -133,6 +132,14 @@ class ProductLiveViewConsumer(AsyncWebsocketConsumer):
             'type': 'count_update'
         }))
 
+    async def stock_update(self, event):
+        """Handle stock_update message sent by catalog.stock after a bulk update."""
+        await self.send(text_data=json.dumps({
+            'type': 'stock_update',
+            'stock_quantity': event['stock_quantity'],
+            'variants': event['variants'],
+        }))
+
     def _is_bot(self):
         """Check if the connection is from a bot/crawler."""
         headers = dict(self.scope.get('headers', []))
@@ -142,7 +149,7 @@ class ProductLiveViewConsumer(AsyncWebsocketConsumer):
 
     async def _get_or_create_session(self):
         """Ensure session exists and return the session key."""
-        await database_sync_to_async(self.scope['session'].save)()
+        await self.scope['session'].asave()
         return self.scope['session'].session_key
 
     async def _add_viewer(self):
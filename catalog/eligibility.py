@@ -0,0 +1,70 @@
+from array import array
+from bisect import bisect_left
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import IntegerField, Value
+from orders.models import OrderItem
+from .models import Review
+
+DELIVERED = 0
+REVIEWED = 1
+
+
+def _cache_key(user_id):
+    return f'review_eligibility:{user_id}'
+
+
+def _contains(sorted_ids, product_id):
+    i = bisect_left(sorted_ids, product_id)
+    return i < len(sorted_ids) and sorted_ids[i] == product_id
+
+
+def _load_product_id_sets(user_id):
+    delivered = OrderItem.objects.filter(
+        order__customer_id=user_id, order__status='DELIVERED'
+    ).values_list('product_id', Value(DELIVERED, output_field=IntegerField()))
+    reviewed = Review.objects.filter(user_id=user_id).values_list(
+        'product_id', Value(REVIEWED, output_field=IntegerField())
+    ).order_by()
+    ids = ([], [])
+    for product_id, kind in delivered.union(reviewed):
+        ids[kind].append(product_id)
+    return tuple(array('q', sorted(set(product_ids))) for product_ids in ids)
+
+
+def get_product_id_sets(user_id):
+    """
+    Return (delivered, reviewed) product ids for a user as sorted int arrays.
+    Both sets come from one UNION query and, with a shared cache, are cached
+    together for REVIEW_ELIGIBILITY_CACHE_TIMEOUT or until an order or review
+    of the user changes.
+    """
+    timeout = settings.REVIEW_ELIGIBILITY_CACHE_TIMEOUT
+    if not timeout:
+        return _load_product_id_sets(user_id)
+    key = _cache_key(user_id)
+    sets = cache.get(key)
+    if sets is None:
+        sets = _load_product_id_sets(user_id)
+        cache.set(key, sets, timeout)
+    return sets
+
+
+def has_purchased(user, product_id):
+    """True if the user has a delivered order containing the product"""
+    return _contains(get_product_id_sets(user.pk)[DELIVERED], product_id)
+
+
+def has_reviewed(user, product_id):
+    return _contains(get_product_id_sets(user.pk)[REVIEWED], product_id)
+
+
+def can_review(user, product_id):
+    if not user.is_authenticated:
+        return False
+    delivered, reviewed = get_product_id_sets(user.pk)
+    return _contains(delivered, product_id) and not _contains(reviewed, product_id)
+
+
+def invalidate_review_eligibility(*user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
@@ -0,0 +1,20 @@
+from shopping_store.exports import Export
+
+PRODUCT_EXPORT = Export('products', [
+    ('id', 'id'),
+    ('sku', 'sku'),
+    ('name', 'name'),
+    ('slug', 'slug'),
+    ('category', 'category__name'),
+    ('brand', 'brand__name'),
+    ('gender', 'gender'),
+    ('price', 'price'),
+    ('compare_price', 'compare_price'),
+    ('cost_price', 'cost_price'),
+    ('stock_quantity', 'stock_quantity'),
+    ('is_active', 'is_active'),
+    ('is_featured', 'is_featured'),
+    ('rating_avg', 'rating_avg'),
+    ('rating_count', 'rating_count'),
+    ('created_at', 'created_at'),
+])
@@ -0,0 +1,347 @@
+import csv
+import gzip
+import hashlib
+import json
+import os
+from decimal import Decimal, InvalidOperation
+from itertools import groupby, islice
+from django.db import transaction
+from django.utils.text import slugify
+from shopping_store import search
+from .models import Brand, Category, Color, JobCheckpoint, Product, ProductVariant, Size
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+MAX_AMOUNT = Decimal('99999999.99')
+
+PRODUCT_FIELDS = ['name', 'description', 'short_description', 'category', 'brand', 'price', 'compare_price',
+                  'cost_price', 'gender', 'is_active', 'is_featured', 'stock_quantity', 'material']
+PRODUCT_UPDATE_FIELDS = PRODUCT_FIELDS + ['updated_at']
+VARIANT_UPDATE_FIELDS = ['product', 'size', 'color', 'price_adjustment', 'stock_quantity', 'is_active', 'updated_at']
+
+# CSV input is one row per variant; these columns describe the variant and
+# every other column repeats the product
+VARIANT_COLUMNS = {'variant_sku': 'sku', 'size': 'size', 'color': 'color',
+                   'price_adjustment': 'price_adjustment', 'variant_stock': 'stock_quantity'}
+
+GENDERS = {code for code, _ in Product.GENDER_CHOICES}
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+class InvalidRecord(ValueError):
+    """An input record that cannot be imported"""
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def _csv_records(handle):
+    """Group consecutive variant rows of the same product SKU into one record"""
+    for sku, rows in groupby(csv.DictReader(handle), key=lambda row: row.get('sku', '').strip()):
+        rows = list(rows)
+        record = {key: value for key, value in rows[0].items() if key not in VARIANT_COLUMNS}
+        record['variants'] = [
+            {field: row.get(column) for column, field in VARIANT_COLUMNS.items()}
+            for row in rows if row.get('variant_sku')
+        ]
+        yield record
+
+
+def _jsonl_records(handle):
+    """One record per non-blank line; a line that isn't a JSON object yields an InvalidRecord in its place"""
+    for line in handle:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            yield InvalidRecord(f'invalid JSON: {error}')
+            continue
+        yield record if isinstance(record, dict) else InvalidRecord('expected a JSON object')
+
+
+def read_records(path, fmt=None):
+    """Stream product records (dicts with a 'variants' list) from a CSV or JSONL file"""
+    fmt = fmt or ('jsonl' if '.jsonl' in path or '.ndjson' in path else 'csv')
+    with _open(path) as handle:
+        yield from (_jsonl_records(handle) if fmt == 'jsonl' else _csv_records(handle))
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+def _decimal(value, field, required=False):
+    value = _text(value)
+    if not value:
+        if required:
+            raise InvalidRecord(f'{field} is required')
+        return None
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise InvalidRecord(f'{field} {value!r} is not a number')
+    if number < 0 or not number.is_finite():
+        raise InvalidRecord(f'{field} must be zero or more')
+    if number > MAX_AMOUNT:
+        raise InvalidRecord(f'{field} must be at most {MAX_AMOUNT}')
+    return number.quantize(Decimal('0.01'))
+
+
+def _integer(value, field, default=0):
+    value = _text(value)
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise InvalidRecord(f'{field} {value!r} is not a whole number')
+    if number < 0:
+        raise InvalidRecord(f'{field} must be zero or more')
+    return number
+
+
+def _boolean(value, default):
+    if isinstance(value, bool):
+        return value
+    value = _text(value).lower()
+    return value in TRUE_VALUES if value else default
+
+
+class CatalogImporter:
+    """
+    Upserts products and variants keyed on SKU, one chunk of products per
+    transaction. Categories, brands, sizes and colours are resolved from
+    maps loaded once; missing categories and brands are created in the
+    transaction of the first chunk using them, missing sizes and colours
+    are errors. With dry_run nothing is written.
+    """
+
+    def __init__(self, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.categories = {name.lower(): pk for pk, name in Category.objects.values_list('id', 'name')}
+        self.brands = {name.lower(): pk for pk, name in Brand.objects.values_list('id', 'name')}
+        self.sizes = self._lookup(Size)
+        self.colors = self._lookup(Color)
+        self.errors = []
+        self.error_count = 0
+        self.products = 0
+        self.variants = 0
+
+    def _lookup(self, model):
+        lookup = {}
+        for pk, name, code in model.objects.values_list('id', 'name', 'code'):
+            lookup[code.lower()] = pk
+            lookup[name.lower()] = pk
+        return lookup
+
+    def _error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def _named(self, lookup, model, name):
+        """Id for a category/brand name, creating it if it doesn't exist yet"""
+        key = name.lower()
+        if key not in lookup:
+            lookup[key] = model.objects.create(name=name).pk
+        return lookup[key]
+
+    def _resolve(self, lookup, value, field):
+        value = _text(value)
+        if not value:
+            raise InvalidRecord(f'{field} is required')
+        if value.lower() not in lookup:
+            raise InvalidRecord(f'unknown {field} {value!r}')
+        return lookup[value.lower()]
+
+    def validate(self, record):
+        """
+        Return (product fields, variant rows) for a record or raise
+        InvalidRecord. Category and brand stay names until _write_chunk.
+        """
+        if isinstance(record, InvalidRecord):
+            raise record
+        sku = _text(record.get('sku'))
+        name = _text(record.get('name'))
+        category = _text(record.get('category'))
+        if not sku:
+            raise InvalidRecord('sku is required')
+        if not name:
+            raise InvalidRecord('name is required')
+        if not category:
+            raise InvalidRecord('category is required')
+        gender = _text(record.get('gender')).upper() or 'U'
+        if gender not in GENDERS:
+            raise InvalidRecord(f'unknown gender {gender!r}')
+        brand = _text(record.get('brand'))
+
+        product = {
+            'sku': sku,
+            'name': name,
+            'description': _text(record.get('description')),
+            'short_description': _text(record.get('short_description')),
+            'price': _decimal(record.get('price'), 'price', required=True),
+            'compare_price': _decimal(record.get('compare_price'), 'compare_price'),
+            'cost_price': _decimal(record.get('cost_price'), 'cost_price'),
+            'gender': gender,
+            'is_active': _boolean(record.get('is_active'), True),
+            'is_featured': _boolean(record.get('is_featured'), False),
+            'stock_quantity': _integer(record.get('stock_quantity'), 'stock_quantity'),
+            'material': _text(record.get('material')),
+            'category': category,
+            'brand': brand,
+        }
+
+        variants, combinations = [], set()
+        for variant in record.get('variants') or []:
+            variant_sku = _text(variant.get('sku'))
+            if not variant_sku:
+                raise InvalidRecord('variant sku is required')
+            size_id = self._resolve(self.sizes, variant.get('size'), 'size')
+            color_id = self._resolve(self.colors, variant.get('color'), 'color')
+            if (size_id, color_id) in combinations:
+                raise InvalidRecord(f'variant {variant_sku} repeats a size/color combination')
+            combinations.add((size_id, color_id))
+            variants.append({
+                'sku': variant_sku,
+                'size_id': size_id,
+                'color_id': color_id,
+                'price_adjustment': _decimal(variant.get('price_adjustment'), 'price_adjustment') or 0,
+                'stock_quantity': _integer(variant.get('stock_quantity'), 'variant stock_quantity'),
+                'is_active': _boolean(variant.get('is_active'), True),
+            })
+        return product, variants
+
+    def _slugs(self, products):
+        """Assign unique slugs in memory; existing products keep theirs"""
+        existing = dict(Product.objects.filter(sku__in=[p['sku'] for p in products]).values_list('sku', 'slug'))
+        wanted = {slugify(p['name']) for p in products if p['sku'] not in existing}
+        taken = set(Product.objects.filter(slug__in=wanted).values_list('slug', flat=True))
+        for product in products:
+            slug = existing.get(product['sku'])
+            if slug is None:
+                slug = slugify(product['name'])[:280] or slugify(product['sku'])
+                if slug in taken:
+                    slug = f"{slug}-{slugify(product['sku'])}"[:300]
+            taken.add(slug)
+            product['slug'] = slug
+
+    def _write_chunk(self, chunk):
+        products = [product for product, _ in chunk]
+        for product in products:
+            product['category_id'] = self._named(self.categories, Category, product.pop('category'))
+            brand = product.pop('brand')
+            product['brand_id'] = self._named(self.brands, Brand, brand) if brand else None
+        self._slugs(products)
+        Product.objects.bulk_create(
+            [Product(**product) for product in products],
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=PRODUCT_UPDATE_FIELDS,
+        )
+        ids = dict(Product.objects.filter(sku__in=[p['sku'] for p in products]).values_list('sku', 'id'))
+
+        variants = [
+            ProductVariant(product_id=ids[product['sku']], **variant)
+            for product, product_variants in chunk for variant in product_variants
+        ]
+        if variants:
+            ProductVariant.objects.bulk_create(
+                variants,
+                update_conflicts=True,
+                unique_fields=['sku'],
+                update_fields=VARIANT_UPDATE_FIELDS,
+                batch_size=self.chunk_size,
+            )
+        if Product in search.registered_models() and search.uses_token_index():
+            search.index_objects(Product, list(ids.values()))
+        return len(variants)
+
+    def _check_conflicts(self, chunk):
+        """
+        Keep the last record of a product SKU repeated within the chunk, and
+        drop records whose variants clash with another variant SKU, either in
+        the chunk or stored for the same product, size and colour.
+        """
+        latest = {product['sku']: (line, product, variants) for line, (product, variants) in chunk}
+        existing = {
+            (sku, size_id, color_id): variant_sku
+            for sku, size_id, color_id, variant_sku in ProductVariant.objects.filter(product__sku__in=latest)
+            .values_list('product__sku', 'size_id', 'color_id', 'sku')
+        }
+        clean, variant_skus = [], set()
+        for line, product, variants in latest.values():
+            clash = next((
+                variant['sku'] for variant in variants
+                if variant['sku'] in variant_skus
+                or existing.get((product['sku'], variant['size_id'], variant['color_id']), variant['sku'])
+                != variant['sku']
+            ), None)
+            if clash:
+                self._error(line, f'variant {clash} clashes with another variant')
+                continue
+            variant_skus.update(variant['sku'] for variant in variants)
+            clean.append((product, variants))
+        return clean
+
+    def run(self, records, checkpoint_name=None, progress=None):
+        """
+        Import an iterable of records. With a checkpoint name, records
+        before the saved position are skipped and the position advances
+        after every committed chunk. Returns (products, variants) written.
+        """
+        checkpoint = None
+        start = 0
+        if checkpoint_name and not self.dry_run:
+            checkpoint, _ = JobCheckpoint.objects.get_or_create(name=checkpoint_name)
+            start = checkpoint.position
+
+        position = start
+        records = enumerate(islice(records, start, None), start=start + 1)
+        while True:
+            batch = list(islice(records, self.chunk_size))
+            if not batch:
+                break
+            chunk = []
+            for line, record in batch:
+                try:
+                    chunk.append((line, self.validate(record)))
+                except InvalidRecord as error:
+                    self._error(line, str(error))
+            position = batch[-1][0]
+
+            chunk = self._check_conflicts(chunk)
+            if self.dry_run:
+                self.products += len(chunk)
+                self.variants += sum(len(variants) for _, variants in chunk)
+            else:
+                categories, brands = dict(self.categories), dict(self.brands)
+                try:
+                    with transaction.atomic():
+                        if chunk:
+                            self.variants += self._write_chunk(chunk)
+                        if checkpoint:
+                            checkpoint.position = position
+                            checkpoint.save()
+                except Exception:
+                    # Forget categories and brands created by the rolled back chunk
+                    self.categories, self.brands = categories, brands
+                    raise
+                self.products += len(chunk)
+            if progress:
+                progress(position, self.products, self.variants)
+
+        if checkpoint:
+            checkpoint.delete()
+        return self.products, self.variants
+
+
+def checkpoint_name(path):
+    """Checkpoint key for an input file, stable across runs"""
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+    return f'import_catalog:{digest}'
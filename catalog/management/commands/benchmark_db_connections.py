@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db.backends.signals import connection_created
+from django.test import AsyncRequestFactory, RequestFactory
+from django.test.utils import setup_test_environment, teardown_test_environment
+from shopping_store.db_pool import pools, warm_connection_pools
+
+
+class Command(BaseCommand):
+    help = ('Serves a page through the WSGI and ASGI handlers with concurrent clients and reports '
+            'database connections opened per 10k requests with the current pooling settings')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=10000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--path', default='/products/')
+        parser.add_argument('--server', choices=['wsgi', 'asgi', 'both'], default='both')
+
+    def connections_opened(self):
+        # A pool's own count, as connection_created fires on every checkout
+        pooled = list(pools())
+        if pooled:
+            return sum(pool.get_stats().get('connections_num', 0) for _, pool in pooled)
+        return self.created
+
+    def count_created(self, **kwargs):
+        with self.lock:
+            self.created += 1
+
+    def run_wsgi(self, path, requests, concurrency):
+        handler = WSGIHandler()
+        factory = RequestFactory()
+
+        def request(_):
+            response = handler(factory.get(path, secure=True).environ, lambda status, headers: None)
+            b''.join(response)
+            # Fires request_finished, which returns or closes the connection
+            response.close()
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(request, range(requests)))
+
+    def run_asgi(self, path, requests, concurrency):
+        handler = ASGIHandler()
+        factory = AsyncRequestFactory()
+
+        async def request(limit):
+            async with limit:
+                body_sent = False
+
+                async def receive():
+                    nonlocal body_sent
+                    if not body_sent:
+                        body_sent = True
+                        return {'type': 'http.request', 'body': b'', 'more_body': False}
+                    # The client never disconnects; the handler cancels this wait
+                    await asyncio.Future()
+
+                async def send(message):
+                    pass
+
+                await handler(factory.get(path, secure=True).scope, receive, send)
+
+        async def main():
+            limit = asyncio.Semaphore(concurrency)
+            await asyncio.gather(*(request(limit) for _ in range(requests)))
+
+        asyncio.run(main())
+
+    def handle(self, *args, **options):
+        requests, concurrency, path = options['requests'], options['concurrency'], options['path']
+        mode = 'pooled' if settings.DATABASE_POOL else f'CONN_MAX_AGE={settings.DATABASES["default"]["CONN_MAX_AGE"]}'
+        servers = ['wsgi', 'asgi'] if options['server'] == 'both' else [options['server']]
+
+        self.lock = threading.Lock()
+        self.created = 0
+        setup_test_environment()
+        connection_created.connect(self.count_created)
+        try:
+            warm_connection_pools()
+            for server in servers:
+                before = self.connections_opened()
+                started = time.monotonic()
+                getattr(self, f'run_{server}')(path, requests, concurrency)
+                elapsed = time.monotonic() - started
+                opened = self.connections_opened() - before
+                self.stdout.write(
+                    f'{server.upper()} ({mode}, {concurrency} concurrent): {opened} connections opened for '
+                    f'{requests} requests, {opened * 10000 / requests:.0f} per 10k; {requests / elapsed:.0f} req/s'
+                )
+        finally:
+            connection_created.disconnect(self.count_created)
+            teardown_test_environment()
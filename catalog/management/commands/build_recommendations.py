@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from catalog.recommendations import ORDER_BATCH_SIZE, TOP_K, build_recommendations
+
+
+class Command(BaseCommand):
+    help = ('Folds new orders into the co-purchase matrix, takes cancelled ones out and refreshes '
+            '"customers also bought" products')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Discard the matrix and rebuild from all orders')
+        parser.add_argument('--top-k', type=int, default=TOP_K)
+        parser.add_argument('--batch-size', type=int, default=ORDER_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        orders, products = build_recommendations(
+            full=options['full'],
+            top_k=options['top_k'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {orders} orders, refreshed recommendations for {products} products.'
+        ))
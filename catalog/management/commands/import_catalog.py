@@ -0,0 +1,46 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from catalog.importer import IMPORT_CHUNK_SIZE, CatalogImporter, checkpoint_name, read_records
+from catalog.models import JobCheckpoint
+
+
+class Command(BaseCommand):
+    help = ('Streams products and variants from CSV or JSON Lines (optionally .gz) and upserts them by SKU. '
+            'CSV has one row per variant: product columns (sku, name, description, category, brand, price, '
+            'compare_price, stock_quantity, gender, ...) repeated, plus variant_sku, size, color, '
+            'price_adjustment and variant_stock. JSONL has one product per line with a "variants" list.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate every record without writing')
+        parser.add_argument('--restart', action='store_true', help='Ignore a checkpoint left by an interrupted run')
+
+    def handle(self, *args, **options):
+        name = checkpoint_name(options['path'])
+        if options['restart']:
+            JobCheckpoint.objects.filter(name=name).delete()
+
+        importer = CatalogImporter(dry_run=options['dry_run'], chunk_size=options['chunk_size'])
+        started = time.monotonic()
+
+        def progress(position, products, variants):
+            self.stdout.write(f'{position} records read, {products} products / {variants} variants '
+                              f'{"valid" if options["dry_run"] else "saved"} ({time.monotonic() - started:.0f}s)')
+
+        try:
+            products, variants = importer.run(
+                read_records(options['path'], options['format']), checkpoint_name=name, progress=progress
+            )
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Import stopped: {error}. Re-run to resume from the last committed chunk.')
+
+        for record, message in importer.errors:
+            self.stderr.write(f'record {record}: {message}')
+        if importer.error_count > len(importer.errors):
+            self.stderr.write(f'... and {importer.error_count - len(importer.errors)} more errors')
+
+        verb = 'would be imported' if options['dry_run'] else 'imported'
+        summary = f'{products} products and {variants} variants {verb}; {importer.error_count} records rejected.'
+        self.stdout.write(self.style.WARNING(summary) if importer.error_count else self.style.SUCCESS(summary))
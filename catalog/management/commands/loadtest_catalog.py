@@ -0,0 +1,93 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from importlib.util import find_spec
+from django.core.management.base import BaseCommand, CommandError
+
+MODES = {'sync': '0', 'async': '1'}
+
+
+class Command(BaseCommand):
+    help = ('Starts uvicorn with the sync and then the async catalog views (CATALOG_ASYNC_VIEWS) and '
+            'reports requests/sec for concurrent clients fetching the given pages')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=['/', '/products/'])
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--mode', choices=['sync', 'async', 'both'], default='both')
+
+    def start_server(self, mode, port, workers):
+        env = dict(os.environ, CATALOG_ASYNC_VIEWS=MODES[mode])
+        return subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'shopping_store.asgi:application', '--port', str(port),
+             '--workers', str(workers), '--no-access-log', '--log-level', 'warning'],
+            env=env,
+        )
+
+    async def fetch(self, port, path):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode())
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+        finally:
+            writer.close()
+        return int(status_line.split()[1])
+
+    async def wait_until_up(self, port, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'uvicorn exited with status {server.returncode}')
+            try:
+                await self.fetch(port, '/')
+                return
+            except (OSError, IndexError, ValueError):
+                await asyncio.sleep(0.2)
+        raise CommandError(f'uvicorn did not answer on port {port} within {timeout}s')
+
+    async def run(self, port, paths, requests, concurrency):
+        limit = asyncio.Semaphore(concurrency)
+        statuses = Counter()
+
+        async def request(number):
+            async with limit:
+                statuses[await self.fetch(port, paths[number % len(paths)])] += 1
+
+        # Warm up templates, caches and connections before timing
+        await asyncio.gather(*(request(number) for number in range(concurrency)))
+        statuses.clear()
+        started = time.monotonic()
+        await asyncio.gather(*(request(number) for number in range(requests)))
+        return time.monotonic() - started, statuses
+
+    def handle(self, *args, **options):
+        if find_spec('uvicorn') is None:
+            raise CommandError('uvicorn is not installed (pip install uvicorn)')
+        paths, requests, concurrency = options['paths'], options['requests'], options['concurrency']
+        modes = list(MODES) if options['mode'] == 'both' else [options['mode']]
+
+        results = {}
+        for mode in modes:
+            server = self.start_server(mode, options['port'], options['workers'])
+            try:
+                asyncio.run(self.wait_until_up(options['port'], server))
+                elapsed, statuses = asyncio.run(self.run(options['port'], paths, requests, concurrency))
+            finally:
+                server.terminate()
+                server.wait()
+            results[mode] = requests / elapsed
+            codes = ', '.join(f'{count} x {status}' for status, count in sorted(statuses.items()))
+            self.stdout.write(
+                f'{mode} views: {requests} requests, {concurrency} concurrent, {elapsed:.2f}s, '
+                f'{results[mode]:.0f} req/s ({codes})'
+            )
+        if len(results) == 2:
+            self.stdout.write(f'async / sync: {results["async"] / results["sync"]:.2f}x')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from shopping_store.search import rebuild_index, registered_models, uses_token_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the admin search word index (only used on databases other than PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not uses_token_index(using):
+            self.stdout.write('This database searches through trigram/full-text indexes; nothing to rebuild.')
+            return
+        for model in registered_models():
+            count = rebuild_index(model, using=using, batch_size=options['batch_size'])
+            self.stdout.write(f'{model._meta.label}: {count} rows indexed')
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from catalog.ratings import reconcile_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recomputes denormalized product rating aggregates from approved reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fixed = reconcile_ratings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rating aggregates reconciled ({fixed} products updated).'))
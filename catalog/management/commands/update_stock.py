@@ -0,0 +1,37 @@
+import json
+import sys
+from django.core.management.base import BaseCommand
+from catalog.stock import STOCK_BATCH_SIZE, apply_stock_updates, read_stock_rows
+
+
+class Command(BaseCommand):
+    help = 'Applies sku,stock_quantity[,price] rows (CSV or JSON lines) with one UPDATE per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file, or - for stdin')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--batch-size', type=int, default=STOCK_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Report the diffs without writing')
+
+    def handle(self, *args, **options):
+        handle = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8', newline='')
+        with handle:
+            result = apply_stock_updates(
+                read_stock_rows(handle, options['format']),
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+            )
+
+        if options['verbosity'] > 1:
+            for diff in result['changed']:
+                self.stdout.write(json.dumps(diff))
+        for error in result['errors']:
+            self.stderr.write(error)
+        if result['unknown']:
+            self.stderr.write(f'Unknown SKUs: {", ".join(result["unknown"][:50])}'
+                              + (' ...' if len(result['unknown']) > 50 else ''))
+        verb = 'would change' if options['dry_run'] else 'changed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(result["changed"])} SKUs {verb}, {result["unchanged"]} unchanged, '
+            f'{len(result["unknown"])} unknown, {len(result["errors"])} errors.'
+        ))
@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-19 08:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def link_reviews_to_users(apps, schema_editor):
+    """Attach legacy reviews to their author, matched by a unique email"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Review = apps.get_model('catalog', 'Review')
+    users_by_email = {}
+    for user_id, email in User.objects.exclude(email='').values_list('id', 'email'):
+        users_by_email.setdefault(email.lower(), []).append(user_id)
+
+    linked = set()
+    for review in Review.objects.filter(user__isnull=True).order_by('created_at').only('id', 'product_id', 'customer_email'):
+        user_ids = users_by_email.get(review.customer_email.lower(), [])
+        if len(user_ids) == 1 and (review.product_id, user_ids[0]) not in linked:
+            linked.add((review.product_id, user_ids[0]))
+            Review.objects.filter(pk=review.pk).update(user_id=user_ids[0])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_review_product_feed_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviews', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(link_reviews_to_users, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('product', 'user'), name='unique_review_per_user'),
+        ),
+    ]
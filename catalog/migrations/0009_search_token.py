@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-19 09:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from shopping_store.migration_operations import CreateSearchIndexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_copurchase_recommendations'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('token', models.CharField(max_length=64)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['content_type', 'object_id'], name='search_token_object_idx')],
+                'constraints': [models.UniqueConstraint(fields=('content_type', 'token', 'object_id'), name='unique_search_token')],
+            },
+        ),
+        CreateSearchIndexes(
+            trigram=[
+                ('catalog_product_name_trgm', 'catalog_product', 'name'),
+                ('catalog_product_sku_trgm', 'catalog_product', 'sku'),
+                ('catalog_review_customer_name_trgm', 'catalog_review', 'customer_name'),
+                ('catalog_review_customer_email_trgm', 'catalog_review', 'customer_email'),
+            ],
+            fulltext=[
+                ('catalog_product_description_fts', 'catalog_product', 'description'),
+                ('catalog_review_title_fts', 'catalog_review', 'title'),
+                ('catalog_review_comment_fts', 'catalog_review', 'comment'),
+            ],
+        ),
+    ]
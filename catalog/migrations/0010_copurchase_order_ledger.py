@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-19 10:04
+
+from django.db import migrations, models
+
+
+def reset_copurchase_matrix(apps, schema_editor):
+    # Which orders the old id checkpoint had counted isn't recorded, so the
+    # next build_recommendations run rebuilds the matrix from every order
+    apps.get_model('catalog', 'ProductCoPurchase').objects.all().delete()
+    apps.get_model('catalog', 'ProductRecommendation').objects.all().delete()
+    apps.get_model('catalog', 'JobCheckpoint').objects.filter(name='copurchase_recommendations').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_search_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoPurchaseOrder',
+            fields=[
+                ('order_id', models.BigIntegerField(primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='jobcheckpoint',
+            name='timestamp',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(reset_copurchase_matrix, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
 from cloudinary.models import CloudinaryField
 
 
@@ -95,6 +97,15 @@ class Product(models.Model):
     meta_description = models.CharField(max_length=300, blank=True)
     meta_keywords = models.CharField(max_length=300, blank=True)
     
+    # Denormalized approved-review aggregates, maintained by catalog.ratings
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -121,6 +132,12 @@ class Product(models.Model):
     def is_low_stock(self):
         return self.stock_quantity <= self.low_stock_threshold
 
+    @property
+    def rating_histogram(self):
+        """Approved review counts for 1 to 5 stars"""
+        return [self.rating_1_count, self.rating_2_count, self.rating_3_count,
+                self.rating_4_count, self.rating_5_count]
+
     def __str__(self):
         return self.name
 
@@ -195,9 +212,17 @@ class ProductVariant(models.Model):
         return f"{self.product.name} - {self.size.name} - {self.color.name}"
 
 
+class ReviewQuerySet(models.QuerySet):
+    def set_approved(self, is_approved):
+        """Bulk (dis)approve reviews, keeping product rating aggregates in sync"""
+        from .ratings import set_reviews_approved
+        return set_reviews_approved(self, is_approved)
+
+
 class Review(models.Model):
     """Product reviews"""
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='reviews')
     customer_name = models.CharField(max_length=200)
     customer_email = models.EmailField()
     rating = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
@@ -207,8 +232,16 @@ class Review(models.Model):
     is_approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ReviewQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', 'is_approved', '-created_at'], name='review_product_feed_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'user'], name='unique_review_per_user'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.rating} stars by {self.customer_name}"
@@ -268,3 +301,72 @@ class Banner(models.Model):
         if self.end_date and self.end_date < now:
             return False
         return True
+
+
+class ProductCoPurchase(models.Model):
+    """Sparse item-to-item co-occurrence counts accumulated from orders"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'related'], name='unique_copurchase_pair'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} ({self.count})"
+
+
+class ProductRecommendation(models.Model):
+    """Top-K "customers also bought" neighbours per product"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommended_for')
+    rank = models.PositiveSmallIntegerField()
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_recommendation_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} #{self.rank}: {self.recommended_id}"
+
+
+class CoPurchaseOrder(models.Model):
+    """An order whose basket is currently counted in ProductCoPurchase"""
+    order_id = models.BigIntegerField(primary_key=True)
+
+    def __str__(self):
+        return f"order {self.order_id}"
+
+
+class JobCheckpoint(models.Model):
+    """Resume position (a line or row number, or a time) for incremental batch jobs"""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    timestamp = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class SearchToken(models.Model):
+    """Word prefix index for admin search on databases without trigram/full-text support"""
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'token', 'object_id'], name='unique_search_token'),
+        ]
+        indexes = [
+            models.Index(fields=['content_type', 'object_id'], name='search_token_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.token} -> {self.content_type_id}:{self.object_id}"
@@ -0,0 +1,90 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Avg, Count, DecimalField, F, FloatField, Q, Value
+from django.db.models.functions import Cast, Greatest
+from .models import Product, Review
+
+RATING_BUCKETS = ('rating_1_count', 'rating_2_count', 'rating_3_count',
+                  'rating_4_count', 'rating_5_count')
+RATING_FIELDS = ('rating_avg', 'rating_count') + RATING_BUCKETS
+
+
+def _rating_update(deltas):
+    """
+    UPDATE expressions that apply per-star deltas to a product row.
+    All right-hand sides see the pre-update row, so the new average is
+    computed from the new bucket values directly.
+    """
+    new_buckets = {field: F(field) + delta for field, delta in zip(RATING_BUCKETS, deltas)}
+    new_count = F('rating_count') + sum(deltas)
+    new_sum = sum((stars * new_buckets[field] for stars, field in enumerate(RATING_BUCKETS, start=1)), Value(0))
+    average = Cast(new_sum, FloatField()) / Greatest(new_count, Value(1))
+
+    values = {field: new_buckets[field] for field, delta in zip(RATING_BUCKETS, deltas) if delta}
+    values['rating_count'] = new_count
+    values['rating_avg'] = Cast(average, DecimalField(max_digits=3, decimal_places=2))
+    return values
+
+
+def apply_rating_deltas(deltas):
+    """
+    Apply {product_id: [d1, d2, d3, d4, d5]} changes in approved-review
+    counts, one UPDATE per affected product.
+    """
+    for product_id, product_deltas in deltas.items():
+        if any(product_deltas):
+            Product.objects.filter(pk=product_id).update(**_rating_update(product_deltas))
+
+
+def review_deltas(*changes):
+    """Build a deltas mapping from (product_id, rating, sign) tuples"""
+    deltas = defaultdict(lambda: [0] * 5)
+    for product_id, rating, sign in changes:
+        deltas[product_id][rating - 1] += sign
+    return deltas
+
+
+def set_reviews_approved(queryset, is_approved):
+    """Flip is_approved on a Review queryset and fold the change into aggregates"""
+    sign = 1 if is_approved else -1
+    with transaction.atomic():
+        changing = queryset.filter(is_approved=not is_approved)
+        deltas = review_deltas(*(
+            (row['product_id'], row['rating'], sign * row['n'])
+            for row in changing.values('product_id', 'rating').annotate(n=Count('id')).order_by()
+        ))
+        updated = changing.update(is_approved=is_approved)
+        apply_rating_deltas(deltas)
+    return updated
+
+
+def reconcile_ratings(batch_size=1000):
+    """
+    Recompute every product's rating aggregates from approved reviews with a
+    single grouped query. Returns the number of products whose stored values
+    were out of date.
+    """
+    stars = {
+        field: Count('id', filter=Q(rating=stars))
+        for stars, field in enumerate(RATING_BUCKETS, start=1)
+    }
+    computed = {
+        row.pop('product_id'): row
+        for row in Review.objects.filter(is_approved=True).values('product_id').annotate(
+            rating_count=Count('id'), rating_avg=Avg('rating'), **stars
+        ).order_by()
+    }
+
+    stale = []
+    for product in Product.objects.only('pk', *RATING_FIELDS).iterator(chunk_size=batch_size):
+        row = computed.get(product.pk)
+        expected = {field: 0 for field in RATING_FIELDS} if row is None else row
+        expected['rating_avg'] = Decimal(expected['rating_avg']).quantize(Decimal('0.01'))
+        if any(getattr(product, field) != expected[field] for field in RATING_FIELDS):
+            for field in RATING_FIELDS:
+                setattr(product, field, expected[field])
+            stale.append(product)
+
+    Product.objects.bulk_update(stale, RATING_FIELDS, batch_size=batch_size)
+    return len(stale)
@@ -0,0 +1,184 @@
+from collections import Counter
+from datetime import timedelta
+from functools import reduce
+from itertools import combinations, groupby
+from operator import or_
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from orders.models import Order, OrderItem
+from .cards import aget_product_cards, get_product_cards
+from .models import CoPurchaseOrder, JobCheckpoint, Product, ProductCoPurchase, ProductRecommendation
+
+CHECKPOINT_NAME = 'copurchase_recommendations'
+TOP_K = 8
+ORDER_BATCH_SIZE = 5000
+# Orders changed up to this long before the previous run started are looked
+# at again, so one whose transaction committed after that run read the
+# orders table isn't missed. CoPurchaseOrder stops them being counted twice.
+CHECKPOINT_OVERLAP = timedelta(hours=1)
+
+
+def _changed_orders(since):
+    orders = Order.objects.all()
+    if since is not None:
+        orders = orders.filter(updated_at__gte=since - CHECKPOINT_OVERLAP)
+    return orders
+
+
+def _orders_to_add(since):
+    """Ids of orders changed since the checkpoint that count and aren't counted yet"""
+    return list(
+        _changed_orders(since).exclude(status='CANCELLED')
+        .exclude(id__in=CoPurchaseOrder.objects.values('order_id'))
+        .order_by('id').values_list('id', flat=True)
+    )
+
+
+def _orders_to_remove(since):
+    """Ids of counted orders that have been cancelled since the checkpoint"""
+    return list(
+        CoPurchaseOrder.objects.filter(
+            order_id__in=_changed_orders(since).filter(status='CANCELLED').values('id')
+        ).order_by('order_id').values_list('order_id', flat=True)
+    )
+
+
+def _order_baskets(order_ids):
+    """Yield (order_id, sorted product ids) for the given orders"""
+    rows = OrderItem.objects.filter(order_id__in=order_ids).values_list('order_id', 'product_id').order_by('order_id')
+
+    for order_id, items in groupby(rows.iterator(chunk_size=2000), key=lambda row: row[0]):
+        yield order_id, sorted({product_id for _, product_id in items})
+
+
+def _count_pairs(baskets, sign=1):
+    """Sparse co-occurrence counts for a batch of baskets, both directions"""
+    pairs = Counter()
+    for _, product_ids in baskets:
+        for a, b in combinations(product_ids, 2):
+            pairs[a, b] += sign
+            pairs[b, a] += sign
+    return pairs
+
+
+def _merge_counts(pairs):
+    """
+    Add batch counts (negative for cancelled orders) onto the stored matrix
+    with one bulk upsert; pairs whose count drops to zero are deleted.
+    """
+    products = {a for a, _ in pairs}
+    existing = {
+        (a, b): count
+        for a, b, count in ProductCoPurchase.objects.filter(product_id__in=products)
+        .values_list('product_id', 'related_id', 'count')
+    }
+    merged = {(a, b): existing.get((a, b), 0) + count for (a, b), count in pairs.items()}
+    ProductCoPurchase.objects.bulk_create(
+        [ProductCoPurchase(product_id=a, related_id=b, count=count) for (a, b), count in merged.items() if count > 0],
+        update_conflicts=True,
+        unique_fields=['product', 'related'],
+        update_fields=['count'],
+        batch_size=1000,
+    )
+    emptied = [Q(product_id=a, related_id=b) for (a, b), count in merged.items() if count <= 0]
+    for start in range(0, len(emptied), 500):
+        ProductCoPurchase.objects.filter(reduce(or_, emptied[start:start + 500])).delete()
+    return products
+
+
+def _rebuild_top_k(product_ids, top_k):
+    """Recompute the neighbour table for the given products from stored counts"""
+    neighbours = ProductCoPurchase.objects.filter(product_id__in=product_ids).values_list(
+        'product_id', 'related_id', 'count'
+    ).order_by('product_id', '-count', 'related_id')
+
+    recommendations = []
+    for product_id, rows in groupby(neighbours.iterator(chunk_size=2000), key=lambda row: row[0]):
+        for rank, (_, related_id, count) in enumerate(rows):
+            if rank == top_k:
+                break
+            recommendations.append(ProductRecommendation(
+                product_id=product_id, recommended_id=related_id, rank=rank, score=count
+            ))
+
+    ProductRecommendation.objects.filter(product_id__in=product_ids).delete()
+    ProductRecommendation.objects.bulk_create(recommendations, batch_size=1000)
+
+
+def _fold(order_ids, sign, top_k):
+    """Add (sign=1) or remove (sign=-1) a batch of orders' baskets and refresh the products they touch"""
+    baskets = list(_order_baskets(order_ids))
+    with transaction.atomic():
+        touched = _merge_counts(_count_pairs(baskets, sign))
+        _rebuild_top_k(touched, top_k)
+        if sign > 0:
+            CoPurchaseOrder.objects.bulk_create(
+                [CoPurchaseOrder(order_id=order_id) for order_id in order_ids], ignore_conflicts=True
+            )
+        else:
+            CoPurchaseOrder.objects.filter(order_id__in=order_ids).delete()
+    return touched
+
+
+def build_recommendations(full=False, top_k=TOP_K, batch_size=ORDER_BATCH_SIZE):
+    """
+    Fold orders changed since the last run into the co-occurrence matrix,
+    take out counted orders that have since been cancelled, and refresh
+    top-K neighbours for every product they touched. With full=True the
+    matrix is discarded and rebuilt from every order.
+    Returns (orders added or removed, products refreshed).
+    """
+    checkpoint, _ = JobCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+    if full:
+        with transaction.atomic():
+            ProductCoPurchase.objects.all().delete()
+            ProductRecommendation.objects.all().delete()
+            CoPurchaseOrder.objects.all().delete()
+            checkpoint.timestamp = None
+            checkpoint.save()
+
+    started = timezone.now()
+    since = checkpoint.timestamp
+    orders_processed = 0
+    refreshed = set()
+    for order_ids, sign in ((_orders_to_remove(since), -1), (_orders_to_add(since), 1)):
+        for start in range(0, len(order_ids), batch_size):
+            batch = order_ids[start:start + batch_size]
+            refreshed |= _fold(batch, sign, top_k)
+            orders_processed += len(batch)
+    checkpoint.timestamp = started
+    checkpoint.save()
+    return orders_processed, len(refreshed)
+
+
+def related_product_cards(product, limit=4):
+    """
+    Cards for "customers also bought" products in rank order, read from the
+    neighbour table in one query. Falls back to the same category when the
+    product has no purchase history.
+    """
+    cards = get_product_cards(
+        Product.objects.filter(is_active=True, recommended_for__product=product)
+        .order_by('recommended_for__rank')[:limit]
+    )
+    if not cards:
+        cards = get_product_cards(
+            Product.objects.filter(category_id=product.category_id, is_active=True)
+            .exclude(id=product.id)[:limit]
+        )
+    return cards
+
+
+async def arelated_product_cards(product, limit=4):
+    """related_product_cards for async views"""
+    cards = await aget_product_cards(
+        Product.objects.filter(is_active=True, recommended_for__product=product)
+        .order_by('recommended_for__rank')[:limit]
+    )
+    if not cards:
+        cards = await aget_product_cards(
+            Product.objects.filter(category_id=product.category_id, is_active=True)
+            .exclude(id=product.id)[:limit]
+        )
+    return cards
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .eligibility import invalidate_review_eligibility
+from .models import Review
+from .ratings import apply_rating_deltas, review_deltas
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_state(sender, instance, **kwargs):
+    """Capture the stored approval/rating so post_save can compute a delta"""
+    instance._previous_rating_state = None
+    if instance.pk:
+        instance._previous_rating_state = (
+            Review.objects.filter(pk=instance.pk).values_list('product_id', 'is_approved', 'rating').first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def update_ratings_on_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_rating_state', None)
+    if previous == (instance.product_id, instance.is_approved, instance.rating):
+        return
+
+    changes = []
+    if previous and previous[1]:
+        changes.append((previous[0], previous[2], -1))
+    if instance.is_approved:
+        changes.append((instance.product_id, instance.rating, 1))
+    apply_rating_deltas(review_deltas(*changes))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_eligibility_on_review_change(sender, instance, **kwargs):
+    if instance.user_id:
+        invalidate_review_eligibility(instance.user_id)
+
+
+@receiver(post_delete, sender=Review)
+def update_ratings_on_delete(sender, instance, **kwargs):
+    if instance.is_approved:
+        apply_rating_deltas(review_deltas((instance.product_id, instance.rating, -1)))
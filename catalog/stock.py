@@ -0,0 +1,218 @@
+import csv
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import NamedTuple
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import connection, transaction
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from .models import Product, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+STOCK_BATCH_SIZE = 1000
+
+# Sent after commit with the StockChange rows that actually changed
+stock_changed = Signal()
+
+
+class StockChange(NamedTuple):
+    sku: str
+    product_id: int
+    variant_id: int | None
+    old_stock: int
+    new_stock: int
+    old_price: Decimal | None = None
+    new_price: Decimal | None = None
+
+    def as_dict(self):
+        diff = {'sku': self.sku, 'stock_quantity': [self.old_stock, self.new_stock]}
+        if self.old_price != self.new_price:
+            diff['price'] = [str(self.old_price), str(self.new_price)]
+        return diff
+
+
+class StockRow(NamedTuple):
+    line: int
+    sku: str
+    stock_quantity: int
+    price: Decimal | None
+
+
+class InvalidStockRow(ValueError):
+    """A stock input line that cannot be applied"""
+
+
+def _stock_row(line, sku, stock, price=None):
+    sku = (sku or '').strip()
+    if not sku:
+        raise InvalidStockRow(f'line {line}: sku is required')
+    try:
+        stock = int(stock)
+    except (TypeError, ValueError):
+        raise InvalidStockRow(f'line {line}: stock_quantity {stock!r} is not a whole number')
+    if stock < 0:
+        raise InvalidStockRow(f'line {line}: stock_quantity must be zero or more')
+    if price in (None, ''):
+        return StockRow(line, sku, stock, None)
+    try:
+        price = Decimal(str(price)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise InvalidStockRow(f'line {line}: price {price!r} is not a number')
+    if price < 0:
+        raise InvalidStockRow(f'line {line}: price must be zero or more')
+    return StockRow(line, sku, stock, price)
+
+
+def read_stock_rows(lines, fmt='csv'):
+    """
+    Yield StockRow or InvalidStockRow for each input line. CSV rows are
+    `sku,stock_quantity[,price]` with an optional header; JSON lines are
+    objects with the same keys.
+    """
+    if fmt == 'jsonl':
+        for line, text in enumerate(lines, start=1):
+            if not text.strip():
+                continue
+            try:
+                data = json.loads(text)
+                yield _stock_row(line, data.get('sku'), data.get('stock_quantity'), data.get('price'))
+            except (InvalidStockRow, ValueError, AttributeError) as error:
+                yield error if isinstance(error, InvalidStockRow) else InvalidStockRow(f'line {line}: {error}')
+        return
+
+    for line, row in enumerate(csv.reader(lines), start=1):
+        if not row or (line == 1 and row[0].strip().lower() == 'sku'):
+            continue
+        try:
+            yield _stock_row(line, *row[:3])
+        except InvalidStockRow as error:
+            yield error
+        except TypeError:
+            yield InvalidStockRow(f'line {line}: expected sku,stock_quantity[,price]')
+
+
+def _update_rows(model, rows, fields, now):
+    """
+    Write {pk: {field: value}} with one UPDATE: joined against a VALUES list
+    on PostgreSQL, a CASE per column (bulk_update) elsewhere.
+    """
+    if not rows:
+        return
+    if connection.vendor == 'postgresql':
+        quote = connection.ops.quote_name
+        casts = ', '.join(['%s::bigint'] + [
+            f'%s::{model._meta.get_field(field).db_type(connection)}' for field in fields
+        ])
+        sql = (
+            f'UPDATE {quote(model._meta.db_table)} AS t SET '
+            + ', '.join(f'{quote(field)} = v.{quote(field)}' for field in fields)
+            + f', {quote("updated_at")} = %s '
+            f'FROM (VALUES {", ".join([f"({casts})"] * len(rows))}) '
+            f'AS v(id, {", ".join(quote(field) for field in fields)}) WHERE t.id = v.id'
+        )
+        params = [now] + [value for pk, row in rows.items() for value in (pk, *(row[field] for field in fields))]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+    else:
+        objs = [model(pk=pk, updated_at=now, **row) for pk, row in rows.items()]
+        model.objects.bulk_update(objs, fields + ['updated_at'], batch_size=len(objs))
+
+
+def _apply_batch(batch, dry_run):
+    """Apply one batch of StockRows; returns (changes, unchanged count, unknown skus, errors)"""
+    rows = {row.sku: row for row in batch}
+    changes, errors = [], []
+    product_updates, variant_updates = {}, {}
+
+    with transaction.atomic():
+        products = Product.objects.select_for_update().filter(sku__in=rows).values_list(
+            'id', 'sku', 'stock_quantity', 'price'
+        )
+        variants = ProductVariant.objects.select_for_update().filter(sku__in=rows).values_list(
+            'id', 'sku', 'product_id', 'stock_quantity'
+        )
+        found, rejected = set(), set()
+        for pk, sku, stock, price in products:
+            found.add(sku)
+            row = rows[sku]
+            new_price = price if row.price is None else row.price
+            if row.stock_quantity != stock or new_price != price:
+                product_updates[pk] = {'stock_quantity': row.stock_quantity, 'price': new_price}
+                changes.append(StockChange(sku, pk, None, stock, row.stock_quantity, price, new_price))
+        for pk, sku, product_id, stock in variants:
+            found.add(sku)
+            row = rows[sku]
+            if row.price is not None:
+                errors.append(f'line {row.line}: price can only be set on product SKUs')
+                rejected.add(sku)
+                continue
+            if row.stock_quantity != stock:
+                variant_updates[pk] = {'stock_quantity': row.stock_quantity}
+                changes.append(StockChange(sku, product_id, pk, stock, row.stock_quantity))
+
+        if not dry_run:
+            now = timezone.now()
+            _update_rows(Product, product_updates, ['stock_quantity', 'price'], now)
+            _update_rows(ProductVariant, variant_updates, ['stock_quantity'], now)
+            if changes:
+                transaction.on_commit(lambda: stock_changed.send(sender=Product, changes=changes))
+
+    unknown = [sku for sku in rows if sku not in found]
+    unchanged = len(found - rejected) - len({change.sku for change in changes})
+    return changes, unchanged, unknown, errors
+
+
+def apply_stock_updates(rows, batch_size=STOCK_BATCH_SIZE, dry_run=False):
+    """
+    Apply an iterable from read_stock_rows in batches, each in its own
+    transaction. Returns a summary dict with per-SKU diffs of what changed.
+    """
+    result = {'changed': [], 'unchanged': 0, 'unknown': [], 'errors': []}
+
+    def flush(batch):
+        changes, unchanged, unknown, errors = _apply_batch(batch, dry_run)
+        result['changed'].extend(change.as_dict() for change in changes)
+        result['unchanged'] += unchanged
+        result['unknown'].extend(unknown)
+        result['errors'].extend(errors)
+
+    batch = []
+    for row in rows:
+        if isinstance(row, InvalidStockRow):
+            result['errors'].append(str(row))
+            continue
+        batch.append(row)
+        if len(batch) == batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return result
+
+
+@receiver(stock_changed)
+def broadcast_stock(sender, changes, **kwargs):
+    """Push new stock levels to live product page sockets"""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    levels = dict(
+        Product.objects.filter(id__in={change.product_id for change in changes})
+        .values_list('id', 'stock_quantity')
+    )
+    for product_id, stock in levels.items():
+        try:
+            async_to_sync(layer.group_send)(f'product_live_{product_id}', {
+                'type': 'stock_update',
+                'product_id': product_id,
+                'stock_quantity': stock,
+                'variants': {
+                    change.variant_id: change.new_stock
+                    for change in changes if change.product_id == product_id and change.variant_id
+                },
+            })
+        except Exception:
+            logger.exception('Could not broadcast stock for product %s', product_id)
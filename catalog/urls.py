@@ -1,13 +1,22 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'catalog'
 
-urlpatterns = [
-    path('', views.home, name='home'),
-    path('dashboard/', views.admin_dashboard, name='admin_dashboard'),
-    path('products/', views.ProductListView.as_view(), name='product_list'),
-    path('products/category/<slug:category_slug>/', views.ProductListView.as_view(), name='product_list_by_category'),
-    path('product/<slug:slug>/', views.ProductDetailView.as_view(), name='product_detail'),
-    path('product/<slug:slug>/review/', views.add_review, name='add_review'),
-]
+
+def catalog_patterns(pages):
+    """The catalog's URLs, serving the read views and stock feed from `pages` (views or async_views)"""
+    return [
+        path('', pages.home, name='home'),
+        path('dashboard/', views.admin_dashboard, name='admin_dashboard'),
+        path('products/', pages.ProductListView.as_view(), name='product_list'),
+        path('products/category/<slug:category_slug>/', pages.ProductListView.as_view(), name='product_list_by_category'),
+        path('product/<slug:slug>/', pages.ProductDetailView.as_view(), name='product_detail'),
+        path('product/<slug:slug>/reviews/', pages.product_reviews, name='product_reviews'),
+        path('product/<slug:slug>/review/', views.add_review, name='add_review'),
+        path('api/stock/', pages.bulk_stock_update, name='bulk_stock_update'),
+    ]
+
+
+urlpatterns = catalog_patterns(async_views if settings.CATALOG_ASYNC_VIEWS else views)
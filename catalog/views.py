@@ -1,15 +1,101 @@
+import hmac
 from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.views.generic import ListView, DetailView
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Avg, Count, F
+from django.db import IntegrityError
+from django.db.models import Sum, Avg, Count, F, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from datetime import timedelta
 from .models import Product, Category, Brand, Review
+from .cards import get_product_cards
+from .eligibility import can_review, has_purchased, has_reviewed
+from .recommendations import related_product_cards
+from .stock import apply_stock_updates, read_stock_rows
 from orders.models import OrderItem, Order
 from customers.models import Customer
+from shopping_store.db_router import replica_reads
+from shopping_store.money import Money
 
 
+REVIEWS_PAGE_SIZE = 5
+
+
+def _review_page_queryset(reviews, cursor, page_size):
+    reviews = reviews.filter(is_approved=True).only(
+        'id', 'customer_name', 'rating', 'title', 'comment', 'is_verified_purchase', 'created_at'
+    )
+    if cursor:
+        created_at, pk = cursor
+        reviews = reviews.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return reviews.order_by('-created_at', '-id')[:page_size + 1]
+
+
+def _split_review_page(page, page_size):
+    if len(page) <= page_size:
+        return page, None
+    page = page[:page_size]
+    return page, f'{page[-1].created_at.isoformat()}_{page[-1].pk}'
+
+
+def get_review_page(reviews, cursor=None, page_size=REVIEWS_PAGE_SIZE):
+    """
+    Keyset-paginate approved reviews, newest first.
+    Returns the page and the cursor for the next one (None on the last page).
+    """
+    return _split_review_page(list(_review_page_queryset(reviews, cursor, page_size)), page_size)
+
+
+async def aget_review_page(reviews, cursor=None, page_size=REVIEWS_PAGE_SIZE):
+    """get_review_page for async views"""
+    page = [review async for review in _review_page_queryset(reviews, cursor, page_size)]
+    return _split_review_page(page, page_size)
+
+
+def parse_review_cursor(value):
+    """Inverse of the cursor built by get_review_page; None if malformed"""
+    created_at, _, pk = value.rpartition('_')
+    created_at = parse_datetime(created_at)
+    if created_at is None or not pk.isdigit():
+        return None
+    return created_at, int(pk)
+
+
+def filter_products(request, category_slug=None):
+    """Active products for the listing, filtered and sorted by the query string"""
+    queryset = Product.objects.filter(is_active=True).select_related('category', 'brand')
+    
+    # Filter by category
+    if category_slug:
+        queryset = queryset.filter(category__slug=category_slug)
+    
+    # Filter by brand
+    brand_slug = request.GET.get('brand')
+    if brand_slug:
+        queryset = queryset.filter(brand__slug=brand_slug)
+    
+    # Filter by gender
+    gender = request.GET.get('gender')
+    if gender:
+        queryset = queryset.filter(gender=gender)
+    
+    # Sorting
+    sort = request.GET.get('sort', '-created_at')
+    return queryset.order_by(sort)
+
+
+def product_detail_queryset():
+    return Product.objects.filter(is_active=True).select_related('category', 'brand').prefetch_related(
+        'images', 'variants__size', 'variants__color'
+    )
+
+
+@replica_reads
 class ProductListView(ListView):
     """Display list of products"""
     model = Product
@@ -18,28 +104,13 @@ class ProductListView(ListView):
     paginate_by = 24
 
     def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True).select_related('category', 'brand')
-        
-        # Filter by category
-        category_slug = self.kwargs.get('category_slug')
-        if category_slug:
-            queryset = queryset.filter(category__slug=category_slug)
-        
-        # Filter by brand
-        brand_slug = self.request.GET.get('brand')
-        if brand_slug:
-            queryset = queryset.filter(brand__slug=brand_slug)
-        
-        # Filter by gender
-        gender = self.request.GET.get('gender')
-        if gender:
-            queryset = queryset.filter(gender=gender)
-        
-        # Sorting
-        sort = self.request.GET.get('sort', '-created_at')
-        queryset = queryset.order_by(sort)
-        
-        return queryset
+        return filter_products(self.request, self.kwargs.get('category_slug'))
+
+    def paginate_queryset(self, queryset, page_size):
+        # Only the rows on the current page are projected into cards
+        paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+        page.object_list = get_product_cards(object_list)
+        return paginator, page, page.object_list, is_paginated
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -48,6 +119,7 @@ class ProductListView(ListView):
         return context
 
 
+@replica_reads
 class ProductDetailView(DetailView):
     """Display product details"""
     model = Product
@@ -56,56 +128,49 @@ class ProductDetailView(DetailView):
     slug_field = 'slug'
 
     def get_queryset(self):
-        return Product.objects.filter(is_active=True).select_related('category', 'brand').prefetch_related(
-            'images', 'variants__size', 'variants__color', 'reviews'
-        )
+        return product_detail_queryset()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['related_products'] = Product.objects.filter(
-            category=self.object.category,
-            is_active=True
-        ).exclude(id=self.object.id)[:4]
-        context['approved_reviews'] = self.object.reviews.filter(is_approved=True)
+        context['related_products'] = related_product_cards(self.object)
+        context['approved_reviews'], context['reviews_next_cursor'] = get_review_page(self.object.reviews)
         
-        # Check if user can review (must have delivered order with this product)
-        if self.request.user.is_authenticated:
-            has_purchased = OrderItem.objects.filter(
-                order__customer=self.request.user,
-                order__status='DELIVERED',
-                product=self.object
-            ).exists()
-            
-            has_reviewed = Review.objects.filter(
-                product=self.object,
-                customer_email=self.request.user.email
-            ).exists()
-            
-            context['can_review'] = has_purchased and not has_reviewed
-        else:
-            context['can_review'] = False
+        # Users may review products from delivered orders, once each
+        context['can_review'] = can_review(self.request.user, self.object.id)
         
         return context
 
 
+@replica_reads
+def product_reviews(request, slug):
+    """HTML fragment with the next page of approved reviews for a product"""
+    cursor = None
+    if request.GET.get('after'):
+        cursor = parse_review_cursor(request.GET['after'])
+        if cursor is None:
+            return HttpResponseBadRequest('Invalid cursor')
+
+    reviews = Review.objects.filter(product__slug=slug, product__is_active=True)
+    approved_reviews, next_cursor = get_review_page(reviews, cursor)
+    return render(request, 'catalog/review_list.html', {
+        'approved_reviews': approved_reviews,
+        'reviews_next_cursor': next_cursor,
+        'product_slug': slug,
+    })
+
+
 @login_required
 def add_review(request, slug):
     """Add a product review - only for delivered orders"""
     product = get_object_or_404(Product, slug=slug, is_active=True)
     
     # Check if user has purchased and received this product
-    has_purchased = OrderItem.objects.filter(
-        order__customer=request.user,
-        order__status='DELIVERED',
-        product=product
-    ).exists()
-    
-    if not has_purchased:
+    if not has_purchased(request.user, product.id):
         messages.error(request, 'You can only review products you have purchased and received.')
         return redirect('catalog:product_detail', slug=slug)
     
     # Check if already reviewed
-    if Review.objects.filter(product=product, customer_email=request.user.email).exists():
+    if has_reviewed(request.user, product.id):
         messages.warning(request, 'You have already reviewed this product.')
         return redirect('catalog:product_detail', slug=slug)
     
@@ -127,16 +192,22 @@ def add_review(request, slug):
             return redirect('catalog:product_detail', slug=slug)
         
         # Create review
-        Review.objects.create(
-            product=product,
-            customer_name=request.user.get_full_name() or request.user.username,
-            customer_email=request.user.email,
-            rating=rating,
-            title=title,
-            comment=comment,
-            is_verified_purchase=True,
-            is_approved=False  # Requires admin approval
-        )
+        try:
+            Review.objects.create(
+                product=product,
+                user=request.user,
+                customer_name=request.user.get_full_name() or request.user.username,
+                customer_email=request.user.email,
+                rating=rating,
+                title=title,
+                comment=comment,
+                is_verified_purchase=True,
+                is_approved=False  # Requires admin approval
+            )
+        except IntegrityError:
+            # A concurrent submission won the unique (product, user) constraint
+            messages.warning(request, 'You have already reviewed this product.')
+            return redirect('catalog:product_detail', slug=slug)
         
         messages.success(request, 'Thank you for your review! It will be published after approval.')
         return redirect('catalog:product_detail', slug=slug)
@@ -144,16 +215,18 @@ def add_review(request, slug):
     return redirect('catalog:product_detail', slug=slug)
 
 
+@replica_reads
 def home(request):
     """Homepage view"""
     context = {
-        'featured_products': Product.objects.filter(is_active=True, is_featured=True)[:8],
+        'featured_products': get_product_cards(Product.objects.filter(is_active=True, is_featured=True)[:8]),
         'categories': Category.objects.filter(is_active=True, parent=None)[:6],
-        'new_arrivals': Product.objects.filter(is_active=True).order_by('-created_at')[:8],
+        'new_arrivals': get_product_cards(Product.objects.filter(is_active=True).order_by('-created_at')[:8]),
     }
     return render(request, 'catalog/home.html', context)
 
 
+@replica_reads
 @login_required
 def admin_dashboard(request):
     """Admin dashboard with analytics and charts"""
@@ -171,7 +244,8 @@ def admin_dashboard(request):
     total_orders = Order.objects.count()
     total_revenue = Order.objects.filter(
         status__in=['PROCESSING', 'SHIPPED', 'DELIVERED']
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
+    ).aggregate(total=Sum('total_amount'))['total']
+    total_revenue = Money.from_decimal(total_revenue)
     
     total_sales = OrderItem.objects.filter(
         order__status__in=['PROCESSING', 'SHIPPED', 'DELIVERED']
@@ -184,14 +258,14 @@ def admin_dashboard(request):
         item_profit=(F('unit_price') - F('product__cost_price')) * F('quantity')
     ).aggregate(total_profit=Sum('item_profit'))
     
-    total_profit = profit_data['total_profit'] or 0
+    total_profit = Money.from_decimal(profit_data['total_profit'])
     
     # Recent metrics (last 30 days)
     recent_orders_count = Order.objects.filter(created_at__gte=last_30_days).count()
-    recent_revenue = Order.objects.filter(
+    recent_revenue = Money.from_decimal(Order.objects.filter(
         created_at__gte=last_30_days,
         status__in=['PROCESSING', 'SHIPPED', 'DELIVERED']
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
+    ).aggregate(total=Sum('total_amount'))['total'])
     
     # Monthly Revenue Data (last 12 months)
     monthly_revenue = []
@@ -203,11 +277,11 @@ def admin_dashboard(request):
             created_at__date__gte=month_start,
             created_at__date__lte=month_end,
             status__in=['PROCESSING', 'SHIPPED', 'DELIVERED']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
+        ).aggregate(total=Sum('total_amount'))['total']
         
         monthly_revenue.append({
             'month': month_start.strftime('%b %Y'),
-            'revenue': float(revenue)
+            'revenue': float(Money.from_decimal(revenue))
         })
     
     # Sales by Category
@@ -256,9 +330,9 @@ def admin_dashboard(request):
     ).order_by('status')
     
     # Average Order Value
-    avg_order_value = Order.objects.filter(
+    avg_order_value = Money.from_decimal(Order.objects.filter(
         status__in=['PROCESSING', 'SHIPPED', 'DELIVERED']
-    ).aggregate(avg=Avg('total_amount'))['avg'] or 0
+    ).aggregate(avg=Avg('total_amount'))['avg'])
     
     # Pending Reviews
     pending_reviews_count = Review.objects.filter(is_approved=False).count()
@@ -284,3 +358,28 @@ def admin_dashboard(request):
     }
     
     return render(request, 'catalog/admin_dashboard.html', context)
+
+
+@csrf_exempt
+@require_POST
+def bulk_stock_update(request):
+    """
+    Apply warehouse stock (and optional product price) updates streamed in
+    the request body as CSV (sku,stock_quantity[,price]) or JSON lines.
+    Authenticated with the STOCK_SYNC_TOKEN bearer token; ?dry_run=1
+    reports the diffs without writing.
+    """
+    if not stock_sync_authorized(request):
+        return JsonResponse({'error': 'A valid bearer token is required.'}, status=401)
+    return JsonResponse(stock_update_result(request))
+
+
+def stock_sync_authorized(request):
+    token = settings.STOCK_SYNC_TOKEN
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+
+def stock_update_result(request):
+    fmt = 'jsonl' if 'json' in request.content_type else 'csv'
+    lines = (line.decode('utf-8') for line in request)
+    return apply_stock_updates(read_stock_rows(lines, fmt), dry_run=request.GET.get('dry_run') == '1')
@@ -31,5 +31,5 @@ if User.objects.exists():
             items = OrderItem.objects.filter(order__customer=user, order__status='DELIVERED')
             print(f"  Products in delivered orders: {items.count()}")
             for item in items[:3]:
-                has_review = Review.objects.filter(product=item.product, customer_email=user.email).exists()
+                has_review = Review.objects.filter(product=item.product, user=user).exists()
                 print(f"    - {item.product.name} (Reviewed: {has_review})")
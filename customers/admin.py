@@ -1,14 +1,23 @@
 from django.contrib import admin
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Customer, Address
+from shopping_store.admin_mixins import ComputedColumnsMixin, EstimatedCountMixin, IndexedSearchMixin
+from .models import Customer, Address, QueuedEmail
 
 
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(IndexedSearchMixin, ComputedColumnsMixin, admin.ModelAdmin):
     list_display = ['user_full_name', 'email', 'phone', 'is_vip', 'loyalty_points', 
                    'total_orders_count', 'newsletter_subscribed', 'created_at']
+    list_select_related = ['user']
+    computed_columns = {
+        'orders_total': Count('user__orders'),
+        'spent_total': Sum('user__orders__total_amount', filter=Q(user__orders__status='DELIVERED')),
+    }
     list_filter = ['is_vip', 'newsletter_subscribed', 'gender', 'created_at']
     search_fields = ['user__username', 'user__email', 'user__first_name', 'user__last_name', 'phone']
+    exact_search_fields = ['user__email']
     readonly_fields = ['created_at', 'updated_at', 'total_orders_count', 'total_spent_amount']
     
     list_editable = ['is_vip']
@@ -47,20 +56,21 @@ class CustomerAdmin(admin.ModelAdmin):
     email.admin_order_field = 'user__email'
 
     def total_orders_count(self, obj):
-        count = obj.total_orders
-        return format_html('<strong>{}</strong>', count)
+        return format_html('<strong>{}</strong>', obj.orders_total)
     total_orders_count.short_description = 'Total Orders'
+    total_orders_count.admin_order_field = 'orders_total'
 
     def total_spent_amount(self, obj):
-        amount = obj.total_spent
-        return format_html('<strong>₹{:,.2f}</strong>', amount)
+        return format_html('<strong>₹{}</strong>', f'{obj.spent_total or 0:,.2f}')
     total_spent_amount.short_description = 'Total Spent'
+    total_spent_amount.admin_order_field = 'spent_total'
 
 
 @admin.register(Address)
 class AddressAdmin(admin.ModelAdmin):
     list_display = ['full_name', 'customer_name', 'address_type', 'city', 'state', 
                    'is_default', 'is_active']
+    list_select_related = ['customer']
     list_filter = ['address_type', 'is_default', 'is_active', 'country', 'state']
     search_fields = ['full_name', 'customer__username', 'customer__email', 
                     'address_line1', 'city', 'postal_code']
@@ -92,3 +102,19 @@ class AddressAdmin(admin.ModelAdmin):
     customer_name.short_description = 'Customer'
     customer_name.admin_order_field = 'customer__first_name'
 
+
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(EstimatedCountMixin, admin.ModelAdmin):
+    list_display = ['id', 'subject', 'to', 'status', 'attempts', 'available_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    readonly_fields = ['subject', 'body', 'html_body', 'from_email', 'to', 'cc', 'bcc', 'reply_to', 'headers',
+                       'status', 'attempts', 'last_error', 'available_at', 'created_at', 'sent_at']
+    actions = ['retry_emails']
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry_emails(self, request, queryset):
+        updated = queryset.exclude(status='SENT').update(status='PENDING', attempts=0, available_at=timezone.now())
+        self.message_user(request, f'{updated} email(s) queued for retry.')
+    retry_emails.short_description = 'Retry now'
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class CustomersConfig(AppConfig):
     name = 'customers'
+
+    def ready(self):
+        from shopping_store import search
+
+        search.register(
+            self.get_model('Customer'),
+            ['user__username', 'user__email', 'user__first_name', 'user__last_name', 'phone'],
+        )
@@ -0,0 +1,188 @@
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.utils import timezone
+from .models import QueuedEmail
+
+logger = logging.getLogger(__name__)
+
+EMAIL_BATCH_SIZE = 100
+MAX_ATTEMPTS = 6
+BASE_BACKOFF = 60
+MAX_BACKOFF = 60 * 60 * 6
+# How long a claimed batch stays invisible to other workers
+CLAIM_TIMEOUT = timedelta(minutes=15)
+
+
+def delivery_connection(**kwargs):
+    """Connection to the backend that actually delivers mail (SMTP, console, file)"""
+    return get_connection(settings.EMAIL_DELIVERY_BACKEND, **kwargs)
+
+
+def _storable(message):
+    """Plain-text messages with at most an HTML alternative and no attachments"""
+    return (
+        not message.attachments
+        and message.content_subtype == 'plain'
+        and all(mimetype == 'text/html' for _, mimetype in getattr(message, 'alternatives', []))
+    )
+
+
+def _queued(message):
+    html = [content for content, _ in getattr(message, 'alternatives', [])]
+    return QueuedEmail(
+        subject=message.subject,
+        body=message.body,
+        html_body=html[0] if html else '',
+        from_email=message.from_email,
+        to=list(message.to),
+        cc=list(message.cc),
+        bcc=list(message.bcc),
+        reply_to=list(message.reply_to),
+        headers=dict(message.extra_headers),
+    )
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    EMAIL_BACKEND for web processes: stores messages as QueuedEmail rows
+    instead of talking to the mail server. Messages the queue can't hold
+    (attachments, non-HTML alternatives) go straight to the delivery backend.
+    """
+
+    def send_messages(self, email_messages):
+        queued, direct = [], []
+        for message in email_messages:
+            if message.recipients():
+                (queued if _storable(message) else direct).append(message)
+        if queued:
+            QueuedEmail.objects.bulk_create([_queued(message) for message in queued])
+        sent = len(queued)
+        if direct:
+            sent += delivery_connection(fail_silently=self.fail_silently).send_messages(direct) or 0
+        return sent
+
+
+def build_message(email, connection=None):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.to,
+        cc=email.cc,
+        bcc=email.bcc,
+        reply_to=email.reply_to,
+        headers=email.headers,
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number `attempts`"""
+    return min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (attempts - 1))
+
+
+class Throttle:
+    """Spaces calls to wait() at least 1/rate seconds apart; rate 0 means no limit"""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(self.next_at, now) + self.interval
+
+
+def claim_batch(batch_size=EMAIL_BATCH_SIZE, lease=CLAIM_TIMEOUT):
+    """
+    Claim up to `batch_size` due emails with SELECT ... FOR UPDATE SKIP
+    LOCKED and lease them for `lease` by pushing available_at out.
+    The claim commits before anything is sent, so no row lock is held while
+    talking to the mail server; emails of a worker that dies mid-batch
+    become due again when the lease runs out.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        QueuedEmail.objects.filter(id__in=[email.id for email in emails]).update(available_at=now + lease)
+    return emails
+
+
+def send_batch(connection, batch_size=EMAIL_BATCH_SIZE, throttle=None):
+    """
+    Claim up to `batch_size` due emails and send them over `connection`,
+    which the caller keeps open. Failed sends are retried with exponential
+    backoff and marked DEAD after MAX_ATTEMPTS. If the mail server can't be
+    reached the rest of the batch is released for later. Returns the number
+    of emails sent or failed.
+    """
+    # Long enough for the whole batch at the throttled rate
+    lease = CLAIM_TIMEOUT + timedelta(seconds=batch_size * throttle.interval if throttle else 0)
+    emails = claim_batch(batch_size, lease)
+    handled = []
+    try:
+        for email in emails:
+            try:
+                # No-op while the connection is open; reconnects after a failure
+                connection.open()
+            except Exception:
+                logger.exception('Could not connect to the mail server')
+                break
+            if throttle:
+                throttle.wait()
+            try:
+                connection.send_messages([build_message(email, connection)])
+            except Exception as error:
+                connection.close()
+                email.attempts += 1
+                email.last_error = f'{type(error).__name__}: {error}'
+                if email.attempts >= MAX_ATTEMPTS:
+                    email.status = 'DEAD'
+                    logger.exception('Email %s to %s failed permanently', email.id, email.to)
+                else:
+                    email.available_at = timezone.now() + timedelta(seconds=backoff(email.attempts))
+                    logger.warning('Email %s failed, retry %s', email.id, email.attempts)
+            else:
+                email.status = 'SENT'
+                email.sent_at = timezone.now()
+            handled.append(email)
+    finally:
+        QueuedEmail.objects.bulk_update(handled, ['status', 'attempts', 'last_error', 'available_at', 'sent_at'])
+        unsent = [email.id for email in emails[len(handled):]]
+        if unsent:
+            QueuedEmail.objects.filter(id__in=unsent).update(available_at=timezone.now())
+    return len(handled)
+
+
+def send_queued(batch_size=EMAIL_BATCH_SIZE, rate=None, connection=None):
+    """
+    Send every due email over a single connection, at most `rate` messages
+    a second (EMAIL_RATE_LIMIT by default). Returns the number handled.
+    """
+    connection = connection or delivery_connection()
+    throttle = Throttle(settings.EMAIL_RATE_LIMIT if rate is None else rate)
+    total = 0
+    try:
+        while True:
+            handled = send_batch(connection, batch_size, throttle)
+            total += handled
+            if handled < batch_size:
+                return total
+    finally:
+        connection.close()
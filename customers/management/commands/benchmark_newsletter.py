@@ -0,0 +1,61 @@
+import os
+import tempfile
+import time
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from customers.mail import EMAIL_BATCH_SIZE, QueuedEmailBackend, send_queued
+from customers.models import Customer, QueuedEmail
+
+SEED_BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = ('Queues a newsletter to every subscribed customer inside a rolled-back transaction and '
+            'sends it through the file backend, reporting throughput')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=0,
+                            help='Extra subscribed customers to create for the run')
+        parser.add_argument('--batch-size', type=int, default=EMAIL_BATCH_SIZE)
+        parser.add_argument('--rate', type=float, default=0, help='Messages per second, 0 for no limit')
+
+    def seed(self, count):
+        prefix = f'newsletter-benchmark-{time.time_ns()}'
+        for start in range(0, count, SEED_BATCH_SIZE):
+            users = User.objects.bulk_create(
+                User(username=f'{prefix}-{i}', email=f'{prefix}-{i}@example.com')
+                for i in range(start, min(start + SEED_BATCH_SIZE, count))
+            )
+            Customer.objects.bulk_create(Customer(user=user, newsletter_subscribed=True) for user in users)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['subscribers'])
+            emails = (
+                Customer.objects.filter(newsletter_subscribed=True)
+                .exclude(user__email='')
+                .values_list('user__email', flat=True)
+            )
+
+            started = time.monotonic()
+            queued = QueuedEmailBackend().send_messages(
+                EmailMessage('Fashion Store newsletter', 'New arrivals this week.', to=[email])
+                for email in emails.iterator()
+            )
+            queue_time = time.monotonic() - started
+
+            with tempfile.TemporaryDirectory() as path:
+                connection = get_connection('django.core.mail.backends.filebased.EmailBackend', file_path=path)
+                started = time.monotonic()
+                sent = send_queued(options['batch_size'], options['rate'], connection)
+                send_time = time.monotonic() - started
+                connections = len(os.listdir(path))
+            dead = QueuedEmail.objects.exclude(status='SENT').count()
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'Queued {queued} emails in {queue_time:.2f}s '
+                          f'({queued / max(queue_time, 1e-9):.0f}/s)')
+        self.stdout.write(f'Sent {sent} emails in {send_time:.2f}s ({sent / max(send_time, 1e-9):.0f}/s) '
+                          f'over {connections} connection(s); {dead} not sent')
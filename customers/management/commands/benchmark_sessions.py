@@ -0,0 +1,46 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from customers.models import Customer
+
+ENGINES = ['django.contrib.sessions.backends.db', 'shopping_store.sessions']
+PAGES = ['/', '/products/', '/cart/', '/account/profile/', '/orders/my-orders/']
+
+
+class Command(BaseCommand):
+    help = ('Logs a customer in inside a rolled-back transaction and compares queries per page view '
+            'for the database and cached session engines')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', type=int, default=50, help='Page views per engine')
+
+    def measure(self, engine, views):
+        with override_settings(SESSION_ENGINE=engine, SECURE_SSL_REDIRECT=False):
+            caches['default'].clear()
+            user = User.objects.create_user(f'session-benchmark-{engine}')
+            Customer.objects.get_or_create(user=user)
+            client = Client()
+            client.force_login(user)
+            with CaptureQueriesContext(connection) as queries:
+                for n in range(views):
+                    client.get(PAGES[n % len(PAGES)])
+        session_queries = [q for q in queries if 'django_session' in q['sql']]
+        return len(queries) / views, len(session_queries) / views
+
+    def handle(self, *args, **options):
+        views = options['views']
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                results = {engine: self.measure(engine, views) for engine in ENGINES}
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+
+        for engine, (total, session) in results.items():
+            self.stdout.write(f'{engine}: {total:.1f} queries per page view, {session:.2f} on django_session')
+        saved = results[ENGINES[0]][0] - results[ENGINES[1]][0]
+        self.stdout.write(self.style.SUCCESS(f'{saved:.1f} fewer queries per page view over {views} views.'))
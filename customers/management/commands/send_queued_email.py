@@ -0,0 +1,39 @@
+import logging
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from customers.mail import EMAIL_BATCH_SIZE, send_queued
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Sends queued email in batches over one mail server connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EMAIL_BATCH_SIZE)
+        parser.add_argument('--rate', type=float, help='Messages per second (default EMAIL_RATE_LIMIT, 0 for no limit)')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to sleep when idle')
+        parser.add_argument('--once', action='store_true', help='Send due email and exit')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            sent = send_queued(options['batch_size'], options['rate'])
+            self.stdout.write(self.style.SUCCESS(f'Handled {sent} queued emails.'))
+            return
+
+        self.stdout.write('Email worker started; Ctrl+C to stop.')
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    sent = send_queued(options['batch_size'], options['rate'])
+                except Exception:
+                    logger.exception('Email worker batch failed')
+                    sent = 0
+                if sent:
+                    self.stdout.write(f'Handled {sent} queued emails.')
+                else:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Email worker stopped.')
@@ -1,3 +1,4 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.utils import timezone
 from customers.utils import get_client_ip
 from customers.models import Customer
@@ -6,11 +7,27 @@ class UserActivityMiddleware:
     """
     Middleware to update last_activity and last_ip for authenticated users.
     """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
         response = self.get_response(request)
+        self.record_activity(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        await sync_to_async(self.record_activity)(request)
+        return response
+
+    def record_activity(self, request):
         if request.user.is_authenticated:
             try:
                 customer = request.user.customer_profile
@@ -19,4 +36,3 @@ class UserActivityMiddleware:
                 customer.save(update_fields=["last_activity", "last_ip"])
             except Customer.DoesNotExist:
                 pass
-        return response
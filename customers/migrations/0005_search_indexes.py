@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-19 09:03
+
+from django.db import migrations
+from shopping_store.migration_operations import CreateSearchIndexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0004_customer_last_activity_customer_last_ip'),
+    ]
+
+    operations = [
+        CreateSearchIndexes(trigram=[
+            ('auth_user_username_trgm', 'auth_user', 'username'),
+            ('auth_user_email_trgm', 'auth_user', 'email'),
+            ('auth_user_first_name_trgm', 'auth_user', 'first_name'),
+            ('auth_user_last_name_trgm', 'auth_user', 'last_name'),
+            ('customers_customer_phone_trgm', 'customers_customer', 'phone'),
+        ]),
+    ]
@@ -1,3 +1,179 @@
-from django.test import TestCase
+import os
+import tempfile
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.core.mail.backends import locmem
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from orders.models import Order
+from shopping_store.sessions import SessionStore
+from shopping_store.testing import StoreTestCase
+from .mail import MAX_ATTEMPTS, claim_batch, send_queued
+from .models import Customer, QueuedEmail
 
-# Create your tests here.
+
+class CustomerAdminQueryCountTests(StoreTestCase):
+    """The customer changelist must not count orders per row"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_customers(self, count):
+        for _ in range(count):
+            user = User.objects.create_user(f'customer{Customer.objects.count()}')
+            Customer.objects.create(user=user)
+            Order.objects.create(customer=user, status='DELIVERED', total_amount=Decimal('25.00'))
+            Order.objects.create(customer=user, status='PENDING', total_amount=Decimal('5.00'))
+
+    def test_customer_changelist(self):
+        self.assertConstantQueries('/admin/customers/customer/', self.add_customers)
+
+    def test_order_totals_columns(self):
+        self.add_customers(1)
+        response = self.client.get('/admin/customers/customer/')
+        customer = response.context['cl'].result_list[0]
+        self.assertEqual(customer.orders_total, 2)
+        self.assertEqual(customer.spent_total, Decimal('25.00'))
+
+
+class FailingBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        raise OSError('mail server unavailable')
+
+
+class UnreachableBackend(BaseEmailBackend):
+    def open(self):
+        raise OSError('connection refused')
+
+
+@override_settings(
+    EMAIL_BACKEND='customers.mail.QueuedEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class EmailQueueTests(StoreTestCase):
+    """Requests queue mail; the worker delivers it"""
+
+    def setUp(self):
+        User.objects.create_user('shopper', 'shopper@example.com', 'password')
+
+    def test_password_reset_is_queued_then_sent(self):
+        self.client.post('/account/password_reset/', {'email': 'shopper@example.com'})
+        self.assertEqual(len(mail.outbox), 0)
+        email = QueuedEmail.objects.get()
+        self.assertEqual(email.to, ['shopper@example.com'])
+
+        self.assertEqual(send_queued(rate=0), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['shopper@example.com'])
+        self.assertEqual(len(mail.outbox[0].alternatives), 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'SENT')
+
+    def test_batch_reuses_one_connection(self):
+        for i in range(5):
+            mail.send_mail('Hello', 'Body', None, [f'user{i}@example.com'])
+        with tempfile.TemporaryDirectory() as path:
+            backend = get_connection('django.core.mail.backends.filebased.EmailBackend', file_path=path)
+            self.assertEqual(send_queued(batch_size=2, rate=0, connection=backend), 5)
+            self.assertEqual(len(os.listdir(path)), 1)
+        self.assertFalse(QueuedEmail.objects.exclude(status='SENT').exists())
+
+    def test_failed_send_is_retried_then_dead(self):
+        mail.send_mail('Hello', 'Body', None, ['shopper@example.com'])
+        send_queued(rate=0, connection=FailingBackend())
+        email = QueuedEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('PENDING', 1))
+        self.assertIn('unavailable', email.last_error)
+
+        # Not due again until the backoff has passed
+        self.assertEqual(send_queued(rate=0, connection=FailingBackend()), 0)
+
+        QueuedEmail.objects.update(attempts=MAX_ATTEMPTS - 1, available_at=email.created_at)
+        send_queued(rate=0, connection=FailingBackend())
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'DEAD')
+
+
+    def test_batch_is_claimed_before_sending(self):
+        for i in range(2):
+            mail.send_mail('Hello', 'Body', None, [f'user{i}@example.com'])
+        due_while_sending = []
+
+        class LeaseCheckingBackend(locmem.EmailBackend):
+            def send_messages(self, messages):
+                due_while_sending.append(claim_batch())
+                return super().send_messages(messages)
+
+        self.assertEqual(send_queued(rate=0, connection=LeaseCheckingBackend()), 2)
+        self.assertEqual(due_while_sending, [[], []])
+        self.assertFalse(QueuedEmail.objects.exclude(status='SENT').exists())
+
+    def test_unreachable_server_releases_batch(self):
+        mail.send_mail('Hello', 'Body', None, ['shopper@example.com'])
+        self.assertEqual(send_queued(rate=0, connection=UnreachableBackend()), 0)
+        email = QueuedEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('PENDING', 0))
+        self.assertEqual(len(claim_batch()), 1)
+
+
+class CachedSessionTests(StoreTestCase):
+    """Sessions come from the cache and are only written when they change"""
+
+    def setUp(self):
+        cache.clear()
+        self.session = SessionStore()
+        self.session['cart_hint'] = 3
+        self.session.save()
+        self.key = self.session.session_key
+
+    def test_load_from_cache(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(SessionStore(self.key)['cart_hint'], 3)
+
+    def test_unchanged_save_is_skipped(self):
+        session = SessionStore(self.key)
+        session['cart_hint'] = 3
+        self.assertTrue(session.modified)
+        with self.assertNumQueries(0):
+            session.save()
+
+    def test_changed_save_writes_through(self):
+        session = SessionStore(self.key)
+        session['cart_hint'] = 4
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+        self.assertTrue(any(q['sql'].startswith('UPDATE "django_session"') for q in queries))
+        self.assertEqual(Session.objects.get(pk=self.key).get_decoded()['cart_hint'], 4)
+        with self.assertNumQueries(0):
+            self.assertEqual(SessionStore(self.key)['cart_hint'], 4)
+
+    def test_existing_database_sessions_carry_over(self):
+        old = DBSessionStore()
+        old['cart_hint'] = 7
+        old.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(SessionStore(old.session_key)['cart_hint'], 7)
+        with self.assertNumQueries(0):
+            self.assertEqual(SessionStore(old.session_key)['cart_hint'], 7)
+        self.assertEqual(DBSessionStore(self.key)['cart_hint'], 3)
+
+    @override_settings(SESSION_ENGINE='shopping_store.sessions')
+    def test_logged_in_page_views_skip_session_table(self):
+        user = User.objects.create_user('shopper')
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/cart/')
+            self.client.get('/cart/')
+        self.assertFalse([q for q in queries if 'django_session' in q['sql']])
@@ -31,14 +31,14 @@ if product:
     print(f"Has purchased: {has_purchased}")
     
     # Check has_reviewed (current logic)
-    has_reviewed_with_email = Review.objects.filter(
+    has_reviewed = Review.objects.filter(
         product=product,
-        customer_email=user.email
+        user=user
     ).exists()
-    print(f"Has reviewed (using email): {has_reviewed_with_email}")
+    print(f"Has reviewed (using user): {has_reviewed}")
     
     # Check if can_review
-    can_review = has_purchased and not has_reviewed_with_email
+    can_review = has_purchased and not has_reviewed
     print(f"Can review: {can_review}")
     
     # Better check - using user directly
@@ -1,7 +1,19 @@
-from django.contrib import admin
-from django.utils.html import format_html
+from django import forms
+from django.contrib import admin, messages
+from django.db.models import Count
+from django.http import Http404, JsonResponse
 from django.utils import timezone
-from .models import Order, OrderItem, Coupon, OrderStatusHistory
+from django.urls import path, reverse
+from django.utils.html import format_html
+from shopping_store.admin_mixins import ComputedColumnsMixin, EstimatedCountMixin, ExportMixin, IndexedSearchMixin
+from .exports import ORDER_EXPORT, ORDER_ITEM_EXPORT
+from .models import (
+    Order, OrderItem, Coupon, CouponRedemption, OrderStatusHistory, OrderTransitionJob, OutboxEvent,
+)
+from .transitions import (
+    BACKGROUND_THRESHOLD, can_transition, get_transition_job, source_statuses, start_transition_job,
+    transition_orders,
+)
 
 
 class OrderItemInline(admin.TabularInline):
@@ -18,12 +30,30 @@ class OrderStatusHistoryInline(admin.TabularInline):
     can_delete = False
 
 
+class OrderAdminForm(forms.ModelForm):
+    """Only lets an order's status move along ALLOWED_TRANSITIONS"""
+
+    def clean_status(self):
+        status = self.cleaned_data['status']
+        order = self.instance
+        if order.pk and status != order.status and not can_transition(order, status):
+            raise forms.ValidationError(
+                f'An order that is {order.get_status_display()} cannot move to '
+                f'{dict(Order.STATUS_CHOICES)[status]}.'
+            )
+        return status
+
+
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(ExportMixin, IndexedSearchMixin, EstimatedCountMixin, ComputedColumnsMixin, admin.ModelAdmin):
     list_display = ['order_number', 'customer_name', 'status_badge', 'payment_status_badge', 
                    'total_amount_display', 'items_count', 'created_at']
+    list_select_related = ['customer']
+    form = OrderAdminForm
+    computed_columns = {'items_total': Count('items')}
     list_filter = ['status', 'payment_status', 'created_at', 'payment_method']
     search_fields = ['order_number', 'customer__username', 'customer__email', 'tracking_number']
+    exact_search_fields = ['order_number', 'customer__email']
     readonly_fields = ['order_number', 'created_at', 'updated_at', 'paid_at', 
                       'shipped_at', 'delivered_at', 'total_amount_display']
     inlines = [OrderItemInline, OrderStatusHistoryInline]
@@ -31,7 +61,9 @@ class OrderAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
     list_per_page = 50
     
-    actions = ['mark_as_processing', 'mark_as_shipped', 'mark_as_delivered']
+    actions = ['mark_as_processing', 'mark_as_shipped', 'mark_as_delivered',
+               'export_csv', 'export_csv_gzip', 'export_jsonl']
+    export = ORDER_EXPORT
     
     fieldsets = (
         ('Order Information', {
@@ -100,57 +132,89 @@ class OrderAdmin(admin.ModelAdmin):
     total_amount_display.short_description = 'Total'
 
     def items_count(self, obj):
-        return obj.items.count()
+        return obj.items_total
     items_count.short_description = 'Items'
+    items_count.admin_order_field = 'items_total'
 
-    def mark_as_processing(self, request, queryset):
-        for order in queryset:
-            order.status = 'PROCESSING'
-            order.save()
-            OrderStatusHistory.objects.create(
-                order=order,
-                status='PROCESSING',
-                notes='Status changed via admin action',
-                created_by=request.user
+    def get_urls(self):
+        urls = [
+            path('transition-jobs/<int:job_id>/', self.admin_site.admin_view(self.transition_job_status),
+                 name='orders_order_transition_job'),
+        ]
+        return urls + super().get_urls()
+
+    def transition_job_status(self, request, job_id):
+        """JSON progress of a background status change started from an action"""
+        job = get_transition_job(job_id)
+        if job is None:
+            raise Http404('Unknown job')
+        return JsonResponse(job)
+
+    def save_model(self, request, obj, form, change):
+        """
+        Save the other fields, then apply a status change with
+        transition_orders so it gets its history row and outbox event
+        """
+        status = obj.status
+        if change and 'status' in form.changed_data:
+            obj.status = form.initial['status']
+        super().save_model(request, obj, form, change)
+        if obj.status == status:
+            return
+        if transition_orders([obj.pk], status, user=request.user, notes='Status changed in admin'):
+            obj.refresh_from_db(fields=['status', 'shipped_at', 'delivered_at', 'updated_at'])
+        else:
+            self.message_user(
+                request, f'The order changed status meanwhile, so it was not marked as {status.lower()}.',
+                messages.WARNING,
             )
-        self.message_user(request, f'{queryset.count()} orders marked as processing.')
+
+    def _transition(self, request, queryset, status, label):
+        order_ids = list(
+            queryset.filter(status__in=source_statuses(status)).order_by('id').values_list('id', flat=True)
+        )
+        skipped = queryset.count() - len(order_ids)
+        notes = 'Status changed via admin action'
+
+        if len(order_ids) > BACKGROUND_THRESHOLD:
+            job = start_transition_job(order_ids, status, user=request.user, notes=notes)
+            progress_url = reverse('admin:orders_order_transition_job', args=[job.pk])
+            self.message_user(request, format_html(
+                '{} orders are queued to be marked as {} by the background worker. '
+                '<a href="{}">Check progress</a>.',
+                len(order_ids), label, progress_url
+            ))
+        else:
+            changed = transition_orders(order_ids, status, user=request.user, notes=notes)
+            self.message_user(request, f'{changed} orders marked as {label}.')
+
+        if skipped:
+            self.message_user(
+                request, f'{skipped} orders skipped because they cannot move to {label}.', messages.WARNING
+            )
+
+    def mark_as_processing(self, request, queryset):
+        self._transition(request, queryset, 'PROCESSING', 'processing')
     mark_as_processing.short_description = 'Mark as Processing'
 
     def mark_as_shipped(self, request, queryset):
-        for order in queryset:
-            order.status = 'SHIPPED'
-            order.shipped_at = timezone.now()
-            order.save()
-            OrderStatusHistory.objects.create(
-                order=order,
-                status='SHIPPED',
-                notes='Status changed via admin action',
-                created_by=request.user
-            )
-        self.message_user(request, f'{queryset.count()} orders marked as shipped.')
+        self._transition(request, queryset, 'SHIPPED', 'shipped')
     mark_as_shipped.short_description = 'Mark as Shipped'
 
     def mark_as_delivered(self, request, queryset):
-        for order in queryset:
-            order.status = 'DELIVERED'
-            order.delivered_at = timezone.now()
-            order.save()
-            OrderStatusHistory.objects.create(
-                order=order,
-                status='DELIVERED',
-                notes='Status changed via admin action',
-                created_by=request.user
-            )
-        self.message_user(request, f'{queryset.count()} orders marked as delivered.')
+        self._transition(request, queryset, 'DELIVERED', 'delivered')
     mark_as_delivered.short_description = 'Mark as Delivered'
 
 
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(ExportMixin, EstimatedCountMixin, admin.ModelAdmin):
     list_display = ['order', 'product_name', 'variant_details', 'quantity', 'unit_price', 'line_total']
+    list_select_related = ['order__customer']
     list_filter = ['order__status', 'created_at']
     search_fields = ['order__order_number', 'product__name', 'product_sku']
     readonly_fields = ['line_total', 'product_name', 'product_sku', 'variant_details']
+    actions = ['export_csv', 'export_csv_gzip', 'export_jsonl']
+    export = ORDER_ITEM_EXPORT
 
 
 @admin.register(Coupon)
@@ -208,10 +272,13 @@ class CouponAdmin(admin.ModelAdmin):
 
 
 @admin.register(OrderStatusHistory)
-class OrderStatusHistoryAdmin(admin.ModelAdmin):
+class OrderStatusHistoryAdmin(IndexedSearchMixin, EstimatedCountMixin, admin.ModelAdmin):
     list_display = ['order', 'status', 'created_by', 'created_at']
+    list_select_related = ['order__customer', 'created_by']
     list_filter = ['status', 'created_at']
     search_fields = ['order__order_number', 'notes']
+    exact_search_fields = ['order__order_number']
+    fulltext_search_fields = ['notes']
     readonly_fields = ['order', 'status', 'notes', 'created_by', 'created_at']
     
     def has_add_permission(self, request):
@@ -220,3 +287,43 @@ class OrderStatusHistoryAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         return False
 
+
+@admin.register(CouponRedemption)
+class CouponRedemptionAdmin(EstimatedCountMixin, admin.ModelAdmin):
+    list_display = ['coupon', 'order', 'customer', 'discount_amount', 'created_at']
+    list_select_related = ['coupon', 'order', 'customer']
+    list_filter = ['created_at']
+    search_fields = ['coupon__code', 'order__order_number', 'customer__username']
+    readonly_fields = ['coupon', 'order', 'customer', 'discount_amount', 'created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(EstimatedCountMixin, admin.ModelAdmin):
+    list_display = ['id', 'topic', 'status', 'attempts', 'available_at', 'created_at', 'processed_at']
+    list_filter = ['status', 'topic']
+    readonly_fields = ['topic', 'payload', 'status', 'attempts', 'last_error', 'available_at',
+                       'created_at', 'processed_at']
+    actions = ['retry_events']
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry_events(self, request, queryset):
+        updated = queryset.exclude(status='DONE').update(status='PENDING', attempts=0, available_at=timezone.now())
+        self.message_user(request, f'{updated} event(s) queued for retry.')
+    retry_events.short_description = 'Retry now'
+
+
+@admin.register(OrderTransitionJob)
+class OrderTransitionJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'target', 'status', 'processed', 'total', 'changed', 'created_by', 'created_at']
+    list_filter = ['status', 'target']
+    readonly_fields = ['target', 'notes', 'created_by', 'status', 'total', 'processed', 'changed',
+                       'last_error', 'created_at', 'updated_at']
+    exclude = ['order_ids']
+
+    def has_add_permission(self, request):
+        return False
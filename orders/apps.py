@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class OrdersConfig(AppConfig):
     name = 'orders'
+
+    def ready(self):
+        from shopping_store import search
+        from . import coupons, handlers, signals  # noqa: F401
+
+        search.register(
+            self.get_model('Order'), ['order_number', 'customer__username', 'customer__email', 'tracking_number']
+        )
+        search.register(self.get_model('OrderStatusHistory'), ['order__order_number', 'notes'])
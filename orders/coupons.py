@@ -0,0 +1,114 @@
+import threading
+import time
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from shopping_store.money import Discount, Money, to_basis_points, to_minor
+from .models import Coupon, CouponRedemption
+
+# Seconds a process trusts its copy of the active coupons; saves in this
+# process clear it straight away
+COUPON_CACHE_TTL = 60
+
+_lock = threading.Lock()
+_coupons = {}
+_loaded_at = None
+
+
+class CouponError(ValueError):
+    """A coupon that cannot be applied to this order"""
+
+
+def active_coupons():
+    """Active, unexpired coupons by code, reloaded at most every COUPON_CACHE_TTL seconds"""
+    global _coupons, _loaded_at
+    with _lock:
+        if _loaded_at is None or time.monotonic() - _loaded_at > COUPON_CACHE_TTL:
+            _coupons = {
+                coupon.code: coupon
+                for coupon in Coupon.objects.filter(is_active=True, valid_to__gte=timezone.now())
+            }
+            _loaded_at = time.monotonic()
+        return _coupons
+
+
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+def clear_coupon_cache(**kwargs):
+    global _loaded_at
+    with _lock:
+        _loaded_at = None
+
+
+def coupon_discount(coupon):
+    if coupon.discount_type == 'PERCENTAGE':
+        cap = to_minor(coupon.maximum_discount) if coupon.maximum_discount else None
+        return Discount(rate=to_basis_points(coupon.discount_value), cap=cap)
+    return Discount(fixed=to_minor(coupon.discount_value))
+
+
+def discount_for(coupon, subtotal):
+    return Money(coupon_discount(coupon).amount(to_minor(subtotal)))
+
+
+def validate(code, subtotal):
+    """
+    Return (coupon, discount) for a code on an order of `subtotal`, from the
+    in-process cache without a query, or raise CouponError. Usage limits
+    are only known to the database and are checked by redeem().
+    """
+    coupon = active_coupons().get((code or '').strip())
+    if coupon is None:
+        raise CouponError('Coupon code is not valid')
+    now = timezone.now()
+    if now < coupon.valid_from:
+        raise CouponError('Coupon not yet valid')
+    if now > coupon.valid_to:
+        raise CouponError('Coupon has expired')
+    if subtotal < coupon.minimum_order_amount:
+        raise CouponError(f'Coupon needs an order of at least {coupon.minimum_order_amount}')
+    return coupon, discount_for(coupon, subtotal)
+
+
+def _customer_uses(coupon_id, customer):
+    return CouponRedemption.objects.filter(coupon_id=coupon_id, customer=customer).count()
+
+
+def redeem(coupon, order, discount):
+    """
+    Record `coupon` against `order` and count the use. A single conditional
+    UPDATE re-checks that the coupon is active and in date, the order meets
+    the minimum, and neither the total nor the customer's usage limit is
+    reached, and increments times_used only if so; raises CouponError
+    otherwise. The coupon row stays locked until the caller's transaction
+    ends, so the customer's uses are counted again once concurrent
+    redemptions of the same coupon have committed.
+    """
+    now = timezone.now()
+    customer_uses = (
+        CouponRedemption.objects.filter(coupon=OuterRef('pk'), customer=order.customer_id)
+        .values('coupon').annotate(uses=Count('id')).values('uses')
+    )
+    with transaction.atomic():
+        updated = (
+            Coupon.objects.filter(
+                pk=coupon.pk,
+                is_active=True,
+                valid_from__lte=now,
+                valid_to__gte=now,
+                minimum_order_amount__lte=order.subtotal,
+                usage_per_customer__gt=Coalesce(Subquery(customer_uses), Value(0)),
+            )
+            .filter(Q(usage_limit__isnull=True) | Q(times_used__lt=F('usage_limit')))
+            .update(times_used=F('times_used') + 1)
+        )
+        if not updated:
+            raise CouponError('Coupon usage limit reached')
+        if _customer_uses(coupon.pk, order.customer_id) >= coupon.usage_per_customer:
+            raise CouponError('You have already used this coupon')
+        return CouponRedemption.objects.create(
+            coupon=coupon, customer_id=order.customer_id, order=order, discount_amount=discount
+        )
@@ -0,0 +1,38 @@
+from django.db.models import Count
+from shopping_store.exports import Export
+
+ORDER_EXPORT = Export('orders', [
+    ('order_number', 'order_number'),
+    ('created_at', 'created_at'),
+    ('customer', 'customer__username'),
+    ('email', 'customer__email'),
+    ('status', 'status'),
+    ('payment_status', 'payment_status'),
+    ('payment_method', 'payment_method'),
+    ('items', 'items_count'),
+    ('subtotal', 'subtotal'),
+    ('tax', 'tax_amount'),
+    ('shipping', 'shipping_cost'),
+    ('discount', 'discount_amount'),
+    ('total', 'total_amount'),
+    ('city', 'shipping_address__city'),
+    ('state', 'shipping_address__state'),
+    ('postal_code', 'shipping_address__postal_code'),
+    ('tracking_number', 'tracking_number'),
+    ('shipped_at', 'shipped_at'),
+    ('delivered_at', 'delivered_at'),
+], annotations={'items_count': Count('items')})
+
+ORDER_ITEM_EXPORT = Export('order_items', [
+    ('order_number', 'order__order_number'),
+    ('order_status', 'order__status'),
+    ('ordered_at', 'order__created_at'),
+    ('customer', 'order__customer__username'),
+    ('product_id', 'product_id'),
+    ('sku', 'product_sku'),
+    ('product', 'product_name'),
+    ('variant', 'variant_details'),
+    ('quantity', 'quantity'),
+    ('unit_price', 'unit_price'),
+    ('line_total', 'line_total'),
+])
@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.core.mail import mail_admins
+from django.db.models import F
+from catalog.eligibility import invalidate_review_eligibility
+from catalog.models import Product
+from .outbox import handler
+
+LOW_STOCK_ALERT_TIMEOUT = 60 * 60 * 6
+
+
+def _alert_key(product_id):
+    return f'low_stock_alert:{product_id}'
+
+
+@handler('order.placed')
+def alert_low_stock(event):
+    """Email admins about products in the order at or below their low-stock threshold"""
+    products = Product.objects.filter(
+        orderitem__order_id=event.payload['order_id'],
+        stock_quantity__lte=F('low_stock_threshold'),
+    ).distinct().values_list('id', 'sku', 'name', 'stock_quantity')
+
+    # Each product is alerted at most once per window, so retries and
+    # back-to-back orders don't repeat the email
+    alerted = cache.get_many([_alert_key(product_id) for product_id, *_ in products])
+    pending = [product for product in products if _alert_key(product[0]) not in alerted]
+    if not pending:
+        return
+    mail_admins(
+        'Low stock',
+        '\n'.join(f'{sku} {name}: {stock} left' for _, sku, name, stock in pending),
+    )
+    cache.set_many({_alert_key(product_id): event.id for product_id, *_ in pending}, LOW_STOCK_ALERT_TIMEOUT)
+
+
+@handler('order.status_changed')
+def refresh_review_eligibility(event):
+    """
+    Delivered/cancelled orders change which products the customer may review.
+    transition_orders clears these on commit; this retries it durably.
+    """
+    invalidate_review_eligibility(*event.payload['customer_ids'])
@@ -0,0 +1,79 @@
+import time
+import uuid
+from django.core import signing
+from django.core.cache import cache
+from .models import Order
+
+# How long a rendered checkout form can be submitted, and how long its
+# result is remembered in the cache (the order row keeps the key for good)
+CHECKOUT_KEY_TTL = 60 * 60
+# How long a duplicate submission waits for the first one to finish
+CHECKOUT_WAIT = 10
+POLL_INTERVAL = 0.1
+
+
+def _signer(user):
+    return signing.TimestampSigner(salt=f'orders.checkout:{user.pk}')
+
+
+def new_checkout_key(user):
+    """Signed key for one rendering of the checkout form"""
+    return _signer(user).sign(uuid.uuid4().hex)
+
+
+def checkout_key_value(user, token):
+    """The key inside a submitted token, or None if it is missing, forged, expired or another user's"""
+    try:
+        return _signer(user).unsign(token, max_age=CHECKOUT_KEY_TTL)
+    except signing.BadSignature:
+        return None
+
+
+def _result_key(key):
+    return f'checkout_result:{key}'
+
+
+def _lock_key(key):
+    return f'checkout_lock:{key}'
+
+
+def completed_order(user, key):
+    """Order number already placed with `key`: from the cache, else the orders table"""
+    order_number = cache.get(_result_key(key))
+    if order_number is None:
+        order_number = Order.objects.filter(customer=user, checkout_key=key).values_list(
+            'order_number', flat=True
+        ).first()
+        if order_number is not None:
+            remember(key, order_number)
+    return order_number
+
+
+def remember(key, order_number):
+    cache.set(_result_key(key), order_number, CHECKOUT_KEY_TTL)
+
+
+def claim(key):
+    """True if no other submission of `key` is in flight; the caller must release()"""
+    return cache.add(_lock_key(key), True, CHECKOUT_WAIT * 3)
+
+
+def release(key):
+    cache.delete(_lock_key(key))
+
+
+def wait_for_order(user, key, timeout=CHECKOUT_WAIT):
+    """
+    Wait for the in-flight submission of `key` to finish and return the
+    order number it placed, or None if it failed or is still running.
+    Only the cache is polled while the other request holds the key.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        order_number = cache.get(_result_key(key))
+        if order_number is not None:
+            return order_number
+        if cache.get(_lock_key(key)) is None:
+            return completed_order(user, key)
+        time.sleep(POLL_INTERVAL)
+    return None
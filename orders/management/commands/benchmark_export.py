@@ -0,0 +1,74 @@
+import resource
+import time
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import reset_queries, transaction
+from catalog.models import Category, Product
+from shopping_store.exports import FORMATS, stream_export
+from orders.exports import ORDER_ITEM_EXPORT
+from orders.models import Order, OrderItem
+
+ITEMS_PER_ORDER = 10
+SEED_BATCH_SIZE = 10000
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = ('Seeds order items inside a rolled-back transaction, exports them and fails if '
+            'peak RSS goes over the ceiling')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--max-rss-mb', type=int, default=256)
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true')
+
+    def seed(self, rows):
+        customer = User.objects.create_user(f'export-benchmark-{time.time_ns()}')
+        category = Category.objects.create(name=f'Export benchmark {time.time_ns()}')
+        product = Product.objects.create(
+            name='Benchmark Tee', sku=f'BENCH-{time.time_ns()}', description='Benchmark', category=category,
+            price=Decimal('19.99')
+        )
+        orders_needed = -(-rows // ITEMS_PER_ORDER)
+        for start in range(0, orders_needed, SEED_BATCH_SIZE // ITEMS_PER_ORDER):
+            orders = Order.objects.bulk_create(
+                Order(customer=customer, order_number=f'BENCH-{customer.id}-{i:08d}', total_amount=product.price)
+                for i in range(start, min(start + SEED_BATCH_SIZE // ITEMS_PER_ORDER, orders_needed))
+            )
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, product=product, quantity=1, unit_price=product.price,
+                          line_total=product.price, product_name=product.name, product_sku=product.sku)
+                for order in orders for _ in range(ITEMS_PER_ORDER)
+            )
+            # Keep DEBUG query logging from growing with the seed
+            reset_queries()
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.monotonic()
+            self.seed(options['rows'])
+            self.stdout.write(f'Seeded {options["rows"]} order items in {time.monotonic() - started:.1f}s '
+                              f'(peak RSS {peak_rss_mb():.0f} MB)')
+
+            before = peak_rss_mb()
+            started = time.monotonic()
+            written = sum(len(chunk) for chunk in stream_export(
+                ORDER_ITEM_EXPORT, OrderItem.objects.all(), options['format'], compress=options['gzip']
+            ))
+            elapsed = time.monotonic() - started
+            after = peak_rss_mb()
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f'Exported {written / 1024 / 1024:.1f} MB in {elapsed:.1f}s; '
+            f'peak RSS {after:.0f} MB (+{after - before:.0f} MB during export)'
+        )
+        if after > options['max_rss_mb']:
+            raise CommandError(f'Peak RSS {after:.0f} MB is over the {options["max_rss_mb"]} MB ceiling')
+        self.stdout.write(self.style.SUCCESS(f'Peak RSS stayed under {options["max_rss_mb"]} MB.'))
@@ -0,0 +1,39 @@
+import sys
+from django.core.management.base import BaseCommand
+from catalog.exports import PRODUCT_EXPORT
+from catalog.models import Product
+from shopping_store.exports import EXPORT_CHUNK_SIZE, FORMATS, stream_export
+from orders.exports import ORDER_EXPORT, ORDER_ITEM_EXPORT
+from orders.models import Order, OrderItem
+
+EXPORTS = {
+    'orders': (ORDER_EXPORT, Order),
+    'order_items': (ORDER_ITEM_EXPORT, OrderItem),
+    'products': (PRODUCT_EXPORT, Product),
+}
+
+
+class Command(BaseCommand):
+    help = 'Streams orders, order items or products to CSV/JSON Lines with bounded memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=EXPORTS)
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output on the fly')
+        parser.add_argument('--output', help='File to write (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        export, model = EXPORTS[options['table']]
+        chunks = stream_export(
+            export, model.objects.all(), options['format'],
+            compress=options['gzip'], chunk_size=options['chunk_size'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                written = sum(output.write(chunk) for chunk in chunks)
+            self.stderr.write(self.style.SUCCESS(f'Wrote {written} bytes to {options["output"]}.'))
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
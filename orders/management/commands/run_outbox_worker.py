@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from orders.outbox import OUTBOX_BATCH_SIZE, cache_is_shared, drain
+from orders.transitions import run_transition_jobs
+
+
+class Command(BaseCommand):
+    help = ('Runs outbox event handlers (emails, alerts, cache invalidation) and queued bulk order '
+            'status changes in a local worker loop')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when idle')
+        parser.add_argument('--once', action='store_true', help='Drain due events and queued jobs and exit')
+        parser.add_argument('--allow-local-cache', action='store_true',
+                            help='Run without a shared cache (development only)')
+
+    def handle(self, *args, **options):
+        if not cache_is_shared() and not options['allow_local_cache']:
+            raise CommandError(
+                'The default cache is local to this process, so cache entries the handlers clear would stay '
+                'stale in the web processes. Set REDIS_URL, or pass --allow-local-cache for development.'
+            )
+        if options['once']:
+            jobs = run_transition_jobs()
+            processed = drain(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Ran {jobs} transition jobs, processed {processed} outbox events.'))
+            return
+
+        self.stdout.write('Outbox worker started; Ctrl+C to stop.')
+        try:
+            while True:
+                close_old_connections()
+                jobs = run_transition_jobs()
+                processed = drain(options['batch_size'])
+                if jobs:
+                    self.stdout.write(f'Ran {jobs} transition jobs.')
+                if processed:
+                    self.stdout.write(f'Processed {processed} outbox events.')
+                if not jobs and not processed:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Outbox worker stopped.')
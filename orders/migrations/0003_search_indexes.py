@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 09:03
+
+from django.db import migrations
+from shopping_store.migration_operations import CreateSearchIndexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_remove_order_billing_address'),
+    ]
+
+    operations = [
+        CreateSearchIndexes(
+            trigram=[
+                ('orders_order_order_number_trgm', 'orders_order', 'order_number'),
+                ('orders_order_tracking_number_trgm', 'orders_order', 'tracking_number'),
+            ],
+            fulltext=[
+                ('orders_orderstatushistory_notes_fts', 'orders_orderstatushistory', 'notes'),
+            ],
+        ),
+    ]
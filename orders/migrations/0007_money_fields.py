@@ -0,0 +1,64 @@
+# Generated by Django 6.0 on 2026-10-19 09:26
+
+import shopping_store.money
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_coupon_redemption'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='coupon',
+            name='maximum_discount',
+            field=shopping_store.money.MoneyField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='coupon',
+            name='minimum_order_amount',
+            field=shopping_store.money.MoneyField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='couponredemption',
+            name='discount_amount',
+            field=shopping_store.money.MoneyField(decimal_places=2, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='discount_amount',
+            field=shopping_store.money.MoneyField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='shipping_cost',
+            field=shopping_store.money.MoneyField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='subtotal',
+            field=shopping_store.money.MoneyField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='tax_amount',
+            field=shopping_store.money.MoneyField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='total_amount',
+            field=shopping_store.money.MoneyField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='line_total',
+            field=shopping_store.money.MoneyField(decimal_places=2, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='unit_price',
+            field=shopping_store.money.MoneyField(decimal_places=2, max_digits=10),
+        ),
+    ]
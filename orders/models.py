@@ -1,8 +1,9 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from catalog.models import Product, ProductVariant
 from customers.models import Address
-from decimal import Decimal
+from shopping_store.money import Discount, MoneyField, price_lines, to_minor
 
 
 class Order(models.Model):
@@ -36,15 +37,17 @@ class Order(models.Model):
     # removed customer billing address to simplify
     
     # Pricing
-    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    tax_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    shipping_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    subtotal = MoneyField(default=0)
+    tax_amount = MoneyField(default=0)
+    shipping_cost = MoneyField(default=0)
+    discount_amount = MoneyField(default=0)
+    total_amount = MoneyField(default=0)
     
     # Payment
     payment_method = models.CharField(max_length=50, blank=True)
     transaction_id = models.CharField(max_length=200, blank=True)
+    # Idempotency key of the checkout form that placed the order
+    checkout_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     
     # Notes
     customer_notes = models.TextField(blank=True)
@@ -66,6 +69,10 @@ class Order(models.Model):
         indexes = [
             models.Index(fields=['order_number']),
             models.Index(fields=['customer', 'status']),
+            # Incremental jobs (co-purchase recommendations) scan recently changed orders
+            models.Index(fields=['updated_at'], name='order_updated_at_idx'),
+            # Default ordering and the admin date_hierarchy's MIN/MAX(created_at)
+            models.Index(fields=['created_at'], name='order_created_at_idx'),
         ]
 
     def save(self, *args, **kwargs):
@@ -77,9 +84,15 @@ class Order(models.Model):
 
     def calculate_totals(self):
         """Calculate order totals"""
-        self.subtotal = sum(item.line_total for item in self.items.all())
-        self.tax_amount = self.subtotal * Decimal('0.10')  # 10% tax
-        self.total_amount = self.subtotal + self.tax_amount + self.shipping_cost - self.discount_amount
+        lines = list(self.items.values_list('unit_price', 'quantity'))
+        pricing = price_lines(
+            [to_minor(price) for price, _ in lines], [0] * len(lines), [quantity for _, quantity in lines],
+            discount=Discount(fixed=to_minor(self.discount_amount)), shipping=to_minor(self.shipping_cost),
+        )
+        self.subtotal = pricing.subtotal.decimal
+        self.tax_amount = pricing.tax.decimal
+        self.discount_amount = pricing.discount.decimal
+        self.total_amount = pricing.total.decimal
         self.save()
 
     def __str__(self):
@@ -93,8 +106,8 @@ class OrderItem(models.Model):
     variant = models.ForeignKey(ProductVariant, on_delete=models.PROTECT, null=True, blank=True)
     
     quantity = models.PositiveIntegerField(default=1)
-    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
-    line_total = models.DecimalField(max_digits=10, decimal_places=2)
+    unit_price = MoneyField()
+    line_total = MoneyField()
     
     # Snapshot data (in case product is deleted or changed)
     product_name = models.CharField(max_length=300)
@@ -128,8 +141,8 @@ class Coupon(models.Model):
     discount_type = models.CharField(max_length=20, choices=DISCOUNT_TYPES)
     discount_value = models.DecimalField(max_digits=10, decimal_places=2)
     
-    minimum_order_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    maximum_discount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    minimum_order_amount = MoneyField(default=0)
+    maximum_discount = MoneyField(null=True, blank=True)
     
     usage_limit = models.PositiveIntegerField(null=True, blank=True, help_text="Total usage limit")
     usage_per_customer = models.PositiveIntegerField(default=1)
@@ -158,6 +171,24 @@ class Coupon(models.Model):
         return True, "Valid"
 
 
+class CouponRedemption(models.Model):
+    """One use of a coupon by a customer's order"""
+    coupon = models.ForeignKey(Coupon, on_delete=models.PROTECT, related_name='redemptions')
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='coupon_redemptions')
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='coupon_redemption')
+    discount_amount = MoneyField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['coupon', 'customer']),
+        ]
+
+    def __str__(self):
+        return f"{self.coupon.code} on {self.order.order_number}"
+
+
 class OrderStatusHistory(models.Model):
     """Track order status changes"""
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_history')
@@ -173,3 +204,63 @@ class OrderStatusHistory(models.Model):
     def __str__(self):
         return f"{self.order.order_number} - {self.status} at {self.created_at}"
 
+
+class OutboxEvent(models.Model):
+    """Side effect recorded in the same transaction as the change that caused it"""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('DONE', 'Done'),
+        ('DEAD', 'Dead'),
+    ]
+
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['available_at', 'id'], name='outbox_pending_idx',
+                         condition=models.Q(status='PENDING')),
+            models.Index(fields=['status', 'topic']),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.id} ({self.status})"
+
+
+class OrderTransitionJob(models.Model):
+    """Bulk status change queued from the admin and run by the outbox worker"""
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    target = models.CharField(max_length=20)
+    order_ids = models.JSONField(default=list)
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    changed = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['id'], name='transition_job_open_idx',
+                         condition=models.Q(status__in=['QUEUED', 'RUNNING'])),
+        ]
+
+    def __str__(self):
+        return f"{self.target} x {self.total} #{self.id} ({self.status})"
@@ -0,0 +1,121 @@
+import logging
+from datetime import timedelta
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+BASE_BACKOFF = 10
+MAX_BACKOFF = 60 * 60
+# How long a claimed batch is hidden from other workers
+CLAIM_TIMEOUT = timedelta(minutes=15)
+
+# topic -> handler(event); handlers may run more than once for an event and
+# must be idempotent
+HANDLERS = {}
+
+# What handlers clear or record in these caches (review eligibility, low-stock
+# alert throttling) never leaves the worker process
+LOCAL_CACHE_BACKENDS = (LocMemCache, DummyCache)
+
+
+def cache_is_shared():
+    return not isinstance(caches['default'], LOCAL_CACHE_BACKENDS)
+
+
+def handler(topic):
+    """Register the function that processes events of `topic`"""
+    def register(func):
+        HANDLERS[topic] = func
+        return func
+    return register
+
+
+def enqueue(topic, payload):
+    """
+    Record an event for the worker. Call inside the transaction making the
+    change, so the event exists if and only if the change commits.
+    """
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number `attempts`"""
+    return min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (attempts - 1))
+
+
+def claim_batch(batch_size=OUTBOX_BATCH_SIZE, lease=CLAIM_TIMEOUT):
+    """
+    Claim up to `batch_size` due events with SELECT ... FOR UPDATE SKIP
+    LOCKED and lease them for `lease` by pushing available_at out.
+    The claim commits before any handler runs, so no row lock is held
+    during a handler's I/O; events of a worker that dies mid-batch become
+    due again when the lease runs out.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(available_at=now + lease)
+    return events
+
+
+def process_batch(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Claim up to `batch_size` due events and run each handler in its own
+    transaction, outside the claim. Failed events are rescheduled with
+    exponential backoff and marked DEAD after MAX_ATTEMPTS; events left
+    unprocessed when the batch is interrupted are released for later.
+    Returns the number of events claimed.
+    """
+    events = claim_batch(batch_size)
+    handled = []
+    try:
+        for event in events:
+            func = HANDLERS.get(event.topic)
+            try:
+                with transaction.atomic():
+                    if func is None:
+                        logger.warning('No outbox handler for %s; dropping event %s', event.topic, event.id)
+                    else:
+                        func(event)
+            except Exception as error:
+                event.attempts += 1
+                event.last_error = f'{type(error).__name__}: {error}'
+                if event.attempts >= MAX_ATTEMPTS:
+                    event.status = 'DEAD'
+                    logger.exception('Outbox event %s (%s) failed permanently', event.id, event.topic)
+                else:
+                    event.available_at = timezone.now() + timedelta(seconds=backoff(event.attempts))
+                    logger.warning('Outbox event %s (%s) failed, retry %s', event.id, event.topic, event.attempts)
+            else:
+                event.status = 'DONE'
+                event.processed_at = timezone.now()
+            handled.append(event)
+    finally:
+        OutboxEvent.objects.bulk_update(
+            handled, ['status', 'attempts', 'last_error', 'available_at', 'processed_at']
+        )
+        unprocessed = [event.id for event in events[len(handled):]]
+        if unprocessed:
+            OutboxEvent.objects.filter(id__in=unprocessed).update(available_at=timezone.now())
+    return len(events)
+
+
+def drain(batch_size=OUTBOX_BATCH_SIZE):
+    """Process batches until no due events remain. Returns the number claimed."""
+    total = 0
+    while True:
+        claimed = process_batch(batch_size)
+        total += claimed
+        if claimed < batch_size:
+            return total
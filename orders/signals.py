@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from catalog.eligibility import invalidate_review_eligibility
+from .models import Order
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_eligibility_on_order_change(sender, instance, **kwargs):
+    """A status change (e.g. to DELIVERED) can change what the customer may review"""
+    invalidate_review_eligibility(instance.customer_id)
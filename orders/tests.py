@@ -1,3 +1,535 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import close_old_connections, connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from cart.models import Cart, CartItem
+from catalog.eligibility import can_review
+from catalog.models import Category, Product
+from customers.models import Address
+from shopping_store.exports import stream_export
+from shopping_store.paginators import EstimatedCountPaginator
+from shopping_store.testing import StoreTestCase, StoreTransactionTestCase
+from . import coupons, outbox
+from .exports import ORDER_EXPORT, ORDER_ITEM_EXPORT
+from .idempotency import new_checkout_key
+from .models import (
+    Coupon, CouponRedemption, Order, OrderItem, OrderStatusHistory, OrderTransitionJob, OutboxEvent,
+)
+from .transitions import (
+    JOB_STALE_AFTER, can_transition, claim_transition_job, run_transition_jobs, source_statuses,
+    start_transition_job, transition_orders,
+)
 
-# Create your tests here.
+
+class OrderAdminTestCase(StoreTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.category = Category.objects.create(name='Tops')
+        cls.product = Product.objects.create(
+            name='Tee', sku='TEE-1', description='Tee', category=cls.category, price=Decimal('10.00')
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_orders(self, count):
+        for i in range(count):
+            user = User.objects.create_user(f'customer{Order.objects.count()}')
+            address = Address.objects.create(
+                customer=user, address_type='SHIPPING', full_name='C', phone='1',
+                address_line1='Street', city='City', state='State', postal_code='1'
+            )
+            order = Order.objects.create(customer=user, shipping_address=address)
+            OrderItem.objects.create(order=order, product=self.product, quantity=2, unit_price=self.product.price)
+
+
+class OrderAdminQueryCountTests(OrderAdminTestCase):
+    """The order changelist must not issue per-row queries"""
+
+    def test_order_changelist(self):
+        self.assertConstantQueries('/admin/orders/order/', self.add_orders)
+
+    def test_order_item_changelist(self):
+        self.assertConstantQueries('/admin/orders/orderitem/', self.add_orders)
+
+    def test_order_items_count_column(self):
+        self.add_orders(1)
+        response = self.client.get('/admin/orders/order/')
+        self.assertEqual(response.context['cl'].result_list[0].items_total, 1)
+
+
+class EstimatedCountPaginatorTests(OrderAdminTestCase):
+    """SQLite stands in for PostgreSQL: sqlite_stat1 plays the role of pg_class"""
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor != 'sqlite':
+            self.skipTest('sqlite_stat1 stand-in')
+
+    def test_exact_count_without_statistics(self):
+        self.add_orders(3)
+        paginator = EstimatedCountPaginator(Order.objects.all(), 2, exact_threshold=1)
+        self.assertEqual(paginator.count, 3)
+        self.assertFalse(paginator.is_estimated)
+
+    def test_unfiltered_count_uses_statistics(self):
+        self.add_orders(4)
+        self.analyze()
+        Order.objects.filter(id__in=Order.objects.values('id')[:2]).delete()
+        paginator = EstimatedCountPaginator(Order.objects.all(), 2, exact_threshold=1)
+        with self.assertNumQueries(2):
+            self.assertEqual(paginator.count, 4)
+        self.assertTrue(paginator.is_estimated)
+        self.assertEqual(paginator.num_pages, 2)
+
+    def test_small_estimate_falls_back_to_exact_count(self):
+        self.add_orders(4)
+        self.analyze()
+        Order.objects.filter(id__in=Order.objects.values('id')[:2]).delete()
+        paginator = EstimatedCountPaginator(Order.objects.all(), 2)
+        self.assertEqual(paginator.count, 2)
+        self.assertFalse(paginator.is_estimated)
+
+    def test_filtered_count_is_exact(self):
+        self.add_orders(4)
+        self.analyze()
+        Order.objects.filter(id=Order.objects.first().id).update(status='CANCELLED')
+        paginator = EstimatedCountPaginator(Order.objects.filter(status='CANCELLED'), 2, exact_threshold=1)
+        self.assertEqual(paginator.count, 1)
+        self.assertFalse(paginator.is_estimated)
+
+    def test_changelist_skips_full_count(self):
+        self.add_orders(2)
+        response = self.client.get('/admin/orders/order/', {'status__exact': 'PENDING'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['cl'].full_result_count)
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+
+class ExportTests(OrderAdminTestCase):
+    """Exports stream in one query with related columns joined up front"""
+
+    def export_action(self, action, model='order'):
+        ids = Order.objects.values_list('id', flat=True) if model == 'order' else \
+            OrderItem.objects.values_list('id', flat=True)
+        response = self.client.post(f'/admin/orders/{model}/', {
+            'action': action, '_selected_action': list(ids),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_order_csv_action(self):
+        self.add_orders(2)
+        rows = list(csv.reader(io.StringIO(self.export_action('export_csv').decode())))
+        self.assertEqual(rows[0], ORDER_EXPORT.headers)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row[2] for row in rows[1:]}, set(Order.objects.values_list('customer__username', flat=True)))
+        self.assertEqual({row[7] for row in rows[1:]}, {'1'})
+
+    def test_gzip_action(self):
+        self.add_orders(2)
+        content = gzip.decompress(self.export_action('export_csv_gzip', 'orderitem')).decode()
+        self.assertEqual(content.splitlines()[0], ','.join(ORDER_ITEM_EXPORT.headers))
+        self.assertEqual(len(content.splitlines()), 3)
+
+    def test_jsonl_action(self):
+        self.add_orders(1)
+        lines = self.export_action('export_jsonl').decode().splitlines()
+        record = json.loads(lines[0])
+        self.assertEqual(record['order_number'], Order.objects.get().order_number)
+        self.assertEqual(record['items'], 1)
+
+    def test_export_query_count_is_constant(self):
+        self.add_orders(1)
+        with CaptureQueriesContext(connection) as baseline:
+            b''.join(stream_export(ORDER_ITEM_EXPORT, OrderItem.objects.all(), chunk_size=2))
+        self.add_orders(5)
+        with self.assertNumQueries(len(baseline)):
+            content = b''.join(stream_export(ORDER_ITEM_EXPORT, OrderItem.objects.all(), chunk_size=2))
+        self.assertEqual(len(content.splitlines()), 7)
+
+
+class OutboxTests(OrderAdminTestCase):
+    """Events are written with the change and processed at least once"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(outbox.HANDLERS.pop, 'test.topic', None)
+
+    def test_transition_enqueues_event(self):
+        self.add_orders(2)
+        transition_orders(Order.objects.all(), 'PROCESSING')
+        event = OutboxEvent.objects.get(topic='order.status_changed')
+        self.assertEqual(event.status, 'PENDING')
+        self.assertEqual(sorted(event.payload['order_ids']), sorted(Order.objects.values_list('id', flat=True)))
+
+    @override_settings(REVIEW_ELIGIBILITY_CACHE_TIMEOUT=3600)
+    def test_transition_clears_review_eligibility_on_commit(self):
+        self.add_orders(1)
+        Order.objects.update(status='SHIPPED')
+        order = Order.objects.get()
+        self.assertFalse(can_review(order.customer, self.product.id))
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_orders(Order.objects.all(), 'DELIVERED')
+            # Still cached until the status change commits
+            self.assertIsNotNone(cache.get(f'review_eligibility:{order.customer_id}'))
+        self.assertIsNone(cache.get(f'review_eligibility:{order.customer_id}'))
+        self.assertTrue(can_review(order.customer, self.product.id))
+
+    def test_worker_requires_shared_cache(self):
+        with self.assertRaisesMessage(CommandError, 'REDIS_URL'):
+            call_command('run_outbox_worker', '--once', stdout=io.StringIO())
+        outbox.enqueue('test.unknown', {})
+        stdout = io.StringIO()
+        call_command('run_outbox_worker', '--once', '--allow-local-cache', stdout=stdout)
+        self.assertIn('processed 1 outbox events.', stdout.getvalue())
+
+    @override_settings(ADMINS=[('Ops', 'ops@example.com')])
+    def test_low_stock_alert_is_sent_once(self):
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=1, low_stock_threshold=5)
+        self.add_orders(2)
+        for order in Order.objects.all():
+            outbox.enqueue('order.placed', {'order_id': order.id})
+        self.assertEqual(outbox.drain(), 2)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(OutboxEvent.objects.exclude(status='DONE').exists())
+
+    def test_failed_event_is_retried_then_dead(self):
+        calls = []
+
+        @outbox.handler('test.topic')
+        def fail(event):
+            calls.append(event.id)
+            raise RuntimeError('boom')
+
+        event = outbox.enqueue('test.topic', {})
+        outbox.process_batch()
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), ('PENDING', 1))
+        self.assertIn('boom', event.last_error)
+        self.assertGreater(event.available_at, timezone.now())
+
+        # Not due yet, so the next batch leaves it alone
+        self.assertEqual(outbox.process_batch(), 0)
+
+        OutboxEvent.objects.filter(pk=event.pk).update(attempts=outbox.MAX_ATTEMPTS - 1,
+                                                       available_at=timezone.now() - timedelta(seconds=1))
+        outbox.process_batch()
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'DEAD')
+        self.assertEqual(len(calls), 2)
+
+    def test_handler_runs_after_claim_commits(self):
+        seen = []
+
+        @outbox.handler('test.topic')
+        def check(event):
+            # The event is leased, so another worker's claim passes it over
+            seen.append((OutboxEvent.objects.get(pk=event.pk).available_at > timezone.now(), outbox.claim_batch()))
+
+        event = outbox.enqueue('test.topic', {})
+        self.assertEqual(outbox.process_batch(), 1)
+        self.assertEqual(seen, [(True, [])])
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'DONE')
+
+    def test_interrupted_batch_releases_the_rest(self):
+        @outbox.handler('test.topic')
+        def interrupt(event):
+            raise KeyboardInterrupt
+
+        events = [outbox.enqueue('test.topic', {}) for _ in range(2)]
+        with self.assertRaises(KeyboardInterrupt):
+            outbox.process_batch()
+        self.assertEqual(outbox.claim_batch(), events)
+
+    def test_unknown_topic_is_dropped(self):
+        event = outbox.enqueue('test.unknown', {})
+        outbox.process_batch()
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'DONE')
+
+    def test_backoff_is_capped(self):
+        self.assertEqual(outbox.backoff(1), outbox.BASE_BACKOFF)
+        self.assertEqual(outbox.backoff(2), outbox.BASE_BACKOFF * 2)
+        self.assertEqual(outbox.backoff(50), outbox.MAX_BACKOFF)
+
+
+class TransitionTests(OrderAdminTestCase):
+    """Bulk status changes follow ALLOWED_TRANSITIONS and record history per order"""
+
+    def test_allowed_transitions(self):
+        order = Order(status='PENDING')
+        self.assertTrue(can_transition(order, 'PROCESSING'))
+        self.assertTrue(can_transition(order, 'CANCELLED'))
+        self.assertFalse(can_transition(order, 'DELIVERED'))
+        self.assertFalse(can_transition(Order(status='CANCELLED'), 'PENDING'))
+        self.assertEqual(source_statuses('CANCELLED'), ['PENDING', 'PROCESSING'])
+        self.assertEqual(source_statuses('PENDING'), [])
+
+    def test_orders_that_cannot_move_are_untouched(self):
+        self.add_orders(3)
+        pending = Order.objects.order_by('id').first()
+        Order.objects.exclude(pk=pending.pk).update(status='PROCESSING')
+        self.assertEqual(transition_orders(Order.objects.all(), 'SHIPPED'), 2)
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'PENDING')
+        self.assertFalse(Order.objects.filter(status='SHIPPED', shipped_at=None).exists())
+        self.assertFalse(pending.status_history.exists())
+
+    def test_chunks_write_history_and_one_event_each(self):
+        self.add_orders(5)
+        order_ids = list(Order.objects.order_by('id').values_list('id', flat=True))
+        with self.assertNumQueries(3 * 6):
+            changed = transition_orders(order_ids, 'PROCESSING', user=self.admin, notes='Batch', chunk_size=2)
+        self.assertEqual(changed, 5)
+        self.assertEqual(OutboxEvent.objects.filter(topic='order.status_changed').count(), 3)
+        history = OrderStatusHistory.objects.all()
+        self.assertEqual(sorted(history.values_list('order_id', flat=True)), order_ids)
+        self.assertEqual({(row.status, row.notes, row.created_by_id) for row in history},
+                         {('PROCESSING', 'Batch', self.admin.pk)})
+
+    def change_form_data(self, order, **changes):
+        """POST data for the order's admin change form as it renders"""
+        response = self.client.get(f'/admin/orders/order/{order.pk}/change/')
+        forms, data = [response.context['adminform'].form], {}
+        for inline in response.context['inline_admin_formsets']:
+            management = inline.formset.management_form
+            data.update({management.add_prefix(name): value for name, value in management.initial.items()})
+            forms.extend(inline.formset.forms)
+        for form in forms:
+            for name in form.fields:
+                value = form[name].value()
+                if value is not None:
+                    data[form.add_prefix(name)] = value
+        data.update(changes)
+        return data
+
+    def test_change_form_status_goes_through_transitions(self):
+        self.add_orders(1)
+        order = Order.objects.get()
+        response = self.client.post(f'/admin/orders/order/{order.pk}/change/',
+                                    self.change_form_data(order, status='DELIVERED'))
+        self.assertContains(response, 'An order that is Pending cannot move to Delivered.')
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'PENDING')
+
+        response = self.client.post(f'/admin/orders/order/{order.pk}/change/',
+                                    self.change_form_data(order, status='PROCESSING', admin_notes='Rush'))
+        self.assertEqual(response.status_code, 302)
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.admin_notes), ('PROCESSING', 'Rush'))
+        history = order.status_history.get()
+        self.assertEqual((history.status, history.created_by), ('PROCESSING', self.admin))
+        self.assertEqual(OutboxEvent.objects.get(topic='order.status_changed').payload['order_ids'], [order.pk])
+
+    def test_admin_action_queues_job_for_worker(self):
+        self.add_orders(3)
+        with mock.patch('orders.admin.BACKGROUND_THRESHOLD', 2):
+            response = self.client.post('/admin/orders/order/', {
+                'action': 'mark_as_processing', '_selected_action': list(Order.objects.values_list('id', flat=True)),
+            }, follow=True)
+        job = OrderTransitionJob.objects.get()
+        self.assertContains(response, f'/admin/orders/order/transition-jobs/{job.pk}/')
+        self.assertFalse(Order.objects.exclude(status='PENDING').exists())
+
+        progress = self.client.get(f'/admin/orders/order/transition-jobs/{job.pk}/').json()
+        self.assertEqual(progress, {'status': 'queued', 'target': 'PROCESSING', 'total': 3,
+                                    'processed': 0, 'changed': 0})
+
+        self.assertEqual(run_transition_jobs(chunk_size=2), 1)
+        progress = self.client.get(f'/admin/orders/order/transition-jobs/{job.pk}/').json()
+        self.assertEqual(progress, {'status': 'done', 'target': 'PROCESSING', 'total': 3,
+                                    'processed': 3, 'changed': 3})
+        self.assertEqual(OrderStatusHistory.objects.filter(created_by=self.admin).count(), 3)
+        self.assertEqual(run_transition_jobs(), 0)
+
+    def test_stale_job_resumes_after_last_committed_chunk(self):
+        self.add_orders(4)
+        order_ids = list(Order.objects.order_by('id').values_list('id', flat=True))
+        job = start_transition_job(order_ids, 'PROCESSING')
+        # A worker claimed the job, committed the first chunk and died
+        OrderTransitionJob.objects.filter(pk=job.pk).update(
+            status='RUNNING', processed=2, updated_at=timezone.now() - JOB_STALE_AFTER / 2
+        )
+        self.assertIsNone(claim_transition_job())
+
+        OrderTransitionJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - JOB_STALE_AFTER * 2)
+        self.assertEqual(run_transition_jobs(chunk_size=2), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.changed), ('DONE', 4, 2))
+        self.assertEqual(list(Order.objects.filter(status='PROCESSING').order_by('id').values_list('id', flat=True)),
+                         order_ids[2:])
+
+    def test_failed_job_records_error(self):
+        self.add_orders(1)
+        job = start_transition_job(list(Order.objects.values_list('id', flat=True)), 'PROCESSING')
+        with mock.patch('orders.transitions._apply_chunk', side_effect=RuntimeError('boom')), \
+                self.assertLogs('orders.transitions', 'ERROR'):
+            run_transition_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed), ('FAILED', 0))
+        self.assertIn('boom', job.last_error)
+        self.assertFalse(Order.objects.exclude(status='PENDING').exists())
+
+
+class CheckoutIdempotencyTests(StoreTransactionTestCase):
+    """A checkout form places at most one order however often it is submitted"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('shopper', password='password')
+        category = Category.objects.create(name='Tops')
+        product = Product.objects.create(
+            name='Tee', sku='TEE-1', description='Tee', category=category, price=Decimal('10.00')
+        )
+        self.address = Address.objects.create(
+            customer=self.user, address_type='SHIPPING', full_name='C', phone='1',
+            address_line1='Street', city='City', state='State', postal_code='1'
+        )
+        cart = Cart.objects.create(customer=self.user)
+        CartItem.objects.create(cart=cart, product=product, quantity=2)
+        self.client.force_login(self.user)
+
+    def submit(self, client, key):
+        return client.post('/orders/place-order/', {
+            'checkout_key': key, 'shipping_address': self.address.id, 'payment_method': 'COD',
+        })
+
+    def test_checkout_renders_key(self):
+        response = self.client.get('/orders/checkout/')
+        self.assertContains(response, 'name="checkout_key"')
+
+    def test_missing_or_forged_key_is_rejected(self):
+        for key in ['', 'not-a-key', new_checkout_key(User.objects.create_user('other'))]:
+            response = self.submit(self.client, key)
+            self.assertRedirects(response, '/orders/checkout/', fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+
+    def test_replay_redirects_without_writing(self):
+        key = new_checkout_key(self.user)
+        first = self.submit(self.client, key)
+        order = Order.objects.get()
+        self.assertRedirects(first, f'/orders/order/{order.order_number}/', fetch_redirect_response=False)
+
+        with CaptureQueriesContext(connection) as queries:
+            replay = self.submit(self.client, key)
+        self.assertEqual(replay['Location'], first['Location'])
+        writes = [q['sql'] for q in queries if not q['sql'].lstrip().upper().startswith('SELECT')]
+        self.assertEqual(writes, [])
+
+        # Without the cache the order row still answers the replay
+        cache.clear()
+        self.assertEqual(self.submit(self.client, key)['Location'], first['Location'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_parallel_submissions_place_one_order(self):
+        key = new_checkout_key(self.user)
+        clients = [Client() for _ in range(5)]
+        for client in clients:
+            client.force_login(self.user)
+        barrier = threading.Barrier(len(clients), timeout=10)
+        locations = []
+
+        def submit(client):
+            barrier.wait()
+            try:
+                locations.append(self.submit(client, key)['Location'])
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=submit, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        order = Order.objects.get()
+        self.assertEqual(locations, [f'/orders/order/{order.order_number}/'] * 5)
+        self.assertEqual(order.items.count(), 1)
+
+
+class CouponRedemptionTests(OrderAdminTestCase):
+    """Coupons are validated from memory and redeemed with one conditional UPDATE"""
+
+    def setUp(self):
+        super().setUp()
+        coupons.clear_coupon_cache()
+        now = timezone.now()
+        self.coupon = Coupon.objects.create(
+            code='SAVE10', discount_type='PERCENTAGE', discount_value=Decimal('10'),
+            minimum_order_amount=Decimal('15.00'), usage_limit=2, usage_per_customer=1,
+            valid_from=now - timedelta(days=1), valid_to=now + timedelta(days=1),
+        )
+        self.add_orders(3)
+        self.orders = list(Order.objects.order_by('id'))
+        Order.objects.update(subtotal=Decimal('20.00'))
+        for order in self.orders:
+            order.subtotal = Decimal('20.00')
+
+    def test_validate_uses_no_queries_once_cached(self):
+        coupons.active_coupons()
+        with self.assertNumQueries(0):
+            coupon, discount = coupons.validate(' SAVE10 ', Decimal('20.00'))
+        self.assertEqual(discount, Decimal('2.00'))
+        with self.assertRaisesMessage(coupons.CouponError, 'at least'):
+            coupons.validate('SAVE10', Decimal('5.00'))
+        with self.assertRaises(coupons.CouponError):
+            coupons.validate('NOPE', Decimal('20.00'))
+
+    def test_saving_a_coupon_clears_the_cache(self):
+        coupons.active_coupons()
+        self.coupon.is_active = False
+        self.coupon.save()
+        with self.assertRaises(coupons.CouponError):
+            coupons.validate('SAVE10', Decimal('20.00'))
+
+    def test_usage_limit_is_enforced(self):
+        for order in self.orders[:2]:
+            coupons.redeem(self.coupon, order, Decimal('2.00'))
+        with self.assertRaisesMessage(coupons.CouponError, 'usage limit'):
+            coupons.redeem(self.coupon, self.orders[2], Decimal('2.00'))
+        self.coupon.refresh_from_db()
+        self.assertEqual(self.coupon.times_used, 2)
+        self.assertEqual(CouponRedemption.objects.count(), 2)
+
+    def test_usage_per_customer_is_enforced(self):
+        coupons.redeem(self.coupon, self.orders[0], Decimal('2.00'))
+        repeat = Order.objects.create(customer=self.orders[0].customer, subtotal=Decimal('20.00'))
+        with self.assertRaises(coupons.CouponError):
+            coupons.redeem(self.coupon, repeat, Decimal('2.00'))
+        self.coupon.refresh_from_db()
+        self.assertEqual(self.coupon.times_used, 1)
+
+    def test_place_order_redeems_coupon(self):
+        customer = self.orders[0].customer
+        cart = Cart.objects.create(customer=customer)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        self.client.force_login(customer)
+        self.client.post('/orders/place-order/', {
+            'checkout_key': new_checkout_key(customer), 'shipping_address': self.orders[0].shipping_address_id,
+            'coupon_code': 'SAVE10',
+        })
+        order = Order.objects.get(customer=customer, checkout_key__isnull=False)
+        self.assertEqual(order.discount_amount, Decimal('2.00'))
+        self.assertEqual(order.coupon_redemption.coupon, self.coupon)
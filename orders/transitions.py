@@ -0,0 +1,159 @@
+import logging
+from datetime import timedelta
+from functools import partial
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from catalog.eligibility import invalidate_review_eligibility
+from .models import Order, OrderStatusHistory, OrderTransitionJob
+from .outbox import enqueue
+
+logger = logging.getLogger(__name__)
+
+# Allowed status changes: current status -> statuses it may move to
+ALLOWED_TRANSITIONS = {
+    'PENDING': {'PROCESSING', 'CANCELLED'},
+    'PROCESSING': {'SHIPPED', 'CANCELLED'},
+    'SHIPPED': {'DELIVERED'},
+    'DELIVERED': {'REFUNDED'},
+    'CANCELLED': set(),
+    'REFUNDED': set(),
+}
+
+# Timestamp column stamped when an order enters a status
+STATUS_TIMESTAMPS = {
+    'SHIPPED': 'shipped_at',
+    'DELIVERED': 'delivered_at',
+}
+
+CHUNK_SIZE = 1000
+BACKGROUND_THRESHOLD = 500
+JOB_STALE_AFTER = timedelta(minutes=15)
+
+
+def source_statuses(status):
+    """Statuses an order may be in to move to `status`"""
+    return [source for source, targets in ALLOWED_TRANSITIONS.items() if status in targets]
+
+
+def can_transition(order, status):
+    return status in ALLOWED_TRANSITIONS.get(order.status, set())
+
+
+def _apply_chunk(order_ids, status, user_id, notes):
+    sources = source_statuses(status)
+    with transaction.atomic():
+        rows = list(
+            Order.objects.select_for_update()
+            .filter(id__in=order_ids, status__in=sources)
+            .values_list('id', 'customer_id')
+        )
+        if not rows:
+            return 0
+
+        now = timezone.now()
+        changes = {'status': status, 'updated_at': now}
+        if status in STATUS_TIMESTAMPS:
+            changes[STATUS_TIMESTAMPS[status]] = now
+        Order.objects.filter(id__in=[order_id for order_id, _ in rows]).update(**changes)
+
+        OrderStatusHistory.objects.bulk_create([
+            OrderStatusHistory(order_id=order_id, status=status, notes=notes, created_by_id=user_id)
+            for order_id, _ in rows
+        ])
+        customer_ids = sorted({customer_id for _, customer_id in rows})
+        enqueue('order.status_changed', {
+            'status': status,
+            'order_ids': [order_id for order_id, _ in rows],
+            'customer_ids': customer_ids,
+        })
+        # The UPDATE fires no post_save, so clear what the customers may
+        # review here; the outbox handler repeats it if the cache was down
+        transaction.on_commit(partial(invalidate_review_eligibility, *customer_ids), robust=True)
+    return len(rows)
+
+
+def transition_orders(orders, status, user=None, notes='', chunk_size=CHUNK_SIZE):
+    """
+    Move every order in `orders` (a queryset or list of ids) that is allowed
+    to reach `status`, with one UPDATE, one history bulk insert and one
+    outbox event per chunk.
+    Orders in a status that cannot transition are left untouched.
+    Returns the number of orders changed.
+    """
+    if isinstance(orders, (list, tuple, set)):
+        order_ids = list(orders)
+    else:
+        order_ids = list(orders.filter(status__in=source_statuses(status)).order_by('id').values_list('id', flat=True))
+
+    changed = 0
+    for start in range(0, len(order_ids), chunk_size):
+        changed += _apply_chunk(order_ids[start:start + chunk_size], status, user.pk if user else None, notes)
+    return changed
+
+
+def start_transition_job(order_ids, status, user=None, notes=''):
+    """Queue a transition of `order_ids` for the outbox worker (run_outbox_worker)"""
+    return OrderTransitionJob.objects.create(
+        target=status, order_ids=list(order_ids), total=len(order_ids), notes=notes, created_by=user
+    )
+
+
+def get_transition_job(job_id):
+    """Progress dict for a transition job, or None if unknown"""
+    job = OrderTransitionJob.objects.filter(pk=job_id).values(
+        'status', 'target', 'total', 'processed', 'changed'
+    ).first()
+    if job is not None:
+        job['status'] = job['status'].lower()
+    return job
+
+
+def claim_transition_job():
+    """
+    Take the oldest queued job, or a running one whose worker stopped
+    updating it for JOB_STALE_AFTER, with SKIP LOCKED so concurrent workers
+    never take the same job.
+    """
+    with transaction.atomic():
+        job = (
+            OrderTransitionJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='QUEUED') | Q(status='RUNNING', updated_at__lt=timezone.now() - JOB_STALE_AFTER))
+            .order_by('id')
+            .first()
+        )
+        if job is not None:
+            job.status = 'RUNNING'
+            job.save(update_fields=['status', 'updated_at'])
+    return job
+
+
+def run_transition_job(job, chunk_size=CHUNK_SIZE):
+    """
+    Apply a claimed job chunk by chunk from where it stopped. Each chunk
+    commits together with the job's progress, so a restarted job neither
+    skips nor repeats a chunk.
+    """
+    try:
+        for start in range(job.processed, job.total, chunk_size):
+            with transaction.atomic():
+                job.changed += _apply_chunk(job.order_ids[start:start + chunk_size], job.target,
+                                            job.created_by_id, job.notes)
+                job.processed = min(start + chunk_size, job.total)
+                job.save(update_fields=['processed', 'changed', 'updated_at'])
+        job.status = 'DONE'
+    except Exception as error:
+        logger.exception('Order transition job %s failed', job.id)
+        job.status = 'FAILED'
+        job.last_error = f'{type(error).__name__}: {error}'
+    job.save(update_fields=['status', 'last_error', 'updated_at'])
+    return job
+
+
+def run_transition_jobs(chunk_size=CHUNK_SIZE):
+    """Run queued transition jobs until none are left. Returns the number run."""
+    count = 0
+    while (job := claim_transition_job()) is not None:
+        run_transition_job(job, chunk_size)
+        count += 1
+    return count
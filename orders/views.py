@@ -1,10 +1,17 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import IntegrityError, transaction
 from django.utils import timezone
-from decimal import Decimal
-from .models import Order, OrderItem, Coupon, OrderStatusHistory
+from shopping_store.db_router import replica_reads
+from shopping_store.money import Money
+from . import coupons
+from .idempotency import checkout_key_value, claim, completed_order, new_checkout_key, release, remember, wait_for_order
+from .models import Order, OrderItem, OrderStatusHistory
+from .outbox import enqueue
+from .transitions import can_transition, transition_orders
 from cart.models import Cart
+from cart.pricing import get_priced_cart
 from customers.models import Address
 
 
@@ -12,8 +19,9 @@ from customers.models import Address
 def checkout(request):
     """Checkout page"""
     cart = get_object_or_404(Cart, customer=request.user)
+    priced_cart = get_priced_cart(request, cart)
     
-    if not cart.items.exists():
+    if not priced_cart.lines:
         messages.warning(request, 'Your cart is empty!')
         return redirect('cart:cart_detail')
     
@@ -26,20 +34,49 @@ def checkout(request):
     
     context = {
         'cart': cart,
+        'priced_cart': priced_cart,
         'shipping_addresses': shipping_addresses,
+        'checkout_key': new_checkout_key(request.user),
     }
     return render(request, 'orders/checkout.html', context)
 
 
 @login_required
 def place_order(request):
-    """Process order placement"""
+    """
+    Process order placement. Each checkout form carries an idempotency key:
+    resubmitting it (double clicks, retries) redirects to the order it
+    already placed instead of placing another.
+    """
     if request.method != 'POST':
         return redirect('orders:checkout')
-    
+
+    key = checkout_key_value(request.user, request.POST.get('checkout_key', ''))
+    if key is None:
+        messages.error(request, 'Your checkout page has expired. Please review your order and try again.')
+        return redirect('orders:checkout')
+
+    if claim(key):
+        try:
+            order_number = completed_order(request.user, key)
+            if order_number is None:
+                return _place_order(request, key)
+        finally:
+            release(key)
+    else:
+        # The same form is being submitted right now; wait for its result
+        order_number = wait_for_order(request.user, key)
+        if order_number is None:
+            messages.info(request, 'This checkout was already submitted. Please check your orders.')
+            return redirect('orders:order_list')
+    return redirect('orders:order_detail', order_number=order_number)
+
+
+def _place_order(request, key):
     cart = get_object_or_404(Cart, customer=request.user)
+    priced_cart = get_priced_cart(request, cart)
     
-    if not cart.items.exists():
+    if not priced_cart.lines:
         messages.error(request, 'Your cart is empty!')
         return redirect('cart:cart_detail')
     
@@ -53,50 +90,60 @@ def place_order(request):
     shipping_address = get_object_or_404(Address, id=shipping_address_id, customer=request.user)
     
     
+    try:
+        order = _create_order(request, priced_cart, shipping_address, payment_method, key)
+    except IntegrityError:
+        # Another process placed the order for this key first
+        order_number = completed_order(request.user, key)
+        if order_number is None:
+            raise
+        return redirect('orders:order_detail', order_number=order_number)
+    remember(key, order.order_number)
+
+    messages.success(request, f'Order {order.order_number} placed successfully!')
+    return redirect('orders:order_detail', order_number=order.order_number)
+
+
+@transaction.atomic
+def _create_order(request, priced_cart, shipping_address, payment_method, key):
+    """Write the order, its items and history, and empty the cart in one transaction"""
     # Create order
     order = Order.objects.create(
         customer=request.user,
         shipping_address=shipping_address,
-       
+        checkout_key=key,
         payment_method=payment_method,
-        subtotal=cart.subtotal,
-        shipping_cost=Decimal('10.00'),  # Fixed shipping cost
-        tax_amount=cart.subtotal * Decimal('0.10'),  # 10% tax
+        subtotal=priced_cart.subtotal,
+        shipping_cost=priced_cart.shipping,
+        tax_amount=priced_cart.tax,
     )
-    
-    # Apply coupon if provided
+
+    # Apply coupon if provided; an unusable coupon leaves the order undiscounted
+    discount = Money()
     coupon_code = request.POST.get('coupon_code')
     if coupon_code:
         try:
-            coupon = Coupon.objects.get(code=coupon_code, is_active=True)
-            is_valid, message = coupon.is_valid()
-            if is_valid:
-                if coupon.discount_type == 'PERCENTAGE':
-                    discount = order.subtotal * (coupon.discount_value / 100)
-                    if coupon.maximum_discount:
-                        discount = min(discount, coupon.maximum_discount)
-                else:
-                    discount = coupon.discount_value
-                order.discount_amount = discount
-                coupon.times_used += 1
-                coupon.save()
-        except Coupon.DoesNotExist:
-            pass
-    
+            coupon, discount = coupons.validate(coupon_code, priced_cart.subtotal)
+            coupons.redeem(coupon, order, discount)
+        except coupons.CouponError as error:
+            discount = Money()
+            messages.warning(request, f'{error}; your order was placed without the discount.')
+
     # Calculate total
-    order.total_amount = order.subtotal + order.tax_amount + order.shipping_cost - order.discount_amount
+    order.discount_amount = discount
+    order.total_amount = priced_cart.total - discount
     order.save()
-    
+
     # Create order items from cart
-    for cart_item in cart.items.all():
+    for line in priced_cart.lines:
         OrderItem.objects.create(
             order=order,
-            product=cart_item.product,
-            variant=cart_item.variant,
-            quantity=cart_item.quantity,
-            unit_price=cart_item.unit_price,
+            product=line.product,
+            variant=line.variant,
+            quantity=line.quantity,
+            unit_price=line.unit_price,
         )
-    
+
     # Create initial status history
     OrderStatusHistory.objects.create(
         order=order,
@@ -104,14 +151,16 @@ def place_order(request):
         notes='Order placed successfully',
         created_by=request.user
     )
-    
+
+    # Side effects run in the outbox worker once this commits
+    enqueue('order.placed', {'order_id': order.id})
+
     # Clear cart
-    cart.items.all().delete()
-    
-    messages.success(request, f'Order {order.order_number} placed successfully!')
-    return redirect('orders:order_detail', order_number=order.order_number)
+    priced_cart.cart.items.all().delete()
+    return order
 
 
+@replica_reads
 @login_required
 def order_list(request):
     """List user's orders"""
@@ -131,17 +180,9 @@ def cancel_order(request, order_number):
     """Cancel an order"""
     order = get_object_or_404(Order, order_number=order_number, customer=request.user)
     
-    if order.status in ['PENDING', 'PROCESSING']:
-        order.status = 'CANCELLED'
-        order.save()
-        
-        OrderStatusHistory.objects.create(
-            order=order,
-            status='CANCELLED',
-            notes='Order cancelled by customer',
-            created_by=request.user
-        )
-        
+    if can_transition(order, 'CANCELLED') and transition_orders(
+        [order.id], 'CANCELLED', user=request.user, notes='Order cancelled by customer'
+    ):
         messages.success(request, f'Order {order.order_number} has been cancelled.')
     else:
         messages.error(request, 'This order cannot be cancelled.')
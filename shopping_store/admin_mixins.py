@@ -0,0 +1,104 @@
+from functools import reduce
+from operator import or_
+from django.contrib.admin.utils import lookup_spawns_duplicates
+from django.core import checks
+from django.db.models import Q
+from . import search
+from .exports import export_response
+from .paginators import EstimatedCountPaginator
+
+
+class ComputedColumnsMixin:
+    """
+    Declare changelist columns as ORM expressions.
+
+    `computed_columns` maps an annotation name to an aggregate or other
+    expression. They are added to the admin queryset so list_display
+    methods read `obj.<name>` instead of querying per row, and each column
+    can sort on its annotation.
+    """
+    computed_columns = {}
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.computed_columns:
+            queryset = queryset.annotate(**self.computed_columns)
+        return queryset
+
+
+class EstimatedCountMixin:
+    """
+    For changelists over very large tables: page counts come from planner
+    estimates and the unfiltered total is not counted separately.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class IndexedSearchMixin:
+    """
+    Route changelist search through shopping_store.search instead of
+    icontains scans.
+
+    A term equal to a value of one of `exact_search_fields` (SKU, order
+    number, email) is answered by that equality lookup alone. Otherwise
+    `search_fields` are matched by the backend for the database: trigram
+    and full-text indexes on PostgreSQL (`fulltext_search_fields` use the
+    latter), or the word index elsewhere, which the model's app must
+    register with search.register() for every search field.
+    """
+    exact_search_fields = []
+    fulltext_search_fields = []
+
+    def check(self, **kwargs):
+        errors = super().check(**kwargs)
+        missing = [field for field in self.search_fields if field not in search.indexed_fields(self.model)]
+        if missing:
+            errors.append(checks.Error(
+                f'search_fields {missing} are not in the search index of {self.model._meta.label}.',
+                hint='Register them with shopping_store.search.register() in the app\'s ready().',
+                obj=self.__class__,
+                id='shopping_store.E001',
+            ))
+        return errors
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+
+        if self.exact_search_fields:
+            exact = queryset.filter(reduce(or_, (Q(**{field: term}) for field in self.exact_search_fields)))
+            if exact.exists():
+                return exact, False
+
+        results = search.get_search_backend(queryset.db).search(
+            queryset, term, self.search_fields, self.fulltext_search_fields
+        )
+        may_have_duplicates = any(lookup_spawns_duplicates(self.opts, field) for field in self.search_fields)
+        return results, may_have_duplicates
+
+
+class ExportMixin:
+    """
+    Admin actions streaming the selected rows through `export` (a
+    shopping_store.exports.Export). Add 'export_csv', 'export_csv_gzip' and
+    'export_jsonl' to the admin's actions to offer them.
+    """
+    export = None
+
+    def _export(self, queryset, fmt, compress=False):
+        rows = self.model._default_manager.filter(pk__in=queryset.values('pk'))
+        return export_response(self.export, rows, fmt, compress)
+
+    def export_csv(self, request, queryset):
+        return self._export(queryset, 'csv')
+    export_csv.short_description = 'Export selected as CSV'
+
+    def export_csv_gzip(self, request, queryset):
+        return self._export(queryset, 'csv', compress=True)
+    export_csv_gzip.short_description = 'Export selected as CSV (gzip)'
+
+    def export_jsonl(self, request, queryset):
+        return self._export(queryset, 'jsonl')
+    export_jsonl.short_description = 'Export selected as JSON Lines'
@@ -9,6 +9,9 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shopping_store.settings')
 django.setup()
 
 import catalog.routing
+from shopping_store.db_pool import warm_connection_pools
+
+warm_connection_pools()
 
 application = ProtocolTypeRouter({
 	'http': get_asgi_application(),
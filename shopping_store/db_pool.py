@@ -0,0 +1,39 @@
+import logging
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def pools():
+    """(alias, pool) for every database using psycopg 3 connection pooling"""
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            yield alias, pool
+
+
+def warm_connection_pools(timeout=None):
+    """
+    Open each database pool and wait until it holds its minimum number of
+    connections, so the first requests after a deploy don't queue behind
+    connection setup. Call it in each worker process (after any fork). It
+    never raises: psycopg closes a pool for good when it doesn't fill in
+    time, so such a pool is logged and dropped, and Django builds and opens
+    a fresh one on the first query.
+    """
+    if not settings.DATABASE_POOL:
+        return
+    from psycopg_pool import PoolTimeout
+
+    timeout = settings.DATABASE_POOL_WARM_TIMEOUT if timeout is None else timeout
+    for alias, pool in list(pools()):
+        try:
+            pool.open(wait=True, timeout=timeout)
+        except PoolTimeout:
+            logger.warning('Connection pool for %s not filled within %ss', alias, timeout)
+        except Exception:
+            logger.exception('Could not open the connection pool for %s', alias)
+        else:
+            continue
+        connections[alias].close_pool()
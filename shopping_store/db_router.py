@@ -0,0 +1,132 @@
+"""
+Read replica routing. Reads made while serving a view marked with
+@replica_reads go to a healthy replica from DATABASE_REPLICAS; everything
+else, and every write, goes to the primary. A visitor who has just written
+something is pinned to the primary for REPLICA_PIN_SECONDS so they read
+their own writes while the replicas catch up.
+"""
+import contextvars
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+# A session read from a lagging replica looks missing, and SessionMiddleware
+# would then delete the visitor's session cookie
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_routing = contextvars.ContextVar('replica_routing', default=None)
+# Replica alias -> monotonic time after which a failed replica is tried again
+_unhealthy = {}
+
+
+class _RequestRouting:
+    __slots__ = ('pinned', 'use_replica', 'replica', 'wrote')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.use_replica = False
+        self.replica = None
+        self.wrote = False
+
+
+def replica_reads(view):
+    """Mark a view function or class whose reads may be served by a replica"""
+    view.replica_reads = True
+    return view
+
+
+def replica_healthy(alias):
+    """Whether `alias` accepts connections; a failed replica is skipped for REPLICA_RETRY_SECONDS"""
+    retry_at = _unhealthy.get(alias)
+    if retry_at is not None and time.monotonic() < retry_at:
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        _unhealthy[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        return False
+    _unhealthy.pop(alias, None)
+    return True
+
+
+def choose_replica():
+    """A random healthy replica, or the primary if none is"""
+    replicas = list(settings.DATABASE_REPLICAS)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if replica_healthy(alias):
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.use_replica or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        # One replica per request, so its reads see a single snapshot
+        if routing.replica is None:
+            routing.replica = choose_replica()
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """Tracks each request's routing and pins visitors to the primary after they write"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = _RequestRouting(pinned=PIN_COOKIE in request.COOKIES)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(request, routing, response)
+
+    async def __acall__(self, request):
+        routing = _RequestRouting(pinned=PIN_COOKIE in request.COOKIES)
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(request, routing, response)
+
+    def pin(self, request, routing, response):
+        # Writes made while merely viewing a page (activity tracking, sessions)
+        # don't need to be read back, so only form posts and the like pin
+        if routing.wrote and request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = _routing.get()
+        view = getattr(view_func, 'view_class', view_func)
+        if (routing is not None and not routing.pinned and settings.DATABASE_REPLICAS
+                and getattr(view, 'replica_reads', False)):
+            routing.use_replica = True
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+class CreateSearchIndexes(migrations.RunPython):
+    """
+    Create the PostgreSQL indexes behind shopping_store.search's backend;
+    other databases are left alone. `trigram` and `fulltext` list
+    (index name, table, column). Trigram indexes serve UPPER(col) LIKE
+    '%term%' (icontains); full-text indexes must match the
+    SearchVector(field, config='english') expression.
+    """
+
+    def __init__(self, trigram=(), fulltext=()):
+        self.trigram = list(trigram)
+        self.fulltext = list(fulltext)
+        super().__init__(self.create_indexes, self.drop_indexes)
+
+    def deconstruct(self):
+        return self.__class__.__name__, [], {'trigram': self.trigram, 'fulltext': self.fulltext}
+
+    def describe(self):
+        return f'Create {len(self.trigram) + len(self.fulltext)} search indexes (PostgreSQL only)'
+
+    def create_indexes(self, apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        if self.trigram:
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, table, column in self.trigram:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+            )
+        for name, table, column in self.fulltext:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+                f"USING gin (to_tsvector('english'::regconfig, COALESCE({column}::text, '')))"
+            )
+
+    def drop_indexes(self, apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for name, _, _ in self.trigram + self.fulltext:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
@@ -0,0 +1,183 @@
+"""
+Money as integer minor units (paise). Amounts are stored as DECIMAL(10, 2)
+and converted once on the way in; pricing arithmetic then runs on ints and
+every rounding goes through round_div (half up, away from zero).
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from functools import total_ordering
+from typing import NamedTuple
+from django.db import models
+
+MINOR_UNITS = 100
+CENT = Decimal('0.01')
+# Rates are basis points (1/100 of a percent) so applying them stays integer
+BASIS_POINTS = 10000
+TAX_RATE = 1000
+SHIPPING_COST = 1000
+
+
+def round_div(numerator, denominator):
+    """numerator / denominator rounded half up, for integers"""
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if remainder * 2 >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def to_minor(value):
+    """Minor units for a Decimal, int, str or Money amount of major units"""
+    if isinstance(value, Money):
+        return value.minor
+    return int((Decimal(value) * MINOR_UNITS).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+def to_basis_points(percent):
+    """Basis points for a percentage such as Decimal('12.5')"""
+    return int((Decimal(percent) * 100).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+def apply_rate(minor, rate):
+    return round_div(minor * rate, BASIS_POINTS)
+
+
+@total_ordering
+class Money:
+    """An amount in minor units. Prints, formats and converts like its Decimal value."""
+    __slots__ = ('minor',)
+
+    def __init__(self, minor=0):
+        self.minor = int(minor)
+
+    @classmethod
+    def from_decimal(cls, value):
+        return cls(to_minor(value or 0))
+
+    @property
+    def decimal(self):
+        return Decimal(self.minor).scaleb(-2)
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.minor + other.minor)
+        if other == 0:
+            return self
+        return NotImplemented
+
+    # sum() starts from 0
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.minor - other.minor)
+        return NotImplemented
+
+    def __mul__(self, quantity):
+        if isinstance(quantity, int):
+            return Money(self.minor * quantity)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money(-self.minor)
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.minor == other.minor
+        if isinstance(other, (int, Decimal)):
+            return self.decimal == other
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.minor < other.minor
+        if isinstance(other, (int, Decimal)):
+            return self.decimal < other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.decimal)
+
+    def __bool__(self):
+        return bool(self.minor)
+
+    def __float__(self):
+        return self.minor / MINOR_UNITS
+
+    def __str__(self):
+        return str(self.decimal)
+
+    def __format__(self, spec):
+        return format(self.decimal, spec)
+
+    def __repr__(self):
+        return f'Money({self.decimal})'
+
+
+class Discount(NamedTuple):
+    """A rate in basis points or a fixed amount in minor units, optionally capped"""
+    rate: int = 0
+    fixed: int = 0
+    cap: int | None = None
+
+    def amount(self, subtotal):
+        discount = apply_rate(subtotal, self.rate) + self.fixed
+        if self.cap is not None:
+            discount = min(discount, self.cap)
+        return min(discount, subtotal)
+
+
+NO_DISCOUNT = Discount()
+
+
+class PricedLines(NamedTuple):
+    unit_prices: list
+    line_totals: list
+    subtotal: Money
+    discount: Money
+    tax: Money
+    shipping: Money
+    total: Money
+
+
+def price_lines(unit_prices, adjustments, quantities, discount=NO_DISCOUNT, tax_rate=TAX_RATE,
+                shipping=SHIPPING_COST):
+    """
+    Price a basket in one pass over parallel sequences of unit prices and
+    variant adjustments (minor units) and quantities. Tax is charged on the
+    subtotal before discount, as on every order so far.
+    """
+    units, line_totals, subtotal = [], [], 0
+    for price, adjustment, quantity in zip(unit_prices, adjustments, quantities):
+        unit = price + adjustment
+        units.append(Money(unit))
+        line_totals.append(Money(unit * quantity))
+        subtotal += unit * quantity
+    discount = discount.amount(subtotal)
+    tax = apply_rate(subtotal, tax_rate)
+    return PricedLines(
+        units, line_totals, Money(subtotal), Money(discount), Money(tax), Money(shipping),
+        Money(subtotal + tax + shipping - discount),
+    )
+
+
+class MoneyField(models.DecimalField):
+    """DECIMAL(10, 2) column that accepts Money and rounds other values half up"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_digits', 10)
+        kwargs.setdefault('decimal_places', 2)
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if isinstance(value, Money):
+            return value.decimal
+        return super().to_python(value)
+
+    def get_prep_value(self, value):
+        if isinstance(value, Money):
+            return value.decimal
+        value = super().get_prep_value(value)
+        if isinstance(value, Decimal) and value.is_finite():
+            value = value.quantize(CENT, ROUND_HALF_UP)
+        return value
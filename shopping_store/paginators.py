@@ -0,0 +1,79 @@
+import json
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Below this many rows an exact COUNT(*) is cheap enough to always run
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def _table_estimate(connection, table):
+    """Row count of a whole table from planner statistics, or None if unknown"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [table])
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 only exists once ANALYZE has run
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # The first number of every stat row is the table's row count
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    # reltuples is -1 for a table that has never been analyzed
+    return estimate if estimate >= 0 else None
+
+
+def _plan_estimate(connection, queryset):
+    """Planner row estimate for a filtered queryset (PostgreSQL only)"""
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids COUNT(*) on large tables.
+
+    Unfiltered querysets are sized from planner statistics (pg_class.reltuples,
+    or sqlite_stat1 on SQLite); filtered ones from the query plan's row
+    estimate. An exact count is run only when the estimate is below
+    `exact_threshold` or no estimate is available, so small tables and narrow
+    filters still get precise page numbers.
+    """
+    exact_threshold = EXACT_COUNT_THRESHOLD
+
+    def __init__(self, *args, exact_threshold=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if exact_threshold is not None:
+            self.exact_threshold = exact_threshold
+        self.is_estimated = False
+
+    def estimate_count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None or query.is_sliced or query.distinct or query.combinator:
+            return None
+        connection = connections[queryset.db]
+        if not query.where:
+            return _table_estimate(connection, queryset.model._meta.db_table)
+        return _plan_estimate(connection, queryset)
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate_count()
+        if estimate is not None and estimate >= self.exact_threshold:
+            self.is_estimated = True
+            return estimate
+        return super().count
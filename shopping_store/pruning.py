@@ -0,0 +1,87 @@
+"""
+Scheduled deletion of rows nobody will read again, in small batches so no
+statement holds locks for long and replicas keep up.
+"""
+import gzip
+import os
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+PRUNE_BATCH_SIZE = 500
+PRUNE_PAUSE = 0.2
+DB_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+    'shopping_store.sessions',
+)
+
+
+class Archive:
+    """Gzipped JSON Lines of {"model": label, "fields": {...}} for rows about to be deleted"""
+
+    def __init__(self, directory, name):
+        stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+        self.path = os.path.join(directory, f'{name}-{stamp}.jsonl.gz')
+        self.encoder = DjangoJSONEncoder(separators=(',', ':'), ensure_ascii=False)
+        self.file = None
+
+    def write(self, model, rows):
+        if self.file is None:
+            self.file = gzip.open(self.path, 'wt', encoding='utf-8')
+        label = model._meta.label_lower
+        for row in rows:
+            self.file.write(self.encoder.encode({'model': label, 'fields': row}) + '\n')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def prune(queryset, related=(), batch_size=PRUNE_BATCH_SIZE, pause=PRUNE_PAUSE, archive=None):
+    """
+    Delete the rows of `queryset` in primary key order, `batch_size` at a
+    time, sleeping `pause` seconds between batches. Each batch re-applies
+    the queryset's filter when deleting, so a row that stops matching in
+    the meantime is kept. `related` are (model, foreign key) pairs archived
+    alongside each batch before their rows are cascaded. Returns the
+    number of rows deleted from the queryset's model.
+    """
+    model = queryset.model
+    queryset = queryset.order_by('pk')
+    deleted = 0
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        last_pk = pks[-1]
+        with transaction.atomic():
+            if archive is not None:
+                archive.write(model, queryset.filter(pk__in=pks).values())
+                for related_model, field in related:
+                    archive.write(related_model, related_model.objects.filter(**{f'{field}__in': pks}).values())
+            _, counts = queryset.filter(pk__in=pks).delete()
+        deleted += counts.get(model._meta.label, 0)
+        if len(pks) < batch_size:
+            return deleted
+        time.sleep(pause)
+
+
+def expired_sessions():
+    """Expired rows of the database session engine, or None when sessions live elsewhere"""
+    if settings.SESSION_ENGINE not in DB_SESSION_ENGINES:
+        return None
+    from django.contrib.sessions.models import Session
+    return Session.objects.filter(expire_date__lt=timezone.now())
+
+
+def stale_carts(days):
+    """Carts that neither they nor any of their items have changed in `days` days"""
+    from cart.models import Cart
+    cutoff = timezone.now() - timedelta(days=days)
+    return Cart.objects.filter(updated_at__lt=cutoff).exclude(items__updated_at__gte=cutoff)
@@ -0,0 +1,172 @@
+"""
+Admin search backends. On PostgreSQL terms go through trigram and full-text
+indexes (see shopping_store.migration_operations); elsewhere through a word
+index kept in SEARCH_TOKEN_MODEL for the models registered here, usually
+from their app's AppConfig.ready().
+"""
+import re
+from functools import reduce
+from operator import and_, or_
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import connections
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+
+SEARCH_CONFIG = 'english'
+TOKEN_RE = re.compile(r'\w+')
+INDEX_BATCH_SIZE = 1000
+
+# model -> fields whose words are kept in the token index
+_registry = {}
+# related model -> {(indexed model, lookup to the related row): related fields indexed}
+_dependents = {}
+
+
+def token_model():
+    return apps.get_model(settings.SEARCH_TOKEN_MODEL)
+
+
+def tokenize(text):
+    length = token_model()._meta.get_field('token').max_length
+    return {token[:length] for token in TOKEN_RE.findall(str(text).lower())}
+
+
+class PostgresSearchBackend:
+    """
+    Matches terms through indexes the migrations create on PostgreSQL:
+    UPPER(col) gin_trgm_ops indexes serve the icontains lookups on short
+    fields, and to_tsvector expression indexes serve full-text fields.
+    """
+
+    def search(self, queryset, term, fields, fulltext_fields=()):
+        conditions = []
+        tokens = term.split()
+        trigram_fields = [field for field in fields if field not in fulltext_fields]
+        if trigram_fields:
+            conditions.append(reduce(and_, (
+                reduce(or_, (Q(**{f'{field}__icontains': token}) for field in trigram_fields))
+                for token in tokens
+            )))
+
+        query = SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch')
+        vectors = {}
+        for i, field in enumerate(fulltext_fields):
+            vectors[f'search_vector_{i}'] = SearchVector(field, config=SEARCH_CONFIG)
+            conditions.append(Q(**{f'search_vector_{i}': query}))
+        return queryset.alias(**vectors).filter(reduce(or_, conditions))
+
+
+class TokenIndexSearchBackend:
+    """
+    Matches every word of the term as a prefix of an indexed word, using
+    range scans on the token index. Unlike icontains it does not find
+    matches in the middle of a word.
+    """
+
+    def search(self, queryset, term, fields, fulltext_fields=()):
+        content_type = ContentType.objects.db_manager(queryset.db).get_for_model(queryset.model)
+        for token in tokenize(term):
+            object_ids = token_model().objects.using(queryset.db).filter(
+                content_type=content_type, token__gte=token, token__lt=token + '\uffff'
+            ).values('object_id')
+            queryset = queryset.filter(pk__in=object_ids)
+        return queryset
+
+
+def get_search_backend(using='default'):
+    if connections[using].vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return TokenIndexSearchBackend()
+
+
+def uses_token_index(using='default'):
+    return isinstance(get_search_backend(using), TokenIndexSearchBackend)
+
+
+def index_objects(model, pks, using='default'):
+    """Rewrite the search tokens of the given objects from their current values"""
+    fields = _registry[model]
+    content_type = ContentType.objects.db_manager(using).get_for_model(model)
+    rows = model._default_manager.using(using).filter(pk__in=pks).values_list('pk', *fields)
+
+    SearchToken = token_model()
+    tokens = []
+    for pk, *values in rows:
+        words = set()
+        for value in values:
+            if value is not None:
+                words |= tokenize(value)
+        tokens.extend(SearchToken(content_type=content_type, object_id=pk, token=word) for word in words)
+
+    SearchToken.objects.using(using).filter(content_type=content_type, object_id__in=pks).delete()
+    SearchToken.objects.using(using).bulk_create(tokens, batch_size=INDEX_BATCH_SIZE)
+
+
+def rebuild_index(model, using='default', batch_size=INDEX_BATCH_SIZE):
+    """Reindex every row of a registered model. Returns the number of rows."""
+    pks = list(model._default_manager.using(using).order_by('pk').values_list('pk', flat=True))
+    content_type = ContentType.objects.db_manager(using).get_for_model(model)
+    token_model().objects.using(using).filter(content_type=content_type).delete()
+    for start in range(0, len(pks), batch_size):
+        index_objects(model, pks[start:start + batch_size], using)
+    return len(pks)
+
+
+def _object_saved(sender, instance, using, raw=False, update_fields=None, **kwargs):
+    if raw or not uses_token_index(using):
+        return
+    # Saves that only touch unindexed columns (e.g. last_activity) keep their tokens
+    if update_fields is not None and not {field.split('__')[0] for field in _registry[sender]} & set(update_fields):
+        return
+    index_objects(sender, [instance.pk], using)
+
+
+def _object_deleted(sender, instance, using, **kwargs):
+    if uses_token_index(using):
+        content_type = ContentType.objects.db_manager(using).get_for_model(sender)
+        token_model().objects.using(using).filter(content_type=content_type, object_id=instance.pk).delete()
+
+
+def _related_saved(sender, instance, using, created=False, raw=False, update_fields=None, **kwargs):
+    """Reindex the rows that show a field of the saved related row (e.g. orders of a renamed user)"""
+    if created or raw or not uses_token_index(using):
+        return
+    for (model, lookup), fields in _dependents[sender].items():
+        if update_fields is not None and not fields & set(update_fields):
+            continue
+        pks = list(model._default_manager.using(using).filter(**{lookup: instance.pk}).values_list('pk', flat=True))
+        for start in range(0, len(pks), INDEX_BATCH_SIZE):
+            index_objects(model, pks[start:start + INDEX_BATCH_SIZE], using)
+
+
+def register(model, fields):
+    """
+    Keep the token index for `model` in sync with `fields` on save and
+    delete, including saves of the related rows that fields such as
+    customer__email read from.
+    """
+    _registry[model] = list(fields)
+    post_save.connect(_object_saved, sender=model, dispatch_uid=f'search_index_save_{model._meta.label}')
+    post_delete.connect(_object_deleted, sender=model, dispatch_uid=f'search_index_delete_{model._meta.label}')
+
+    for field in fields:
+        *path, name = field.split('__')
+        if not path:
+            continue
+        related = model
+        for step in path:
+            related = related._meta.get_field(step).related_model
+        _dependents.setdefault(related, {}).setdefault((model, '__'.join(path)), set()).add(name)
+        post_save.connect(_related_saved, sender=related,
+                          dispatch_uid=f'search_index_related_save_{related._meta.label}')
+
+
+def indexed_fields(model):
+    return _registry.get(model, [])
+
+
+def registered_models():
+    return list(_registry)
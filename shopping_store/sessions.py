@@ -0,0 +1,63 @@
+"""
+Session engine that reads sessions from the cache and writes them only when
+their contents change.
+"""
+import hashlib
+from django.contrib.sessions.backends import cached_db
+
+
+class SessionStore(cached_db.SessionStore):
+    """
+    Cached, database-backed sessions that skip unchanged saves. Sessions
+    are read from the cache, falling back to django_session on a miss, so
+    existing database sessions carry over and the default engine can read
+    everything this one writes. save() compares a hash of the serialized
+    payload with the one that was loaded and writes neither the row nor
+    the cache entry when they match, as when `messages` or a view marks
+    the session modified without changing it.
+    """
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._stored_digest = None
+
+    def _digest(self, data):
+        return hashlib.sha256(self.serializer().dumps(data)).digest()
+
+    def _unchanged(self, must_create):
+        return (
+            not must_create
+            and self._stored_digest is not None
+            and self.session_key is not None
+            and self._digest(self._get_session()) == self._stored_digest
+        )
+
+    def load(self):
+        data = super().load()
+        self._stored_digest = self._digest(data) if data else None
+        return data
+
+    async def aload(self):
+        data = await super().aload()
+        self._stored_digest = self._digest(data) if data else None
+        return data
+
+    def save(self, must_create=False):
+        if self._unchanged(must_create):
+            return
+        super().save(must_create)
+        self._stored_digest = self._digest(self._get_session())
+
+    async def asave(self, must_create=False):
+        if self._unchanged(must_create):
+            return
+        await super().asave(must_create)
+        self._stored_digest = self._digest(self._get_session())
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        self._stored_digest = None
+
+    async def adelete(self, session_key=None):
+        await super().adelete(session_key)
+        self._stored_digest = None
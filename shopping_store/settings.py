@@ -14,6 +14,7 @@ from pathlib import Path
 import environ
 import os
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -76,10 +77,12 @@ ROOT_URLCONF = 'shopping_store.urls'
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'shopping_store.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cart.anonymous.AnonymousCartMiddleware',
     'customers.middleware.UserActivityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -177,6 +180,90 @@ else:
         }
     }
 
+# Read replicas: DATABASE_REPLICA_URLS is a comma-separated list of database
+# URLs. Views marked with shopping_store.db_router.replica_reads read from
+# them; writes, and a visitor's reads for REPLICA_PIN_SECONDS after a write,
+# stay on the primary. A replica that refuses connections is skipped for
+# REPLICA_RETRY_SECONDS.
+DATABASE_REPLICA_URLS = env.list('DATABASE_REPLICA_URLS', default=[])
+DATABASE_REPLICAS = []
+
+for number, url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = dj_database_url.parse(url, conn_max_age=600, conn_health_checks=True)
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['shopping_store.db_router.ReplicaRouter']
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=10)
+REPLICA_RETRY_SECONDS = env.int('REPLICA_RETRY_SECONDS', default=30)
+
+# Connection pooling (opt-in, PostgreSQL with psycopg 3): each process keeps
+# a pool of DATABASE_POOL_MIN_SIZE..MAX_SIZE connections that requests borrow
+# and return, instead of one persistent connection per thread. Connections
+# are checked before being handed out (CONN_HEALTH_CHECKS, which Django
+# turns into the pool's check callback); waiting longer than
+# DATABASE_POOL_TIMEOUT seconds for one raises an error. wsgi.py and asgi.py
+# fill the pools at startup (see shopping_store.db_pool).
+# requirements.txt only installs psycopg2. Turning pooling on is a driver
+# switch: install psycopg[binary,pool] and uninstall psycopg2-binary, since
+# Django uses psycopg 3 whenever it is importable.
+DATABASE_POOL = env.bool('DATABASE_POOL', default=False)
+DATABASE_POOL_WARM_TIMEOUT = env.float('DATABASE_POOL_WARM_TIMEOUT', default=10.0)
+
+if DATABASE_POOL:
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured('DATABASE_POOL needs psycopg 3: pip install "psycopg[binary,pool]"')
+
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.postgresql':
+            # Pooled connections are returned after every request
+            database['CONN_MAX_AGE'] = 0
+            database['CONN_HEALTH_CHECKS'] = True
+            database.setdefault('OPTIONS', {})['pool'] = {
+                'min_size': env.int('DATABASE_POOL_MIN_SIZE', default=2),
+                'max_size': env.int('DATABASE_POOL_MAX_SIZE', default=10),
+                'timeout': env.float('DATABASE_POOL_TIMEOUT', default=10.0),
+                'max_idle': env.float('DATABASE_POOL_MAX_IDLE', default=300.0),
+                'max_lifetime': env.float('DATABASE_POOL_MAX_LIFETIME', default=1800.0),
+            }
+
+# Serve the catalog's read views (home, listings, product pages, reviews and
+# the stock feed) from catalog.async_views. Only worth turning on when the
+# site runs under ASGI (shopping_store.asgi); under WSGI every async view is
+# run in its own event loop.
+CATALOG_ASYNC_VIEWS = env.bool('CATALOG_ASYNC_VIEWS', default=False)
+
+# Cache and sessions
+# Sessions are read from the cache and only written back (to django_session
+# and the cache) when their contents change. That needs a cache every worker
+# shares, so the cached engine is the default only when REDIS_URL is set;
+# existing database sessions are read on first use either way, and switching
+# back to the database engine reads the same rows.
+REDIS_URL = env('REDIS_URL', default=None)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+SESSION_ENGINE = env(
+    'SESSION_ENGINE',
+    default='shopping_store.sessions' if REDIS_URL else 'django.contrib.sessions.backends.db',
+)
+
+# Seconds a user's review eligibility (delivered and reviewed products) stays
+# cached. Order and review changes clear the entry, but only in the process
+# that made them unless the cache is shared, so without REDIS_URL it isn't
+# cached at all (0) and each check runs one query.
+REVIEW_ELIGIBILITY_CACHE_TIMEOUT = env.int(
+    'REVIEW_ELIGIBILITY_CACHE_TIMEOUT', default=60 * 60 * 24 if REDIS_URL else 0
+)
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -338,14 +425,20 @@ USE_CONSOLE_EMAIL = env.bool('USE_CONSOLE_EMAIL', default=False)
 
 EMAIL_HOST_USER = env('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
+# Set EMAIL_FILE_PATH to write delivered mail to files instead (local testing)
+EMAIL_FILE_PATH = env('EMAIL_FILE_PATH', default='')
 
 if USE_CONSOLE_EMAIL:
     # Explicitly use console backend for testing (prints emails to terminal)
-    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+    EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+    DEFAULT_FROM_EMAIL = 'noreply@fashionstore.local'
+elif EMAIL_FILE_PATH:
+    # One file per connection in EMAIL_FILE_PATH, a local stand-in for SMTP
+    EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
     DEFAULT_FROM_EMAIL = 'noreply@fashionstore.local'
 elif EMAIL_HOST_USER and EMAIL_HOST_PASSWORD:
     # Use SMTP when credentials are provided (works in both DEBUG and production)
-    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
     EMAIL_HOST = env('EMAIL_HOST', default='smtp.gmail.com')
     EMAIL_PORT = env.int('EMAIL_PORT', default=587)
     EMAIL_USE_TLS = env.bool('EMAIL_USE_TLS', default=True)
@@ -354,8 +447,27 @@ elif EMAIL_HOST_USER and EMAIL_HOST_PASSWORD:
     SERVER_EMAIL = DEFAULT_FROM_EMAIL
 else:
     # Fallback: Use console backend when no credentials
-    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+    EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.console.EmailBackend'
     DEFAULT_FROM_EMAIL = 'noreply@fashionstore.local'
 
+# EMAIL_QUEUE=True makes web processes only queue mail; the
+# send_queued_email worker then delivers it through EMAIL_DELIVERY_BACKEND
+# over one reused connection. Only enable it where that worker runs;
+# otherwise mail is sent directly from the request.
+EMAIL_QUEUE = env.bool('EMAIL_QUEUE', default=False)
+EMAIL_BACKEND = 'customers.mail.QueuedEmailBackend' if EMAIL_QUEUE else EMAIL_DELIVERY_BACKEND
+EMAIL_RATE_LIMIT = env.float('EMAIL_RATE_LIMIT', default=10)  # messages per second, 0 for no limit
+
+# Word index behind admin search on databases other than PostgreSQL
+# (shopping_store.search)
+SEARCH_TOKEN_MODEL = 'catalog.SearchToken'
+
+# Carts untouched for this many days are deleted by the prune_stale_data command
+CART_RETENTION_DAYS = env.int('CART_RETENTION_DAYS', default=90)
+
 # Password reset settings
 PASSWORD_RESET_TIMEOUT = 86400  # 24 hours in seconds
+
+# Bulk stock sync: warehouse clients call catalog:bulk_stock_update with
+# "Authorization: Bearer <STOCK_SYNC_TOKEN>". Left empty, the endpoint is disabled.
+STOCK_SYNC_TOKEN = env('STOCK_SYNC_TOKEN', default='')
@@ -0,0 +1,36 @@
+"""
+Base test cases for the apps' tests.py modules. Pages render with plain
+file storage (no manifest or Cloudinary) and without the HTTPS redirect.
+"""
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+TEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class QueryCountMixin:
+
+    def assertConstantQueries(self, url, add_rows, more=5):
+        """`url` runs as many queries after add_rows(more) as after add_rows(1)"""
+        add_rows(1)
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get(url)
+        add_rows(more)
+        with self.assertNumQueries(len(baseline)):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+@override_settings(STORAGES=TEST_STORAGES, SECURE_SSL_REDIRECT=False)
+class StoreTestCase(QueryCountMixin, TestCase):
+    pass
+
+
+@override_settings(STORAGES=TEST_STORAGES, SECURE_SSL_REDIRECT=False)
+class StoreTransactionTestCase(QueryCountMixin, TransactionTestCase):
+    pass
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shopping_store.settings')
 
 application = get_wsgi_application()
+
+from shopping_store.db_pool import warm_connection_pools  # noqa: E402
+
+warm_connection_pools()